@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Benchmark of the authoritative area server
+
+    Many areas are hosted in one process using a loopback transport (no
+    IceStorm) and synthetic players moving randomly. Reports ticks per second of every
+    area: achieved at the fixed tick rate and achievable (capacity).
+'''
+
+import sys
+import json
+import uuid
+import pickle
+import random
+import argparse
+
+import headless
+headless.install()
+
+# pylint: disable=C0413
+import game.server
+import game.transport
+from game.common import OBJECT_CLASS, OBJECT_TYPE, IDENTIFIER, HEROES, DEFAULT_SPAWN, KEY,\
+    TREASURE, HAM, JAR, NULL_TILE
+# pylint: enable=C0413
+
+
+_ITEMS_ = [KEY, TREASURE, HAM, JAR]
+_DIRECTIONS_ = [(x, y) for x in (-1, 0, 1) for y in (-1, 0, 1)]
+
+
+def area_map(size, items, seed=None):
+    '''JSON room with a spawn point and some random items'''
+    generator = random.Random(seed)
+    data = headless.generate_map(size, size, seed=seed)
+    data[1][1] = DEFAULT_SPAWN
+    free = [
+        (x, y) for y in range(2, size - 1) for x in range(2, size - 1)
+        if data[y][x] == NULL_TILE
+    ]
+    for item_number, (x, y) in enumerate(generator.sample(free, min(items, len(free)))):
+        data[y][x] = _ITEMS_[item_number % len(_ITEMS_)]
+    return json.dumps({'room': 'benchmark', 'data': data})
+
+
+class SyntheticPlayer:
+    '''Client that joins an area and changes its direction from time to time'''
+    def __init__(self, transport, channel, hero_class=HEROES[0], seed=None):
+        self.identifier = str(uuid.uuid4())
+        self._transport_ = transport
+        self._channel_ = channel
+        self._random_ = random.Random(seed)
+        self._countdown_ = 0
+        self.received = 0
+        transport.subscribe(channel, self)
+        self._send_(('spawn_actor', self.identifier, {
+            OBJECT_CLASS: 'hero', OBJECT_TYPE: hero_class, IDENTIFIER: self.identifier
+        }))
+
+    def _send_(self, event):
+        self._transport_.publish(self._channel_, pickle.dumps(event), self.identifier)
+
+    def receive(self, event, sender_id, sent_at=None): # pylint: disable=W0613
+        '''Count resolved events sent by the server'''
+        self.received += 1
+
+    def update(self):
+        '''Frame of the client'''
+        self._countdown_ -= 1
+        if self._countdown_ > 0:
+            return
+        self._countdown_ = self._random_.randint(20, 50)
+        self._send_(('set_direction', self.identifier, *self._random_.choice(_DIRECTIONS_)))
+
+
+def run(areas=4, players=4, size=64, items=50, seconds=5.0, tick_rate=game.server.TICK_RATE,
+        seed=0):
+    '''Host areas with synthetic players, return server statistics'''
+    transport = game.transport.LoopbackTransport()
+    server = game.server.AreaServer(transport, tick_rate=tick_rate)
+    clients = []
+    for area_number in range(areas):
+        area = server.host(area_map(size, items, seed=seed + area_number))
+        clients.extend(
+            SyntheticPlayer(
+                transport, area.channel, seed=(seed + area_number) * players + player_number
+            )
+            for player_number in range(players)
+        )
+
+    # Clients run in the server loop, just before the areas
+    server_tick = server.tick
+    def _tick_():
+        for client in clients:
+            client.update()
+        server_tick()
+    server.tick = _tick_
+    server.run(seconds)
+
+    stats = server.stats()
+    stats['resolved_events'] = sum(client.received for client in clients)
+    return stats
+
+
+def parse_commandline():
+    '''Parse and check commandline'''
+    parser = argparse.ArgumentParser('Area server benchmark')
+    parser.add_argument('--areas', type=int, default=4, help='Hosted areas')
+    parser.add_argument('--players', type=int, default=4, help='Players per area')
+    parser.add_argument('--size', type=int, default=64, help='Width/height of areas (tiles)')
+    parser.add_argument('--items', type=int, default=50, help='Items per area')
+    parser.add_argument('--seconds', type=float, default=5.0, help='Duration of the run')
+    parser.add_argument(
+        '--tick-rate', type=int, default=game.server.TICK_RATE, help='Ticks per second'
+    )
+    return parser.parse_args()
+
+
+def main():
+    '''Run benchmark according to commandline'''
+    options = parse_commandline()
+    print(json.dumps(run(
+        options.areas, options.players, options.size, options.items, options.seconds,
+        options.tick_rate
+    ), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Benchmark of door group search in icegauntlettool on long door corridors
+
+    Also checks that the flood fill and the precomputed groups agree on the
+    generated corridors and on the maps shipped in assets.
+'''
+
+import os
+import sys
+import json
+import time
+import argparse
+import glob
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# pylint: disable=C0413
+import icegauntlettool
+# pylint: enable=C0413
+
+
+_ASSETS_ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assets')
+
+# Horizontal door open to both sides
+_CORRIDOR_DOOR_ = 28
+# Items that are not doors, as found in a normal room
+_OTHER_ITEMS_ = [icegauntlettool.KEY, icegauntlettool.TREASURE, icegauntlettool.HAM]
+
+
+def generate_items(corridor_length, corridors=4, other_items=200):
+    '''Items dict (as used by servers) with some door corridors and other items'''
+    items = {}
+    for corridor in range(corridors):
+        for column in range(corridor_length):
+            items['door-{}-{}'.format(corridor, column)] = (
+                _CORRIDOR_DOOR_, (column, corridor * 2)
+            )
+    for item in range(other_items):
+        items['item-{}'.format(item)] = (
+            _OTHER_ITEMS_[item % len(_OTHER_ITEMS_)], (item, (corridors * 2) + 1)
+        )
+    return items
+
+
+def shipped_maps_items():
+    '''Items dict of every map in assets, by map file name'''
+    maps = {}
+    for filename in sorted(glob.glob(os.path.join(_ASSETS_, '*.json'))):
+        with open(filename, 'r') as contents:
+            room_data = contents.read()
+        if 'data' not in json.loads(room_data):
+            # Not a map (palette...)
+            continue
+        maps[os.path.basename(filename)] = {
+            'item-{}'.format(item): item_data
+            for item, item_data in enumerate(icegauntlettool.get_map_objects(room_data))
+        }
+    return maps
+
+
+def groups_agree(items):
+    '''Return if search_adjacent_door() and door_groups() give the same groups'''
+    groups = icegauntlettool.door_groups(items)
+    door_index = icegauntlettool.door_position_index(items)
+    return all(
+        icegauntlettool.search_adjacent_door(items, position, door_index=door_index)
+        == groups[door_id]
+        for position, (door_id, _) in door_index.items()
+    )
+
+
+def _best_time_(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(lengths=(10, 100, 1000, 5000), repeat=5):
+    '''Run benchmark, return a list of results (seconds) per corridor length'''
+    results = []
+    for length in lengths:
+        items = generate_items(length)
+        middle = (length // 2, 0)
+        groups = icegauntlettool.door_groups(items)
+        results.append({
+            'corridor_length': length,
+            'search_adjacent_door': _best_time_(
+                lambda: icegauntlettool.search_adjacent_door(items, middle), repeat
+            ),
+            'door_groups': _best_time_(lambda: icegauntlettool.door_groups(items), repeat),
+            'door_groups_lookup': _best_time_(lambda: groups['door-0-0'], repeat),
+            'groups_agree': groups_agree(items)
+        })
+    return results
+
+
+def parse_commandline():
+    '''Parse and check commandline'''
+    parser = argparse.ArgumentParser('Door search benchmark')
+    parser.add_argument(
+        '--lengths', type=int, nargs='+', default=[10, 100, 1000, 5000],
+        help='Corridor lengths to test'
+    )
+    parser.add_argument('--repeat', type=int, default=5, help='Repetitions, best is reported')
+    return parser.parse_args()
+
+
+def main():
+    '''Run benchmark according to commandline'''
+    options = parse_commandline()
+    results = run(options.lengths, options.repeat)
+    shipped = {
+        map_name: groups_agree(items) for map_name, items in shipped_maps_items().items()
+    }
+    print(json.dumps({'corridors': results, 'shipped_maps_groups_agree': shipped}, indent=2))
+    return 0 if all(shipped.values()) and all(
+        result['groups_agree'] for result in results
+    ) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Benchmark of enemy churn: spawning and killing enemies every frame with the
+    EnemyPool() or with the game.enemies.new() factory, and rooms of enemy
+    generators (Generator.update()) whose enemies are killed as they spawn
+
+    Reports time, memory allocated while running (tracemalloc) and garbage left
+    for the cyclic garbage collector.
+'''
+
+import gc
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+import headless
+headless.install()
+
+# pylint: disable=C0413
+import game.room
+import game.objects
+import game.enemies
+from game.common import OBJECT_TYPE, ENEMY_TYPES, GENERATORS
+from game.pyxeltools import TILE_SIZE
+# pylint: enable=C0413
+
+
+class _Factory:
+    '''Same interface than EnemyPool() but always creating new enemies'''
+    def __init__(self):
+        self._created_ = 0
+
+    def acquire(self, enemy_type):
+        '''Create a new enemy'''
+        self._created_ += 1
+        return game.enemies.new(
+            '{}-{}'.format(enemy_type, self._created_), {OBJECT_TYPE: enemy_type}
+        )
+
+
+def _free_positions_(room, count):
+    positions = []
+    for y, row in enumerate(room._passable_tiles_()): # pylint: disable=W0212
+        for x, free in enumerate(row):
+            if free:
+                positions.append((x * TILE_SIZE, y * TILE_SIZE))
+    return [positions[index % len(positions)] for index in range(count)]
+
+
+def _churn_(room, source, alive, positions, churn, frames):
+    for frame in range(frames):
+        for index in range(churn):
+            slot = ((frame * churn) + index) % len(alive)
+            room.kill(alive[slot])
+            enemy = source.acquire(ENEMY_TYPES[slot % len(ENEMY_TYPES)])
+            room.spawn(enemy, positions[slot])
+            alive[slot] = enemy
+        room.update()
+
+
+def _measure_(use_pool, size, enemies, churn, frames):
+    room = game.room.Room(headless.generate_map(size, size, seed=0), headless.Level())
+    source = room.enemy_pool if use_pool else _Factory()
+    positions = _free_positions_(room, enemies)
+    alive = []
+    for index, position in enumerate(positions):
+        enemy = source.acquire(ENEMY_TYPES[index % len(ENEMY_TYPES)])
+        room.spawn(enemy, position)
+        alive.append(enemy)
+    # Warm up: fill the pool and let the room reach its steady size
+    _churn_(room, source, alive, positions, churn, 1)
+    gc.collect()
+    gc.disable()
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        _churn_(room, source, alive, positions, churn, frames)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        gc.enable()
+    result = {
+        'seconds': elapsed,
+        'peak_traced_bytes': peak,
+        'garbage_objects': gc.collect()
+    }
+    if use_pool:
+        result.update(room.enemy_pool.stats)
+    return result
+
+
+def _hunt_(room, generators_list, frames):
+    for _ in range(frames):
+        room.update()
+        # Full generators lose their oldest enemy, so all of them keep spawning
+        for generator in generators_list:
+            if len(generator._spawned_) >= game.objects.GENERATOR_CAPACITY: # pylint: disable=W0212
+                room.kill(generator._spawned_[0]) # pylint: disable=W0212
+
+
+def _measure_generators_(size, generators, frames):
+    room = game.room.Room(headless.generate_map(size, size, seed=0), headless.Level())
+    positions = _free_positions_(room, generators)
+    generators_list = []
+    for index, position in enumerate(positions):
+        generator = game.objects.new(GENERATORS[index % len(GENERATORS)], room.handles.new())
+        room.spawn(generator, position)
+        generators_list.append(generator)
+    # Warm up: fill generators and the pool
+    _hunt_(
+        room, generators_list, game.objects.GENERATOR_PERIOD * game.objects.GENERATOR_CAPACITY * 2
+    )
+    created = room.enemy_pool.stats['created']
+    gc.collect()
+    gc.disable()
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        _hunt_(room, generators_list, frames)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        gc.enable()
+    result = {
+        'seconds': elapsed,
+        'peak_traced_bytes': peak,
+        'garbage_objects': gc.collect(),
+        'created_while_running': room.enemy_pool.stats['created'] - created
+    }
+    result.update(room.enemy_pool.stats)
+    return result
+
+
+def run(size=48, enemies=200, churn=20, frames=100, generators=10, generator_frames=450):
+    '''Run benchmark, return results as a dict (one entry per strategy)'''
+    return {
+        'factory': _measure_(False, size, enemies, churn, frames),
+        'pool': _measure_(True, size, enemies, churn, frames),
+        'generators': _measure_generators_(size, generators, generator_frames)
+    }
+
+
+def parse_commandline():
+    '''Parse and check commandline'''
+    parser = argparse.ArgumentParser('Enemy pool benchmark')
+    parser.add_argument('--size', type=int, default=48, help='Width/height of the room (tiles)')
+    parser.add_argument('--enemies', type=int, default=200, help='Living enemies')
+    parser.add_argument('--churn', type=int, default=20, help='Enemies replaced every frame')
+    parser.add_argument('--frames', type=int, default=100, help='Frames to run')
+    parser.add_argument('--generators', type=int, default=10, help='Enemy generators')
+    parser.add_argument(
+        '--generator-frames', type=int, default=450, help='Frames to run with generators'
+    )
+    return parser.parse_args()
+
+
+def main():
+    '''Run benchmark according to commandline'''
+    options = parse_commandline()
+    if options.churn > options.enemies:
+        print('--churn cannot be greater than --enemies', file=sys.stderr)
+        return 1
+    print(json.dumps(
+        run(
+            options.size, options.enemies, options.churn, options.frames,
+            options.generators, options.generator_frames
+        ), indent=2
+    ))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
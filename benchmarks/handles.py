@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Benchmark of object identifiers: UUID strings against integer handles
+
+    Compares dict lookups, memory used by the identifiers and size of pickled
+    events (as sent by RemoteArea).
+'''
+
+import sys
+import json
+import time
+import uuid
+import pickle
+import argparse
+
+import headless
+headless.install()
+
+# pylint: disable=C0413
+from game.handles import HandleTable
+# pylint: enable=C0413
+
+
+def _lookup_time_(identifiers, repeat):
+    objects = {identifier: None for identifier in identifiers}
+    best = None
+    for _ in range(repeat):
+        # Fresh copies of the keys (hash not cached), as events coming from the network
+        keys = pickle.loads(pickle.dumps(identifiers))
+        start = time.perf_counter()
+        for key in keys:
+            objects[key] # pylint: disable=W0104
+        elapsed = (time.perf_counter() - start) / len(keys)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _measure_(identifiers, repeat):
+    return {
+        'lookup_seconds': _lookup_time_(identifiers, repeat),
+        'identifier_bytes': sum(sys.getsizeof(identifier) for identifier in identifiers),
+        'event_bytes': sum(
+            len(pickle.dumps(('set_direction', identifier, 1, 0))) for identifier in identifiers
+        ) / len(identifiers)
+    }
+
+
+def run(objects=10000, repeat=5):
+    '''Run benchmark, return results as a dict (one entry per identifier type)'''
+    handles = HandleTable()
+    return {
+        'uuid': _measure_([str(uuid.uuid4()) for _ in range(objects)], repeat),
+        'handle': _measure_([handles.new() for _ in range(objects)], repeat)
+    }
+
+
+def parse_commandline():
+    '''Parse and check commandline'''
+    parser = argparse.ArgumentParser('Identifiers benchmark')
+    parser.add_argument('--objects', type=int, default=10000, help='Number of identifiers')
+    parser.add_argument('--repeat', type=int, default=5, help='Repetitions, best is reported')
+    return parser.parse_args()
+
+
+def main():
+    '''Run benchmark according to commandline'''
+    options = parse_commandline()
+    print(json.dumps(run(options.objects, options.repeat), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
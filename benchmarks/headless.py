@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Helpers to run (and time) the engine without a window
+
+    Call install() before importing the game package.
+'''
+
+import os
+import sys
+import json
+import random
+
+
+def install():
+    '''Replace pyxel by the headless stand-in, make the game package importable'''
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    import pyxel_headless # pylint: disable=C0415
+    pyxel_headless.install()
+
+
+def generate_map(width, height, wall_ratio=0.05, seed=None):
+    '''Map data (list of rows of tiles) surrounded by walls with some random pillars'''
+    # pylint: disable=C0415
+    from game.common import WALL_TILES, NULL_TILE
+    generator = random.Random(seed)
+    data = []
+    for y in range(height):
+        row = []
+        for x in range(width):
+            if (x in (0, width - 1)) or (y in (0, height - 1)):
+                row.append(WALL_TILES[0])
+            elif generator.random() < wall_ratio:
+                row.append(generator.choice(WALL_TILES))
+            else:
+                row.append(NULL_TILE)
+        data.append(row)
+    return data
+
+
+def generate_json_map(width, height, wall_ratio=0.05, seed=None):
+    '''Same as generate_map() but encoded as a JSON room'''
+    return json.dumps({
+        'room': 'benchmark', 'data': generate_map(width, height, wall_ratio, seed)
+    })
+
+
+class Level:
+    '''Minimal Level() stand-in: discards all events'''
+    identifier = None
+    def __init__(self):
+        self.events = 0
+
+    def fire_event(self, event, only_local=False):
+        '''Count events, nothing else'''
+        self.events += 1
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Benchmark of enemy hordes chasing heroes with the Horde steer (flow field)
+
+    Reports milliseconds per frame spent on moving the enemies (steering) and
+    on the whole Room.update() (steering plus collisions).
+'''
+
+import sys
+import json
+import time
+import random
+import argparse
+
+import headless
+headless.install()
+
+# pylint: disable=C0413
+import game.room
+import game.heroes
+import game.enemies
+import game.steers
+import game.navigation
+from game.common import OBJECT_TYPE, WARRIOR, ENEMY_TYPES
+from game.pyxeltools import TILE_SIZE
+# pylint: enable=C0413
+
+
+# Frame budget at 60 fps (in milliseconds)
+FRAME_BUDGET = 1000.0 / 60.0
+
+
+def make_room(size, enemies, heroes=2, seed=None):
+    '''Room with heroes moving randomly and enemies in random free tiles'''
+    generator = random.Random(seed)
+    random.seed(seed)
+    room = game.room.Room(headless.generate_map(size, size, seed=seed), headless.Level())
+    passable = game.navigation.passable_tiles(room.block)
+    free_tiles = [
+        (x, y) for y, row in enumerate(passable) for x, free in enumerate(row) if free
+    ]
+    for hero_number in range(heroes):
+        hero = game.heroes.new('hero-{}'.format(hero_number), {OBJECT_TYPE: WARRIOR})
+        tile_x, tile_y = generator.choice(free_tiles)
+        room.spawn(hero, (tile_x * TILE_SIZE, tile_y * TILE_SIZE))
+        hero.steer = game.steers.new('Random')
+    for enemy_number in range(enemies):
+        enemy = game.enemies.new('enemy-{}'.format(enemy_number), {
+            OBJECT_TYPE: ENEMY_TYPES[enemy_number % len(ENEMY_TYPES)]
+        })
+        tile_x, tile_y = generator.choice(free_tiles)
+        room.spawn(enemy, (tile_x * TILE_SIZE, tile_y * TILE_SIZE))
+    return room
+
+
+def _steering_(room):
+    # Room.update() without collision checks
+    room._update_hero_tiles_() # pylint: disable=W0212
+    for game_object in list(room.game_objects.values()):
+        game_object.update()
+
+
+def _time_per_frame_(function, room, frames):
+    start = time.perf_counter()
+    for _ in range(frames):
+        function(room)
+    return ((time.perf_counter() - start) * 1000.0) / frames
+
+
+def run(size=64, enemies=(100, 500, 1000), frames=120, collision_frames=5, seed=0):
+    '''Run benchmark, return results as a list (one per horde size)'''
+    results = []
+    for horde in enemies:
+        room = make_room(size, horde, seed=seed)
+        start = time.perf_counter()
+        room.flow_field # pylint: disable=W0104
+        rebuild = (time.perf_counter() - start) * 1000.0
+        steering = _time_per_frame_(_steering_, room, frames)
+        room_update = _time_per_frame_(game.room.Room.update, room, collision_frames)
+        results.append({
+            'enemies': horde,
+            'flow_field_ms': rebuild,
+            'steering_ms_per_frame': steering,
+            'room_update_ms_per_frame': room_update,
+            # The whole frame (steering and collisions) must fit, not only the steering
+            'fits_60fps': room_update < FRAME_BUDGET
+        })
+    return results
+
+
+def parse_commandline():
+    '''Parse and check commandline'''
+    parser = argparse.ArgumentParser('Horde benchmark')
+    parser.add_argument('--size', type=int, default=64, help='Width/height of the room (tiles)')
+    parser.add_argument(
+        '--enemies', type=int, nargs='+', default=[100, 500, 1000], help='Horde sizes to test'
+    )
+    parser.add_argument('--frames', type=int, default=120, help='Frames to time steering')
+    parser.add_argument(
+        '--collision-frames', type=int, default=5, help='Frames to time the whole Room.update()'
+    )
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random room')
+    return parser.parse_args()
+
+
+def main():
+    '''Run benchmark according to commandline'''
+    options = parse_commandline()
+    print(json.dumps(run(
+        options.size, options.enemies, options.frames, options.collision_frames, options.seed
+    ), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Load test of the area server without Ice nor IceStorm
+
+    Areas are hosted by an AreaServer() and joined by emulated clients
+    (headless levels with Random or Seek steers) through a loopback transport
+    with configurable latency, jitter and loss. Reports throughput and latency
+    percentiles of every event type.
+'''
+
+import sys
+import json
+import argparse
+
+import headless
+headless.install()
+
+# pylint: disable=C0413
+import game.server
+import game.loadgen
+import game.transport
+from area_server import area_map
+# pylint: enable=C0413
+
+
+def run(clients=100, areas=2, size=32, items=20, seconds=10.0, ramp=2.0,
+        steer=game.loadgen.STEERS[0], follow_peers=True, latency=0.0, jitter=0.0, loss=0.0,
+        simulate=False, seed=0):
+    '''Host areas and play them with emulated clients, return the load report'''
+    transport = game.transport.LoopbackTransport(latency, jitter, loss, seed, simulate)
+    server = game.server.AreaServer(transport)
+    transport.dungeon = game.server.LocalDungeon(server)
+    for area_number in range(areas):
+        server.host(area_map(size, items, seed=seed + area_number))
+    generator = game.loadgen.LoadGenerator(
+        transport, clients=clients, steer=steer, seed=seed, follow_peers=follow_peers
+    )
+    # Server runs in the loop of the clients, once per frame
+    play = generator.simulate if simulate else generator.run
+    report = play(seconds, ramp, on_frame=server.tick)
+    generator.stop()
+    report['server'] = server.stats()
+    report['transport'] = transport.stats()
+    return report
+
+
+def parse_commandline():
+    '''Parse and check commandline'''
+    parser = argparse.ArgumentParser('Load generator benchmark')
+    parser.add_argument('--clients', type=int, default=100, help='Emulated clients')
+    parser.add_argument('--areas', type=int, default=2, help='Hosted areas')
+    parser.add_argument('--size', type=int, default=32, help='Width/height of areas (tiles)')
+    parser.add_argument('--items', type=int, default=20, help='Items per area')
+    parser.add_argument('--seconds', type=float, default=10.0, help='Duration of the run')
+    parser.add_argument(
+        '--ramp', type=float, default=2.0, help='Seconds until every client has joined'
+    )
+    parser.add_argument(
+        '--steer', default=game.loadgen.STEERS[0], choices=game.loadgen.STEERS,
+        help='Steer of the emulated heroes'
+    )
+    parser.add_argument(
+        '--ignore-peers', action='store_true',
+        help='Clients do not simulate the heroes of other clients (allows many more clients)'
+    )
+    parser.add_argument(
+        '--latency', type=float, default=0.0, help='One-way delay of the channels (seconds)'
+    )
+    parser.add_argument(
+        '--jitter', type=float, default=0.0, help='Random variation of the delay (seconds)'
+    )
+    parser.add_argument(
+        '--loss', type=float, default=0.0, help='Probability of losing a delivery (0-1)'
+    )
+    parser.add_argument(
+        '--simulate', action='store_true',
+        help='Run as fast as possible with simulated time (seconds of game time)'
+    )
+    options = parser.parse_args()
+    if (options.latency < 0.0) or (options.jitter < 0.0) or not 0.0 <= options.loss < 1.0:
+        parser.error('Invalid latency, jitter or loss')
+    return options
+
+
+def main():
+    '''Run benchmark according to commandline'''
+    options = parse_commandline()
+    print(json.dumps(run(
+        options.clients, options.areas, options.size, options.items, options.seconds,
+        options.ramp, options.steer, not options.ignore_peers, options.latency, options.jitter,
+        options.loss, options.simulate
+    ), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Replay an event journal headless, as fast as possible
+
+    Journals are recorded with the "--record" option of the games. A synthetic
+    journal can be recorded too, playing a local level with random steer.
+'''
+
+import os
+import sys
+import json
+import argparse
+
+import headless
+headless.install()
+
+# pylint: disable=C0413
+import game
+import game.level
+import game.replay
+import game.journal
+import game.profiler
+import game.orchestration
+# pylint: enable=C0413
+
+
+_ASSETS_ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assets')
+
+
+def level_path(level_file):
+    '''Level file as given or, if not found, from the assets folder of the repository'''
+    if os.path.exists(level_file):
+        return level_file
+    return os.path.join(_ASSETS_, level_file)
+
+
+def record_session(filename, level_file, ticks, hero=game.common.HEROES[0]):
+    '''Play a local level with random steer, recording a journal'''
+    session = game.Game(hero, game.DungeonMap([level_file]))
+    session.player.attribute['steer_id'] = 'Random'
+    game.journal.JOURNAL.open(filename)
+    try:
+        level = game.level.Level(session)
+        level.orchestrator = game.orchestration.RoomOrchestration(session.dungeon.next_area)
+        level.orchestrator.start()
+        for _ in range(ticks):
+            level.update()
+    finally:
+        game.journal.JOURNAL.close()
+    return game.journal.JOURNAL.records
+
+
+def parse_commandline():
+    '''Parse and check commandline'''
+    parser = argparse.ArgumentParser('Journal replay')
+    parser.add_argument('JOURNAL', help='Journal file')
+    parser.add_argument(
+        '--simulate', action='store_true', default=False,
+        help='Update the room once per recorded tick'
+    )
+    parser.add_argument(
+        '--profile-csv', default=None, metavar='FILE',
+        help='Save timings of every simulated tick as CSV'
+    )
+    parser.add_argument(
+        '--record-level', default=None, metavar='LEVEL',
+        help='Record a synthetic journal playing LEVEL before replaying it'
+    )
+    parser.add_argument(
+        '--ticks', type=int, default=1800, help='Game loop iterations of the synthetic journal'
+    )
+    return parser.parse_args()
+
+
+def main():
+    '''Replay according to commandline'''
+    options = parse_commandline()
+    if options.record_level:
+        record_session(options.JOURNAL, level_path(options.record_level), options.ticks)
+    if options.profile_csv:
+        game.profiler.PROFILER.enable()
+    results = game.replay.replay_file(options.JOURNAL, options.simulate)
+    if options.profile_csv:
+        game.profiler.PROFILER.dump_csv(options.profile_csv)
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
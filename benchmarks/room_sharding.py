@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Local harness for sharded RoomManager instances
+
+    Starts several managers as processes listening on loopback. Every manager
+    knows its peers (as learned from RoomManagerSync.hello/announce), stores
+    only the rooms the HashRing assigns to it and routes publish/getRoom
+    requests to the owners. Measures publish and lookup throughput while
+    managers are added.
+'''
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import multiprocessing
+from multiprocessing.connection import Listener, Client
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# pylint: disable=C0413
+import icegauntlettool
+# pylint: enable=C0413
+
+
+_AUTHKEY_ = b'icegauntlet'
+_BASE_PORT_ = 17000
+
+
+def _address_(index):
+    return ('127.0.0.1', _BASE_PORT_ + index)
+
+
+def _manager_id_(index):
+    return 'manager-{}'.format(index)
+
+
+class _PeerLinks:
+    '''Lazy connections to the other managers, one per thread'''
+    def __init__(self, addresses):
+        self._addresses_ = addresses
+        self._local_ = threading.local()
+
+    def call(self, manager_id, *request):
+        '''Send a request to a peer and wait for the reply'''
+        links = getattr(self._local_, 'links', None)
+        if links is None:
+            links = self._local_.links = {}
+        if manager_id not in links:
+            links[manager_id] = Client(self._addresses_[manager_id], authkey=_AUTHKEY_)
+        links[manager_id].send(request)
+        return links[manager_id].recv()
+
+
+def _serve_manager_(index, managers, replicas, ready):
+    manager_id = _manager_id_(index)
+    ring = icegauntlettool.HashRing(replicas=replicas)
+    addresses = {}
+    for peer in range(managers):
+        ring.add(_manager_id_(peer))
+        addresses[_manager_id_(peer)] = _address_(peer)
+    peers = _PeerLinks(addresses)
+    rooms = {}
+
+    def handle(request):
+        operation = request[0]
+        if operation == 'store':
+            rooms[request[1]] = request[2]
+            return True
+        if operation == 'fetch':
+            return rooms.get(request[1], None)
+        if operation == 'publish':
+            _, room_name, room_data = request
+            for owner in ring.owners(room_name):
+                if owner == manager_id:
+                    rooms[room_name] = room_data
+                else:
+                    peers.call(owner, 'store', room_name, room_data)
+            return True
+        if operation == 'getRoom':
+            room_name = request[1]
+            owners = ring.owners(room_name)
+            if manager_id in owners:
+                return rooms.get(room_name, None)
+            return peers.call(owners[0], 'fetch', room_name)
+        if operation == 'stored':
+            return len(rooms)
+        raise ValueError('Unknown operation: {}'.format(operation))
+
+    def serve(connection):
+        with connection:
+            while True:
+                try:
+                    request = connection.recv()
+                except EOFError:
+                    return
+                connection.send(handle(request))
+
+    with Listener(_address_(index), authkey=_AUTHKEY_) as listener:
+        ready.set()
+        while True:
+            connection = listener.accept()
+            threading.Thread(target=serve, args=(connection,), daemon=True).start()
+
+
+def measure(managers, rooms, replicas, room_size):
+    '''Start given number of managers and measure its throughput'''
+    ready = [multiprocessing.Event() for _ in range(managers)]
+    processes = [
+        multiprocessing.Process(
+            target=_serve_manager_, args=(index, managers, replicas, ready[index]), daemon=True
+        ) for index in range(managers)
+    ]
+    for process in processes:
+        process.start()
+    for event in ready:
+        event.wait()
+
+    clients = [Client(_address_(index), authkey=_AUTHKEY_) for index in range(managers)]
+    room_data = json.dumps({'room': '', 'data': [[icegauntlettool.EMPTY_TILE] * room_size] * room_size})
+    names = ['room-{}'.format(room) for room in range(rooms)]
+
+    start = time.perf_counter()
+    for name in names:
+        client = random.choice(clients)
+        client.send(('publish', name, room_data))
+        client.recv()
+    publish_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for name in names:
+        client = random.choice(clients)
+        client.send(('getRoom', name))
+        if client.recv() is None:
+            raise RuntimeError('Room not found: {}'.format(name))
+    lookup_time = time.perf_counter() - start
+
+    stored = []
+    for client in clients:
+        client.send(('stored',))
+        stored.append(client.recv())
+        client.close()
+    for process in processes:
+        process.terminate()
+        process.join()
+
+    return {
+        'managers': managers,
+        'replicas': min(replicas, managers),
+        'rooms': rooms,
+        'publish_per_second': rooms / publish_time,
+        'lookup_per_second': rooms / lookup_time,
+        'max_rooms_per_manager': max(stored)
+    }
+
+
+def parse_commandline():
+    '''Parse and check commandline'''
+    parser = argparse.ArgumentParser('Sharded RoomManager harness')
+    parser.add_argument('--managers', type=int, default=4, help='Maximum number of managers')
+    parser.add_argument('--rooms', type=int, default=2000, help='Rooms to publish')
+    parser.add_argument(
+        '--replicas', type=int, default=icegauntlettool.DEFAULT_REPLICAS,
+        help='Managers storing every room'
+    )
+    parser.add_argument('--room-size', type=int, default=32, help='Width/height of rooms')
+    return parser.parse_args()
+
+
+def main():
+    '''Run harness according to commandline'''
+    options = parse_commandline()
+    results = [
+        measure(managers, options.rooms, options.replicas, options.room_size)
+        for managers in range(1, options.managers + 1)
+    ]
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
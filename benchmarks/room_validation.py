@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Benchmark of room validation and extraction in icegauntlettool
+
+    Compares the classic get_map_objects() + filter_map_objects() pair (a copy
+    of the original code, scanning AVAILABLE_OBJECT_IDS for every tile) against
+    the current pair and the single-pass inspect_room(), with and without NumPy.
+'''
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# pylint: disable=C0413
+import icegauntlettool
+# pylint: enable=C0413
+
+
+WALL_TILES = list(range(0, 16))
+
+
+def generate_room(width, height, object_ratio=0.05, seed=None):
+    '''Generate a random room in JSON format'''
+    generator = random.Random(seed)
+    data = []
+    for _ in range(height):
+        row = []
+        for _ in range(width):
+            dice = generator.random()
+            if dice < object_ratio:
+                row.append(generator.choice(icegauntlettool.AVAILABLE_OBJECT_IDS))
+            elif dice < 0.3:
+                row.append(generator.choice(WALL_TILES))
+            elif dice < 0.4:
+                row.append(icegauntlettool.NULL_TILE)
+            else:
+                row.append(icegauntlettool.EMPTY_TILE)
+        data.append(row)
+    return json.dumps({'room': 'benchmark', 'data': data})
+
+
+def _classic_get_map_objects_(room):
+    # Original get_map_objects(): linear scan of the object list per tile
+    room = json.loads(room)
+    objects = []
+    row = 0
+    for map_row in room['data']:
+        column = 0
+        for tile in map_row:
+            if tile in icegauntlettool.AVAILABLE_OBJECT_IDS:
+                objects.append((tile, (column, row)))
+            column += 1
+        row += 1
+    return objects
+
+
+def _classic_filter_map_objects_(room):
+    # Original filter_map_objects(): linear scan of the object list per tile
+    room = json.loads(room)
+    filtered_map = []
+    for row in room['data']:
+        filtered_row = []
+        for tile in row:
+            if (
+                    (tile in icegauntlettool.AVAILABLE_OBJECT_IDS) or
+                    (tile == icegauntlettool.NULL_TILE)
+            ):
+                filtered_row.append(icegauntlettool.EMPTY_TILE)
+            else:
+                filtered_row.append(tile)
+        filtered_map.append(filtered_row)
+    room['data'] = filtered_map
+    return json.dumps(room)
+
+
+def _classic_(room_data):
+    _classic_get_map_objects_(room_data)
+    _classic_filter_map_objects_(room_data)
+
+
+def _pair_(room_data):
+    icegauntlettool.get_map_objects(room_data)
+    icegauntlettool.filter_map_objects(room_data)
+
+
+def _inspect_pure_(room_data):
+    numpy = icegauntlettool.numpy
+    icegauntlettool.numpy = None
+    try:
+        icegauntlettool.inspect_room(room_data)
+    finally:
+        icegauntlettool.numpy = numpy
+
+
+def _best_time_(function, rooms, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for room_data in rooms:
+            function(room_data)
+        elapsed = (time.perf_counter() - start) / len(rooms)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(size=256, rooms=4, repeat=3):
+    '''Run benchmark, return results as a dict of seconds per room'''
+    room_set = [generate_room(size, size, seed=seed) for seed in range(rooms)]
+    results = {
+        'classic': _best_time_(_classic_, room_set, repeat),
+        'pair': _best_time_(_pair_, room_set, repeat),
+        'inspect_room': _best_time_(_inspect_pure_, room_set, repeat)
+    }
+    if icegauntlettool.numpy is not None:
+        results['inspect_room_numpy'] = _best_time_(icegauntlettool.inspect_room, room_set, repeat)
+    # Times faster than the classic pair
+    results['speedup'] = {
+        case: results['classic'] / seconds
+        for case, seconds in results.items() if case != 'classic'
+    }
+    return results
+
+
+def parse_commandline():
+    '''Parse and check commandline'''
+    parser = argparse.ArgumentParser('Room validation benchmark')
+    parser.add_argument('--size', type=int, default=256, help='Width/height of rooms')
+    parser.add_argument('--rooms', type=int, default=4, help='Number of generated rooms')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetitions, best is reported')
+    return parser.parse_args()
+
+
+def main():
+    '''Run benchmark according to commandline'''
+    options = parse_commandline()
+    print(json.dumps(run(options.size, options.rooms, options.repeat), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Benchmark of the multi-process area scheduler
+
+    The same areas and synthetic players are hosted with 1, 2... N worker
+    processes. Areas are ticked as fast as possible (or at a fixed rate) and
+    the total ticks per second shows how throughput scales with the cores.
+    Runs with more workers than cores are reported but no speedup is given.
+    Also measures the cost of sending one event to a worker and back through
+    the scheduler queues.
+'''
+
+import os
+import sys
+import json
+import time
+import pickle
+import argparse
+import multiprocessing
+
+import headless
+headless.install()
+
+# pylint: disable=C0413
+import game.server
+import game.scheduler
+import game.transport
+from area_server import SyntheticPlayer, area_map
+# pylint: enable=C0413
+
+
+# Frames per second of the synthetic clients
+CLIENT_RATE = game.server.TICK_RATE
+# Events sent to measure the cost of the queues
+IPC_EVENTS = 20000
+
+
+def _echo_(commands, results):
+    # Worker stand-in: send back every message until None is received
+    for message in iter(commands.get, None):
+        results.put(message)
+
+
+def ipc_cost(events=IPC_EVENTS):
+    '''Microseconds per event sent to a worker process and back (as the scheduler does)'''
+    context = multiprocessing.get_context('fork')
+    commands, results = context.Queue(), context.Queue()
+    worker = context.Process(target=_echo_, args=(commands, results), daemon=True)
+    worker.start()
+    event = pickle.dumps(('set_direction', 1234, 1, 0))
+    message = ('event', 'channel', event, 'sender')
+    start = time.perf_counter()
+    for _ in range(events):
+        commands.put(message)
+    for _ in range(events):
+        results.get()
+    elapsed = time.perf_counter() - start
+    commands.put(None)
+    worker.join()
+    return elapsed * 1000000.0 / events
+
+
+def run(workers, areas=8, players=4, size=64, items=50, seconds=5.0, tick_rate=None, seed=0,
+        pin=True):
+    '''Host areas in a pool of workers with synthetic players, return statistics'''
+    transport = game.transport.LoopbackTransport()
+    scheduler = game.scheduler.AreaScheduler(
+        transport, tick_rate=tick_rate, workers=workers, pin=pin
+    )
+    clients = []
+    for area_number in range(areas):
+        area = scheduler.host(area_map(size, items, seed=seed + area_number))
+        clients.extend(
+            SyntheticPlayer(
+                transport, area.channel, seed=(seed + area_number) * players + player_number
+            )
+            for player_number in range(players)
+        )
+
+    # Clients run in the main process, between the messages of the workers
+    start = next_frame = time.perf_counter()
+    while True:
+        now = time.perf_counter()
+        if now - start >= seconds:
+            break
+        if now < next_frame:
+            scheduler.poll(timeout=next_frame - now)
+            continue
+        for client in clients:
+            client.update()
+        next_frame += 1.0 / CLIENT_RATE
+    scheduler.stop()
+    elapsed = time.perf_counter() - start
+
+    stats = scheduler.stats()
+    ticks = sum(area['ticks'] for area in stats['areas'].values())
+    return {
+        'workers': workers,
+        'ticks_per_second': ticks / elapsed,
+        'min_area_tps': min(area['ticks'] for area in stats['areas'].values()) / elapsed,
+        'late_ticks': stats['late_ticks'],
+        'migrations': stats['migrations'],
+        'worker_loads': [worker['load'] for worker in stats['workers']],
+        'resolved_events': sum(client.received for client in clients)
+    }
+
+
+def scaling(max_workers, **options):
+    '''Run benchmark from 1 to max_workers processes'''
+    cpus = os.cpu_count() or 1
+    results = [run(workers, **options) for workers in range(1, max_workers + 1)]
+    for result in results:
+        # More workers than cores only measure the overhead of sharing them
+        result['oversubscribed'] = result['workers'] > cpus
+        result['speedup'] = None if result['oversubscribed'] else (
+            result['ticks_per_second'] / results[0]['ticks_per_second']
+        )
+    return {
+        'cpus': cpus,
+        'ipc_us_per_event': ipc_cost(),
+        'runs': results
+    }
+
+
+def parse_commandline():
+    '''Parse and check commandline'''
+    parser = argparse.ArgumentParser('Area scheduler benchmark')
+    parser.add_argument(
+        '--workers', type=int, default=os.cpu_count() or 1,
+        help='Maximum number of worker processes'
+    )
+    parser.add_argument('--areas', type=int, default=8, help='Hosted areas')
+    parser.add_argument('--players', type=int, default=4, help='Players per area')
+    parser.add_argument('--size', type=int, default=64, help='Width/height of areas (tiles)')
+    parser.add_argument('--items', type=int, default=50, help='Items per area')
+    parser.add_argument('--seconds', type=float, default=5.0, help='Duration of every run')
+    parser.add_argument(
+        '--tick-rate', type=int, default=None,
+        help='Ticks per second of every area (default: as fast as possible)'
+    )
+    parser.add_argument(
+        '--no-pin', action='store_true', help='Do not pin every worker to one core'
+    )
+    options = parser.parse_args()
+    if options.workers < 1:
+        parser.error('At least one worker is needed')
+    if options.workers > (os.cpu_count() or 1):
+        print(
+            'Warning: {} workers but only {} cores, scaling cannot be measured'.format(
+                options.workers, os.cpu_count() or 1
+            ), file=sys.stderr
+        )
+    return options
+
+
+def main():
+    '''Run benchmark according to commandline'''
+    options = parse_commandline()
+    print(json.dumps(scaling(
+        options.workers, areas=options.areas, players=options.players, size=options.size,
+        items=options.items, seconds=options.seconds, tick_rate=options.tick_rate,
+        pin=not options.no_pin
+    ), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
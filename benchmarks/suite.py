@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Benchmark suite of the engine hot paths, runs headless
+
+    Every case reports the best time (seconds per call) of several repetitions.
+    Results can be saved as baseline and later runs compared against it: a case
+    slower than the baseline by more than the tolerance is a regression.
+'''
+
+import os
+import sys
+import json
+import time
+import pickle
+import random
+import argparse
+
+import headless
+headless.install()
+
+# pylint: disable=C0413
+import icegauntlettool
+import game.room
+import game.sync
+import game.layer
+import game.heroes
+import game.steers
+import game.objects
+import game.handles
+import game.pyxeltools
+from game.common import OBJECT_TYPE, WARRIOR, KEY, TREASURE, HAM, JAR, X, Y, DIR_X, DIR_Y,\
+    STATE, LIFE, SCORE, WALL_TILES, EMPTY_TILE
+from game.pyxeltools import TILE_SIZE
+# pylint: enable=C0413
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_TOLERANCE = 0.25
+# Largest map (tiles) fitting in a pyxel tilemap
+MAX_MAP_SIZE = 128
+
+# Horizontal door open to both sides
+_CORRIDOR_DOOR_ = 28
+_ITEMS_ = [KEY, TREASURE, HAM, JAR]
+
+
+def _best_(function, repeat, number=1, setup=None):
+    '''Best time per call of function(context), context is returned by setup()'''
+    # Warm up (caches, allocator) before timing
+    function(setup() if setup else None)
+    best = None
+    for _ in range(repeat):
+        context = setup() if setup else None
+        start = time.perf_counter()
+        for _ in range(number):
+            function(context)
+        elapsed = (time.perf_counter() - start) / number
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _free_tiles_(room):
+    return [
+        (x, y) for y, row in enumerate(room._passable_tiles_()) # pylint: disable=W0212
+        for x, free in enumerate(row) if free
+    ]
+
+
+def _make_room_(size, items=0, seed=0):
+    generator = random.Random(seed)
+    random.seed(seed)
+    room = game.room.Room(headless.generate_map(size, size, seed=seed), headless.Level())
+    free_tiles = _free_tiles_(room)
+    hero = game.heroes.new(room.handles.new(), {OBJECT_TYPE: WARRIOR})
+    room.spawn(hero, tuple(coordinate * TILE_SIZE for coordinate in free_tiles[0]))
+    hero.steer = game.steers.new('Random')
+    for item_number in range(items):
+        tile_x, tile_y = generator.choice(free_tiles)
+        room.spawn(
+            game.objects.new(_ITEMS_[item_number % len(_ITEMS_)], room.handles.new()),
+            (tile_x * TILE_SIZE, tile_y * TILE_SIZE)
+        )
+    return room, hero
+
+
+def case_tilemap_layer(options):
+    '''TileMapLayer() construction'''
+    data = headless.generate_map(options.size, options.size, seed=0)
+    return _best_(lambda _: game.layer.TileMapLayer(data, mask=0), options.repeat)
+
+
+def case_walls_collisions(options):
+    '''Room._compute_walls_collisions_()'''
+    room, _ = _make_room_(options.size)
+    return _best_(
+        lambda _: room._compute_walls_collisions_(), options.repeat # pylint: disable=W0212
+    )
+
+
+def case_room_update(options):
+    '''Room.update() with some items and a moving hero'''
+    room, _ = _make_room_(options.size, options.items)
+    return _best_(lambda _: room.update(), options.repeat, number=options.frames)
+
+
+def case_ground_fit(options):
+    '''Box.ground_fit() of a hero'''
+    _, hero = _make_room_(options.size)
+    return _best_(lambda _: hero.body.ground_fit(), options.repeat, number=1000)
+
+
+def _door_corridor_room_(length):
+    # Map wide enough for a corridor of doors in the middle row
+    width = length + 2
+    if width > MAX_MAP_SIZE:
+        raise ValueError('Corridor must be shorter than {} doors'.format(MAX_MAP_SIZE - 1))
+    data = headless.generate_map(width, 3, wall_ratio=0.0)
+    room = game.room.Room(data, headless.Level())
+    doors = []
+    for column in range(1, length + 1):
+        door = game.objects.new(_CORRIDOR_DOOR_, room.handles.new())
+        room.spawn(door, (column * TILE_SIZE, TILE_SIZE))
+        doors.append(door.identifier)
+    return room, doors
+
+
+def case_open_door(options):
+    '''Room.open_door() of a long corridor of doors'''
+    def _open_(context):
+        room, doors = context
+        room.open_door(None, doors[len(doors) // 2])
+    return _best_(
+        _open_, options.repeat, setup=lambda: _door_corridor_room_(options.corridor)
+    )
+
+
+def case_set_tile(options):
+    '''Room.set_tile() raising and removing a wall (navigation caches built)'''
+    room, _ = _make_room_(options.size)
+    room.flow_field # pylint: disable=W0104
+    tile_x, tile_y = _free_tiles_(room)[-1]
+    def _toggle_(_):
+        room.set_tile(tile_x, tile_y, WALL_TILES[0])
+        room.set_tile(tile_x, tile_y, EMPTY_TILE)
+    return _best_(_toggle_, options.repeat, number=100) / 2
+
+
+def case_load_json_map(options):
+    '''load_json_map() of a large map (JSON string)'''
+    room_data = headless.generate_json_map(options.size, options.size, seed=0)
+    return _best_(lambda _: game.pyxeltools.load_json_map(room_data), options.repeat)
+
+
+def case_tool_extraction(options):
+    '''icegauntlettool.inspect_room() of a large map'''
+    room_data = headless.generate_json_map(options.size, options.size, seed=0)
+    return _best_(lambda _: icegauntlettool.inspect_room(room_data), options.repeat)
+
+
+def _events_(count):
+    handles = game.handles.HandleTable()
+    generator = random.Random(0)
+    events = []
+    for number in range(count):
+        handle = handles.new()
+        kind = number % 4
+        if kind == 0:
+            events.append(('set_direction', handle, generator.randint(-1, 1), 0))
+        elif kind == 1:
+            events.append(('kill_object', handle))
+        elif kind == 2:
+            events.append(('increase_attribute', handle, SCORE, 100))
+        else:
+            events.append(('open_door', handle, handles.new()))
+    return handles, events
+
+
+def case_event_codec(options):
+    '''Events translated to network identifiers, pickled and back (as RemoteArea)'''
+    handles, events = _events_(options.events)
+    def _codec_(_):
+        for event in events:
+            handles.from_network(pickle.loads(pickle.dumps(handles.to_network(event))))
+    return _best_(_codec_, options.repeat) / len(events)
+
+
+def case_snapshot_codec(options):
+    '''Actor snapshots encoded and decoded'''
+    def _codec_(context):
+        encoder, decoder = context
+        for frame in range(options.frames):
+            attributes = {
+                X: frame * 2, Y: 100, DIR_X: 1, DIR_Y: 0, STATE: 'right', LIFE: 300,
+                SCORE: 0, 'speed': 2
+            }
+            snapshot = encoder.encode('actor', attributes, timestamp=frame / 30.0)
+            if snapshot:
+                decoder.decode('actor', *snapshot)
+    return _best_(
+        _codec_, options.repeat,
+        setup=lambda: (game.sync.SnapshotEncoder(), game.sync.SnapshotDecoder())
+    ) / options.frames
+
+
+CASES = {
+    'tilemap_layer': case_tilemap_layer,
+    'walls_collisions': case_walls_collisions,
+    'room_update': case_room_update,
+    'ground_fit': case_ground_fit,
+    'open_door': case_open_door,
+    'set_tile': case_set_tile,
+    'load_json_map': case_load_json_map,
+    'tool_extraction': case_tool_extraction,
+    'event_codec': case_event_codec,
+    'snapshot_codec': case_snapshot_codec
+}
+
+_PARAMETERS_ = ['size', 'items', 'frames', 'corridor', 'events']
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    '''Compare results with a baseline, return a dict per case'''
+    comparison = {}
+    for case, seconds in results.items():
+        reference = baseline.get(case, None)
+        if not reference:
+            continue
+        ratio = seconds / reference
+        comparison[case] = {
+            'baseline': reference,
+            'ratio': ratio,
+            'regression': ratio > (1.0 + tolerance)
+        }
+    return comparison
+
+
+def run(options):
+    '''Run selected cases, return results as a dict of seconds per call'''
+    return {case: CASES[case](options) for case in (options.cases or CASES)}
+
+
+def parse_commandline():
+    '''Parse and check commandline'''
+    parser = argparse.ArgumentParser('Engine benchmark suite')
+    parser.add_argument(
+        '--only', action='append', choices=list(CASES), default=[], dest='cases',
+        help='Run only this case (can be repeated, all cases by default)'
+    )
+    parser.add_argument('--size', type=int, default=128, help='Width/height of maps (tiles)')
+    parser.add_argument('--items', type=int, default=200, help='Items in Room.update()')
+    parser.add_argument('--frames', type=int, default=30, help='Frames per repetition')
+    parser.add_argument('--corridor', type=int, default=120, help='Doors in the corridor')
+    parser.add_argument('--events', type=int, default=1000, help='Events per repetition')
+    parser.add_argument('--repeat', type=int, default=7, help='Repetitions, best is reported')
+    parser.add_argument(
+        '--baseline', default=DEFAULT_BASELINE, help='Baseline file to compare with'
+    )
+    parser.add_argument(
+        '--save-baseline', action='store_true', default=False,
+        help='Store results as the new baseline instead of comparing'
+    )
+    parser.add_argument(
+        '--tolerance', type=float, default=DEFAULT_TOLERANCE,
+        help='Allowed slowdown against baseline (0.25 means 25%%)'
+    )
+    return parser.parse_args()
+
+
+def main():
+    '''Run suite according to commandline, exit with error if there are regressions'''
+    options = parse_commandline()
+    parameters = {parameter: getattr(options, parameter) for parameter in _PARAMETERS_}
+    report = {'parameters': parameters, 'results': run(options)}
+
+    if options.save_baseline:
+        with open(options.baseline, 'w') as contents:
+            json.dump(report, contents, indent=2)
+        print(json.dumps(report, indent=2))
+        return 0
+
+    if os.path.exists(options.baseline):
+        with open(options.baseline, 'r') as contents:
+            baseline = json.load(contents)
+        if baseline.get('parameters', {}) != parameters:
+            print('Warning: baseline was taken with other parameters', file=sys.stderr)
+        report['comparison'] = compare(
+            report['results'], baseline.get('results', {}), options.tolerance
+        )
+    print(json.dumps(report, indent=2))
+    regressions = [
+        case for case, result in report.get('comparison', {}).items() if result['regression']
+    ]
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -12,6 +12,7 @@ import uuid
 import random
 
 import game.pyxeltools
+from game.handles import HandleTable
 from game.common import LIFE, LEVEL_COUNT, AVAILABLE_OBJECT_IDS, EMPTY_TILE, NULL_TILE, HEROES,\
     OBJECT_CLASS, OBJECT_TYPE, IDENTIFIER
 from game.pyxeltools import TILE_SIZE, load_json_map
@@ -95,8 +96,12 @@ class DungeonMap:
 
 
 class LocalArea:
+    # Game logic is resolved by the local orchestration
+    authoritative = False
+
     def __init__(self, level):
         self.event_handler = self.__discard_event__
+        self.handles = HandleTable()
         self.roomName, self.author, roomData = load_json_map(level)
         self.objects = []
         self.roomData = []
@@ -107,7 +112,7 @@ class LocalArea:
             for tile in row:
                 if (tile in AVAILABLE_OBJECT_IDS):
                     filteredRow.append(EMPTY_TILE)
-                    self.objects.append((str(uuid.uuid4()), tile, (x, y)))
+                    self.objects.append((self.handles.new(), tile, (x, y)))
                 elif (tile == NULL_TILE):
                     filteredRow.append(EMPTY_TILE)
                 else:
@@ -129,6 +134,10 @@ class LocalArea:
         if not only_local:
             self.event_handler(event)
 
+    def set_viewport(self, camera_position, focus_position):
+        '''Local areas have no event channel to filter'''
+        pass
+
     def abandon(self):
         pass
 
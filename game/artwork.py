@@ -49,6 +49,36 @@ ELF_LEFT = (93, 101, 109)
 ELF_UP_LEFT = (94, 102, 110)
 ELF_EXIT = (111, 112, 113, 114, 115)
 
+# Ghost
+GHOST_UP = (0, 8, 16)
+GHOST_UP_RIGHT = (1, 9, 17)
+GHOST_RIGHT = (2, 10, 18)
+GHOST_DOWN_RIGHT = (3, 11, 19)
+GHOST_DOWN = (4, 12, 20)
+GHOST_DOWN_LEFT = (5, 13, 21)
+GHOST_LEFT = (6, 14, 22)
+GHOST_UP_LEFT = (7, 15, 23)
+
+# Grunt
+GRUNT_UP = (24, 32, 40)
+GRUNT_UP_RIGHT = (25, 33, 41)
+GRUNT_RIGHT = (26, 34, 42)
+GRUNT_DOWN_RIGHT = (27, 35, 43)
+GRUNT_DOWN = (28, 36, 44)
+GRUNT_DOWN_LEFT = (29, 37, 45)
+GRUNT_LEFT = (30, 38, 46)
+GRUNT_UP_LEFT = (31, 39, 47)
+
+# Demon
+DEMON_UP = (48, 56, 64)
+DEMON_UP_RIGHT = (49, 57, 65)
+DEMON_RIGHT = (50, 58, 66)
+DEMON_DOWN_RIGHT = (51, 59, 67)
+DEMON_DOWN = (52, 60, 68)
+DEMON_DOWN_LEFT = (53, 61, 69)
+DEMON_LEFT = (54, 62, 70)
+DEMON_UP_LEFT = (55, 63, 71)
+
 # Smoke
 SMOKE = (41, 42, 43)
 EXPLOSION = (109, 110, 111)
@@ -34,6 +34,24 @@ WALL_TILES = list(range(0, 16))
 
 # Doors
 DOORS = list(range(19, 34))
+# Neighbour doors (in tiles) connected to every door tile
+DOOR_DIRECTIONS = {
+    19: [(0, -1)],
+    20: [(1, 0)],
+    21: [(0, -1), (1, 0)],
+    22: [(0, 1)],
+    23: [(0, -1), (0, 1)],
+    24: [(1, 0), (0, 1)],
+    25: [(0, -1), (1, 0), (0, 1)],
+    26: [(-1, 0)],
+    27: [(-1, 0), (0, -1)],
+    28: [(-1, 0), (1, 0)],
+    29: [(0, -1), (-1, 0), (1, 0)],
+    30: [(-1, 0), (0, 1)],
+    31: [(0, -1), (-1, 0), (0, 1)],
+    32: [(-1, 0), (0, 1), (1, 0)],
+    33: [(0, -1), (-1, 0), (0, 1), (1, 0)]
+}
 
 # Key
 KEY = 119
@@ -64,7 +82,13 @@ WIZARD_SPAWN = DEFAULT_SPAWN + 3
 ELF_SPAWN = DEFAULT_SPAWN + 4
 SPAWN_IDS = [DEFAULT_SPAWN, WARRIOR_SPAWN, VALKYRIE_SPAWN, WIZARD_SPAWN, ELF_SPAWN]
 
-AVAILABLE_OBJECT_IDS = [KEY, TREASURE, EXIT, TELEPORT, HAM, JAR] + DOORS + SPAWN_IDS
+# Enemy generators
+GRUNT_GENERATOR = 124
+DEMON_GENERATOR = 125
+GHOST_GENERATOR = 126
+GENERATORS = [GHOST_GENERATOR, GRUNT_GENERATOR, DEMON_GENERATOR]
+
+AVAILABLE_OBJECT_IDS = [KEY, TREASURE, EXIT, TELEPORT, HAM, JAR] + DOORS + SPAWN_IDS + GENERATORS
 
 # Actors #
 
@@ -82,6 +106,12 @@ HEROES_SPAWN = {
     ELF: ELF_SPAWN
 }
 
+# Enemies
+GHOST = 'ghost'
+GRUNT = 'grunt'
+DEMON = 'demon'
+ENEMY_TYPES = [GHOST, GRUNT, DEMON]
+
 # Game states #
 INITIAL_SCREEN = 'initial_screen'
 STATUS_SCREEN = 'stats_screen'
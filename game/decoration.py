@@ -18,7 +18,7 @@ _DECORATIONS_ = {
 }
 
 
-def new(decoration, position):
+def new(decoration, position, identifier=None):
     '''Create new decoration object'''
     speed, frames = _DECORATIONS_[decoration]
-    return Decoration(animation(MAP_ENTITIES, speed, frames), position)
+    return Decoration(animation(MAP_ENTITIES, speed, frames), position, identifier)
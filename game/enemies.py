@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+''' Enemies factory '''
+
+from game.common import GHOST, GRUNT, DEMON, OBJECT_TYPE, SPEED, LIFE, DIR_X, DIR_Y, IDENTIFIER
+from game.game_object import Actor
+from game.bodies import Box
+from game.sprite import loop_animation
+from game.artwork import GHOST_UP, GHOST_DOWN, GHOST_LEFT, GHOST_RIGHT, GHOST_UP_LEFT,\
+    GHOST_DOWN_LEFT, GHOST_UP_RIGHT, GHOST_DOWN_RIGHT,\
+    GRUNT_UP, GRUNT_DOWN, GRUNT_LEFT, GRUNT_RIGHT, GRUNT_UP_LEFT,\
+    GRUNT_DOWN_LEFT, GRUNT_UP_RIGHT, GRUNT_DOWN_RIGHT,\
+    DEMON_UP, DEMON_DOWN, DEMON_LEFT, DEMON_RIGHT, DEMON_UP_LEFT,\
+    DEMON_DOWN_LEFT, DEMON_UP_RIGHT, DEMON_DOWN_RIGHT
+from game.pyxeltools import ENEMIES
+import game.steers
+
+
+# Animation frames, speed and life of every enemy type
+_ENEMY_TYPES_ = {
+    GHOST: (
+        (GHOST_UP, GHOST_UP_RIGHT, GHOST_RIGHT, GHOST_DOWN_RIGHT,
+         GHOST_DOWN, GHOST_DOWN_LEFT, GHOST_LEFT, GHOST_UP_LEFT), 1, 10
+    ),
+    GRUNT: (
+        (GRUNT_UP, GRUNT_UP_RIGHT, GRUNT_RIGHT, GRUNT_DOWN_RIGHT,
+         GRUNT_DOWN, GRUNT_DOWN_LEFT, GRUNT_LEFT, GRUNT_UP_LEFT), 1, 20
+    ),
+    DEMON: (
+        (DEMON_UP, DEMON_UP_RIGHT, DEMON_RIGHT, DEMON_DOWN_RIGHT,
+         DEMON_DOWN, DEMON_DOWN_LEFT, DEMON_LEFT, DEMON_UP_LEFT), 2, 30
+    )
+}
+
+_STATES_ = ['up', 'up_right', 'right', 'down_right', 'down', 'down_left', 'left', 'up_left']
+
+
+class Enemy(Actor):
+    '''An enemy actor, chases the heroes using the Horde steer'''
+    def __init__(self, animations, identifier):
+        super(Enemy, self).__init__(animations, identifier=identifier)
+        self.body = Box()
+        # EnemyPool() where the enemy returns when killed
+        self.pool = None
+        self.pooled = False
+
+    def recycle(self):
+        '''Restore initial attributes, animations and steer'''
+        _, speed, life = _ENEMY_TYPES_[self.attribute[OBJECT_TYPE]]
+        self.attribute[SPEED] = speed
+        self.attribute[LIFE] = life
+        self.attribute[DIR_X] = self.attribute[DIR_Y] = 0
+        self.rewind()
+        self.steer.reset()
+
+    def do_kill(self):
+        if self.pool:
+            self.pool.release(self)
+
+
+class EnemyPool:
+    '''Reuse killed Enemy() instances instead of creating new ones'''
+    def __init__(self, handles):
+        self._handles_ = handles
+        self._free_ = {enemy_type: [] for enemy_type in _ENEMY_TYPES_}
+        self._created_ = 0
+        self._reused_ = 0
+
+    def acquire(self, enemy_type):
+        '''Get a ready-to-spawn enemy of a given type, with a new handle'''
+        if enemy_type not in self._free_:
+            raise ValueError('Invalid enemy_type: {}'.format(enemy_type))
+        free = self._free_[enemy_type]
+        if free:
+            enemy = free.pop()
+            enemy.pooled = False
+            enemy.attribute[IDENTIFIER] = self._handles_.new()
+            enemy.recycle()
+            self._reused_ += 1
+            return enemy
+        self._created_ += 1
+        enemy = new(self._handles_.new(), {OBJECT_TYPE: enemy_type})
+        enemy.pool = self
+        return enemy
+
+    def release(self, enemy):
+        '''Return an enemy to the pool'''
+        if enemy.pooled:
+            return
+        enemy.pooled = True
+        self._free_[enemy.attribute[OBJECT_TYPE]].append(enemy)
+
+    @property
+    def stats(self):
+        '''Dict with created, reused and free enemies'''
+        return {
+            'created': self._created_,
+            'reused': self._reused_,
+            'free': sum(len(free) for free in self._free_.values())
+        }
+
+
+def new(actor_identifier=None, attributes=None):
+    '''Enemy factory'''
+    attributes = attributes or {}
+    enemy_type = attributes.get(OBJECT_TYPE, None)
+    if enemy_type not in _ENEMY_TYPES_:
+        raise ValueError('Invalid enemy_type: {}'.format(enemy_type))
+    frames, speed, life = _ENEMY_TYPES_[enemy_type]
+    animations = {
+        state: loop_animation(ENEMIES, 4, state_frames)
+        for state, state_frames in zip(_STATES_, frames)
+    }
+    animations['stand_by'] = loop_animation(ENEMIES, 4, [frames[4][0]])
+    new_actor = Enemy(animations, actor_identifier)
+    new_actor.attribute[SPEED] = speed
+    new_actor.attribute[LIFE] = life
+    new_actor.attribute.update(attributes)
+    new_actor.steer = game.steers.new('Horde')
+    return new_actor
@@ -21,7 +21,7 @@ class GameObject:
         self._body_ = None
         self._room_ = None
         self.attribute = {
-            IDENTIFIER: identifier or str(uuid.uuid4()),
+            IDENTIFIER: identifier if identifier is not None else str(uuid.uuid4()),
             X: initial_position[0],
             Y: initial_position[1]
         }
@@ -114,8 +114,8 @@ class GameObject:
 
 class Decoration(GameObject):
     '''GameObject with a single animation that is killed as soon as animation ends'''
-    def __init__(self, animation, initial_position=(0, 0)):
-        super(Decoration, self).__init__(initial_position, identifier=None)
+    def __init__(self, animation, initial_position=(0, 0), identifier=None):
+        super(Decoration, self).__init__(initial_position, identifier)
         self._animation_ = animation
         self._animation_.reset()
         self._ready_to_kill_ = False
@@ -261,6 +261,12 @@ class Actor(GameObject):
         '''Restart actor state'''
         self.state = _STANDBY_
 
+    def rewind(self):
+        '''Restart every animation and go back to initial state, even out of a room'''
+        for animation in self.__anims__.values():
+            animation.reset()
+        self.__current_state__ = _STANDBY_
+
     @property
     def state(self):
         '''Get current actor state'''
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Compact integer identifiers (handles) for objects of a room
+
+    A handle packs a slot number and a generation counter, so handles of killed
+    objects are never confused with new objects using the same slot. Network
+    identifiers (UUID strings) are used only when events leave the area.
+'''
+
+import uuid
+
+from game.common import IDENTIFIER
+
+
+GENERATION_BITS = 8
+_GENERATION_MASK_ = (1 << GENERATION_BITS) - 1
+# Slot 0 is never used: handles 0 and 1 are equal to False and True in Room.block
+FIRST_SLOT = 1
+
+# Positions of object identifiers in every event
+IDENTIFIER_FIELDS = {
+    'spawn_actor': (1,),
+    'spawn_object': (1,),
+    'kill_object': (1,),
+    'open_door': (1, 2),
+    'set_attribute': (1,),
+    'increase_attribute': (1,),
+    'warp_to': (1,),
+    'set_state': (1,),
+    'set_direction': (1,),
+    'actor_snapshot': (1,),
+    'sync_actor': (1,),
+    'collision': (1, 2)
+}
+# Events that create objects, the only ones that allocate handles for unknown identifiers
+SPAWN_EVENTS = ('spawn_actor', 'spawn_object')
+
+
+def slot_of(handle):
+    '''Slot of a given handle'''
+    return handle >> GENERATION_BITS
+
+
+def generation_of(handle):
+    '''Generation of a given handle'''
+    return handle & _GENERATION_MASK_
+
+
+class HandleTable:
+    '''Allocates handles and maps them to network identifiers'''
+    def __init__(self, first_slot=FIRST_SLOT):
+        if first_slot < FIRST_SLOT:
+            raise ValueError('Slots below {} are reserved'.format(FIRST_SLOT))
+        # Live handle of every slot (None if free) and last generation used
+        self._first_slot_ = first_slot
+        self._handles_ = [None] * first_slot
+        self._generations_ = [0] * first_slot
+        self._free_ = []
+        self._network_ids_ = {}
+        self._local_handles_ = {}
+
+    def __len__(self):
+        return len(self._handles_) - self._first_slot_ - len(self._free_)
+
+    def new(self, network_id=None):
+        '''Allocate a new handle, optionally bound to a network identifier'''
+        if self._free_:
+            slot = self._free_.pop()
+            self._generations_[slot] = (self._generations_[slot] + 1) & _GENERATION_MASK_
+        else:
+            slot = len(self._handles_)
+            self._handles_.append(None)
+            self._generations_.append(0)
+        handle = (slot << GENERATION_BITS) | self._generations_[slot]
+        self._handles_[slot] = handle
+        if network_id is not None:
+            self._network_ids_[handle] = network_id
+            self._local_handles_[network_id] = handle
+        return handle
+
+    def alive(self, handle):
+        '''Return if the handle is currently allocated'''
+        if not isinstance(handle, int):
+            return False
+        slot = slot_of(handle)
+        return (self._first_slot_ <= slot < len(self._handles_)) and (self._handles_[slot] == handle)
+
+    def release(self, handle):
+        '''Free a handle, unknown handles are ignored'''
+        if not self.alive(handle):
+            return
+        slot = slot_of(handle)
+        self._handles_[slot] = None
+        self._free_.append(slot)
+        network_id = self._network_ids_.pop(handle, None)
+        if network_id is not None:
+            del self._local_handles_[network_id]
+
+    def handle(self, network_id):
+        '''Handle of a network identifier, allocated if unknown'''
+        handle = self._local_handles_.get(network_id, None)
+        if handle is None:
+            handle = self.new(network_id)
+        return handle
+
+    def network_id(self, handle):
+        '''Network identifier of a handle, created if the object was never sent'''
+        network_id = self._network_ids_.get(handle, None)
+        if (network_id is None) and self.alive(handle):
+            network_id = str(uuid.uuid4())
+            self._network_ids_[handle] = network_id
+            self._local_handles_[network_id] = handle
+        return network_id if network_id is not None else handle
+
+    def to_network(self, event):
+        '''Replace handles in an event by network identifiers'''
+        return self._translate_(event, self.network_id)
+
+    def from_network(self, event):
+        '''
+            Replace network identifiers in an event by handles. Unknown identifiers
+            of events that do not create objects (late events of killed objects) are
+            kept untranslated, so no handle is allocated for them.
+        '''
+        if event[0] in SPAWN_EVENTS:
+            return self._translate_(event, self.handle)
+        return self._translate_(event, self._known_handle_)
+
+    def _known_handle_(self, network_id):
+        return self._local_handles_.get(network_id, network_id)
+
+    def _translate_(self, event, translate):
+        fields = IDENTIFIER_FIELDS.get(event[0], None)
+        if not fields:
+            return event
+        event = list(event)
+        for field in fields:
+            event[field] = translate(event[field])
+        if (event[0] == 'spawn_actor') and isinstance(event[2], dict) and (IDENTIFIER in event[2]):
+            event[2] = dict(event[2])
+            event[2][IDENTIFIER] = event[1]
+        return tuple(event)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Area of interest: split the event channel of an area in spatial cells
+'''
+
+from game.pyxeltools import SCREEN_WIDTH, SCREEN_HEIGHT
+
+
+# Size of every cell in pixels: one screen
+CELL_WIDTH = SCREEN_WIDTH
+CELL_HEIGHT = SCREEN_HEIGHT
+# Extra cells subscribed around the visible ones
+DEFAULT_MARGIN = 1
+
+# Following events are only relevant near the actor who fires them,
+# any other event is sent to the whole area
+POSITIONAL_EVENTS = ['actor_snapshot', 'set_direction']
+
+
+def cell_at(position):
+    '''Cell that contains a given position (in pixels)'''
+    return (int(position[0] // CELL_WIDTH), int(position[1] // CELL_HEIGHT))
+
+
+def cell_channel(channel, cell):
+    '''Name of the event channel of a cell in a given area channel'''
+    return '{}.{}.{}'.format(channel, *cell)
+
+
+def area_cells(size):
+    '''All cells of an area of a given size (in pixels)'''
+    last_x, last_y = cell_at((max(0, size[0] - 1), max(0, size[1] - 1)))
+    return {(x, y) for x in range(last_x + 1) for y in range(last_y + 1)}
+
+
+def visible_cells(camera_position, margin=DEFAULT_MARGIN, area_size=None):
+    '''
+        Set of cells seen by a camera in a given position plus a margin, only
+        cells of the area if its size (in pixels) is given
+    '''
+    left, top = -camera_position[0], -camera_position[1]
+    first_x, first_y = cell_at((left, top))
+    last_x, last_y = cell_at((left + SCREEN_WIDTH - 1, top + SCREEN_HEIGHT - 1))
+    cells = {
+        (x, y)
+        for x in range(max(0, first_x - margin), last_x + margin + 1)
+        for y in range(max(0, first_y - margin), last_y + margin + 1)
+    }
+    if area_size is not None:
+        cells.intersection_update(area_cells(area_size))
+    return cells
+
+
+class InterestManager:
+    '''Keep track of the cells a client should be subscribed to'''
+    def __init__(self, margin=DEFAULT_MARGIN, area_size=None):
+        self._margin_ = margin
+        # Cells outside the area have no channel
+        self._area_size_ = area_size
+        self._cells_ = set()
+        self._focus_ = None
+
+    @property
+    def cells(self):
+        '''Current cells of interest'''
+        return set(self._cells_)
+
+    @property
+    def focus(self):
+        '''Cell of the local actor, None if unknown'''
+        return self._focus_
+
+    def update(self, camera_position, focus_position=None):
+        '''Compute new cells of interest, return (added, removed) cells'''
+        if focus_position is not None:
+            self._focus_ = cell_at(focus_position)
+        cells = visible_cells(camera_position, self._margin_, self._area_size_)
+        if self._focus_ is not None:
+            cells.add(self._focus_)
+        added = cells.difference(self._cells_)
+        removed = self._cells_.difference(cells)
+        self._cells_ = cells
+        return added, removed
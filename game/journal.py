@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Event journal: append-only log of the events consumed by the Level()
+
+    Every record is a pickled (tick, milliseconds, event) tuple, where tick is
+    the number of game loop iterations since the journal was opened. Files
+    ending with ".gz" are compressed.
+'''
+
+import gzip
+import time
+import pickle
+
+
+# First record of every room: identifier of the local player
+PLAYER_EVENT = 'journal_player'
+
+_PROTOCOL_ = pickle.HIGHEST_PROTOCOL
+
+
+def _open_(filename, mode):
+    if filename.endswith('.gz'):
+        return gzip.open(filename, mode)
+    return open(filename, mode)
+
+
+class JournalRecorder:
+    '''Write events to a journal file, does nothing until opened'''
+    def __init__(self, clock=time.perf_counter):
+        self.enabled = False
+        self.tick_count = 0
+        self.records = 0
+        self._clock_ = clock
+        self._started_ = 0.0
+        self._output_ = None
+
+    def open(self, filename):
+        '''Start recording, new records are appended to the given file'''
+        self.close()
+        self._output_ = _open_(filename, 'ab')
+        self._started_ = self._clock_()
+        self.tick_count = 0
+        self.records = 0
+        self.enabled = True
+
+    def close(self):
+        '''Stop recording and flush pending records'''
+        if self._output_ is not None:
+            self._output_.close()
+        self._output_ = None
+        self.enabled = False
+
+    def tick(self):
+        '''A game loop iteration has started'''
+        if self.enabled:
+            self.tick_count += 1
+
+    def player(self, identifier):
+        '''Store identifier of the local player'''
+        self.record((PLAYER_EVENT, identifier))
+
+    def record(self, event):
+        '''Append an event to the journal'''
+        if not self.enabled:
+            return
+        milliseconds = int((self._clock_() - self._started_) * 1000.0)
+        pickle.dump((self.tick_count, milliseconds, event), self._output_, protocol=_PROTOCOL_)
+        self.records += 1
+
+
+def read_journal(filename):
+    '''Iterate over the (tick, milliseconds, event) records of a journal'''
+    with _open_(filename, 'rb') as contents:
+        while True:
+            try:
+                yield pickle.load(contents)
+            except EOFError:
+                return
+
+
+# Recorder used by the engine
+JOURNAL = JournalRecorder()
@@ -11,6 +11,7 @@ import pyxel
 from game.common import EMPTY_TILE, AVAILABLE_OBJECT_IDS, NULL_TILE, WALL_TILES
 from game.pyxeltools import SCREEN_SIZE, TILE_SIZE, CELL_SIZE, FLOOR_TILEMAP, DECORATION_TILEMAP,\
     clear_tilemap, put_tile
+from game.artwork import NULL_CELL
 
 
 _SHADOW_ = [
@@ -22,7 +23,8 @@ _SHADOW_ = [
 class TileMapLayer:
     '''A simple TileMap layer wrapper class'''
     def __init__(self, tilemap_data, mask):
-        self._data_ = tilemap_data
+        # Own copy: tiles can be changed by set_tile()
+        self._data_ = [list(row) for row in tilemap_data]
         self._mask_ = mask
         self._objects_ = []
         self._compute_walls_()
@@ -55,13 +57,44 @@ class TileMapLayer:
         tiles_width, tiles_height = int(self.map_width / 2), int(self.map_height / 2)
         for y in range(1, tiles_height - 1):
             for x in range(1, tiles_width - 1):
-                wall_1 = 1 if self._data_[y][x - 1] in WALL_TILES else 0
-                wall_2 = 1 if self._data_[y + 1][x - 1] in WALL_TILES else 0
-                wall_3 = 1 if self._data_[y + 1][x] in WALL_TILES else 0
-                wall_distribution = (4 * wall_3) + (2 * wall_2) + wall_1
-                if (wall_distribution == 0) or (self._data_[y][x] in WALL_TILES):
-                    continue
-                put_tile(DECORATION_TILEMAP, _SHADOW_[wall_distribution], (x * 2, y * 2))
+                shadow = self._shadow_at_(x, y)
+                if shadow is not None:
+                    put_tile(DECORATION_TILEMAP, shadow, (x * 2, y * 2))
+
+    def _shadow_at_(self, x, y):
+        # Shadow tile cast on a tile by the walls at its left and bottom (None if no shadow)
+        wall_1 = 1 if self._data_[y][x - 1] in WALL_TILES else 0
+        wall_2 = 1 if self._data_[y + 1][x - 1] in WALL_TILES else 0
+        wall_3 = 1 if self._data_[y + 1][x] in WALL_TILES else 0
+        wall_distribution = (4 * wall_3) + (2 * wall_2) + wall_1
+        if (wall_distribution == 0) or (self._data_[y][x] in WALL_TILES):
+            return None
+        return _SHADOW_[wall_distribution]
+
+    def set_tile(self, x, y, tile):
+        '''Change a tile (tile coordinates), only the affected cells are updated'''
+        tiles_width, tiles_height = int(self.map_width / 2), int(self.map_height / 2)
+        if not ((0 <= x < tiles_width) and (0 <= y < tiles_height)):
+            raise ValueError('position out of the map')
+        if tile in AVAILABLE_OBJECT_IDS:
+            raise ValueError('Objects cannot be set as tiles: {}'.format(tile))
+        if tile == NULL_TILE:
+            tile = EMPTY_TILE
+        self._data_[y][x] = tile
+        put_tile(FLOOR_TILEMAP, tile, (x * 2, y * 2))
+        # A tile casts shadows over the tiles at its right and top
+        for shadow_x, shadow_y in [(x, y), (x + 1, y), (x, y - 1), (x + 1, y - 1)]:
+            if not ((1 <= shadow_x < tiles_width - 1) and (1 <= shadow_y < tiles_height - 1)):
+                continue
+            shadow = self._shadow_at_(shadow_x, shadow_y)
+            if shadow is not None:
+                put_tile(DECORATION_TILEMAP, shadow, (shadow_x * 2, shadow_y * 2))
+                continue
+            for y_ofs in [0, 1]:
+                for x_ofs in [0, 1]:
+                    pyxel.tilemap(DECORATION_TILEMAP).set(
+                        (shadow_x * 2) + x_ofs, (shadow_y * 2) + y_ofs, NULL_CELL
+                    )
 
     @property
     def width(self):
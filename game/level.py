@@ -15,18 +15,25 @@ import game.common
 import game.heroes
 import game.steers
 import game.sprite
+import game.sync
 import game.pyxeltools
+from game.profiler import PROFILER, UPDATE, ORCHESTRATION, RENDER
+from game.journal import JOURNAL
 
-from game.common import LIFE, LEVELS, LEVEL_COUNT,\
+from game.common import LIFE, LEVELS, LEVEL_COUNT, X, Y, DIR_X, DIR_Y, STATE,\
     STATUS_SCREEN, GAME_OVER_SCREEN, GOOD_END_SCREEN
 
 
+# Steer of actors controlled by remote peers ('Interpolated' draws them in the past)
+REMOTE_STEER = 'Network'
+
 _KEY_ = game.sprite.Raster(game.pyxeltools.MAP_ENTITIES, *game.pyxeltools.tile(game.common.OSD_KEY))
 
 
 class NoLevel:
     '''Dummy object used when no level is loaded'''
     game_objects = {}
+    decorations = {}
     def update(self):
         '''Do nothing'''
         pass
@@ -60,8 +67,10 @@ class Level(game.GameState):
 
     @property
     def identifier(self):
-        '''Unique game identifier'''
-        return self.parent.identifier
+        '''Handle of the player in the current room (unique game identifier if no room)'''
+        if self._orchestrator_ is None:
+            return self.parent.identifier
+        return self._orchestrator_.identifier
 
     @property
     def orchestrator(self):
@@ -73,8 +82,9 @@ class Level(game.GameState):
         '''Set the level orchestrator'''
         self._orchestrator_ = new_orchestrator
         self.fire_event = self.__fire_event__
-        self._orchestrator_.identifier = self.identifier
+        self._orchestrator_.identifier = new_orchestrator.handles.handle(self.parent.identifier)
         self._orchestrator_.level = self
+        JOURNAL.player(self._orchestrator_.identifier)
 
     def wake_up(self):
         game.pyxeltools.load_png_to_image_bank(
@@ -96,10 +106,16 @@ class Level(game.GameState):
         self._event_handler_ = event_handler
 
     def update(self):
+        JOURNAL.tick()
+        PROFILER.start(UPDATE)
+        PROFILER.start(ORCHESTRATION)
         self.orchestrator.update()
+        PROFILER.stop(ORCHESTRATION)
         self.room.update()
+        PROFILER.stop(UPDATE)
 
     def render(self):
+        PROFILER.start(RENDER)
         self.room.render()
         # OSD
         for k in range(self.room.game_objects[self.identifier].attribute.get(game.common.KEYS, 0)):
@@ -114,10 +130,15 @@ class Level(game.GameState):
             f"SCORE: {self.room.game_objects[self.identifier].attribute.get(game.common.SCORE, 0)}",
             10
         )
+        PROFILER.stop(RENDER)
+        if PROFILER.overlay:
+            for line_number, line in enumerate(PROFILER.overlay_lines()):
+                pyxel.text(96, 4 + (line_number * 8), line, 10)
+        PROFILER.end_frame(len(self.room.game_objects), len(self.room.decorations))
 
     def make_room(self, name, data, author):
         '''Room factory'''
-        self.room = game.room.Room(data, self)
+        self.room = game.room.Room(data, self, self._orchestrator_.handles)
 
     def end_current_room(self):
         '''End level'''
@@ -140,7 +161,7 @@ class Level(game.GameState):
             self.room.camera.set_target(actor)
             self.room.camera.warp_to(actor.position)
         else:
-            actor.steer = game.steers.new('Random')
+            actor.steer = game.steers.new(REMOTE_STEER)
         self.room.spawn_decoration('explosion', actor.position)
 
     def spawn_object(self, identifier, object_type, x, y):
@@ -199,6 +220,27 @@ class Level(game.GameState):
             return
         game_object.state = state
 
+    def sync_actor(self, identifier, state):
+        '''Apply the last known state of a remote actor'''
+        if identifier == self.identifier:
+            return
+        game_object = self.room.game_objects.get(identifier, None)
+        if not game_object:
+            return
+        if (X in state) and (Y in state) and hasattr(game_object.steer, 'synchronize'):
+            game_object.steer.synchronize(
+                (state[X], state[Y]), state.get(DIR_X, None), state.get(DIR_Y, None),
+                latency=game.sync.ASSUMED_LATENCY
+            )
+        for attribute, value in state.items():
+            if attribute in (X, Y, DIR_X, DIR_Y):
+                continue
+            if attribute == STATE:
+                if value and (value != game_object.state):
+                    game_object.state = value
+                continue
+            game_object.set_attribute(attribute, value)
+
     def __discard_event__(self, event, only_local=False):
         pass
     
@@ -208,6 +250,7 @@ class Level(game.GameState):
 
     def event_handler(self, event):
         '''Consume event from orchestrator'''
+        JOURNAL.record(event)
         event_type = event[0]
         event_parameters = event[1:]
         if event_type == 'load_room':
@@ -232,3 +275,5 @@ class Level(game.GameState):
             self.increase_game_object_attribute(*event_parameters)
         elif event_type == 'set_state':
             self.set_state(*event_parameters)
+        elif event_type == 'sync_actor':
+            self.sync_actor(*event_parameters)
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Synthetic load: many headless clients playing in remote areas
+
+    Every emulated client runs a Level() without window driven by a Random or
+    Seek steer. Areas are joined through a game.transport.Transport (Ice or
+    loopback) and the same events than dungeon_client are published. Events
+    sent by a client come back to it through the channel, the delay until
+    then is the latency of the event.
+'''
+
+import json
+import math
+import time
+import uuid
+import pickle
+import random
+import collections
+
+import game
+import game.level
+import game.interest
+import game.orchestration
+from game.common import HEROES, LIFE
+from game.handles import HandleTable
+from game.orchestration import RESOLVED_EVENTS
+from game.pyxeltools import load_json_map, TILE_SIZE
+from game.sync import FRAMES_PER_SECOND
+
+
+# Steers that can drive an emulated hero
+STEERS = ['Random', 'Seek']
+# Sent events not received back after these seconds are counted as lost
+PROBE_TIMEOUT = 5.0
+# Latency percentiles included in the reports
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(samples, rank):
+    '''Nearest-rank percentile of a sorted list (None if empty)'''
+    if not samples:
+        return None
+    return samples[max(0, int(math.ceil(rank / 100.0 * len(samples))) - 1)]
+
+
+class LoadStatistics:
+    '''Events sent and received by all the emulated clients'''
+    def __init__(self):
+        self.sent = collections.Counter()
+        self.sent_bytes = collections.Counter()
+        self.received = collections.Counter()
+        self.received_bytes = collections.Counter()
+        self.lost = collections.Counter()
+        self.latencies = collections.defaultdict(list)
+        self.frames = 0
+        self.late_frames = 0
+        self.joins = 0
+
+    def sent_event(self, event_type, size):
+        '''Count an event published by a client'''
+        self.sent[event_type] += 1
+        self.sent_bytes[event_type] += size
+
+    def received_event(self, event_type, size):
+        '''Count an event published by other peer'''
+        self.received[event_type] += 1
+        self.received_bytes[event_type] += size
+
+    def echoed_event(self, event_type, latency):
+        '''An event came back to its sender after given seconds'''
+        self.latencies[event_type].append(latency)
+
+    def lost_event(self, event_type):
+        '''An event never came back to its sender'''
+        self.lost[event_type] += 1
+
+    def report(self, elapsed):
+        '''Throughput and latency percentiles (in milliseconds) of every event type'''
+        events = {}
+        for event_type in sorted(set(self.sent) | set(self.received)):
+            latencies = sorted(self.latencies[event_type])
+            summary = {
+                'sent': self.sent[event_type],
+                'sent_per_second': self.sent[event_type] / elapsed,
+                'sent_bytes_per_second': self.sent_bytes[event_type] / elapsed,
+                'received': self.received[event_type],
+                'received_per_second': self.received[event_type] / elapsed,
+                'received_bytes_per_second': self.received_bytes[event_type] / elapsed,
+                'echoed': len(latencies),
+                'lost': self.lost[event_type]
+            }
+            for rank in PERCENTILES:
+                value = percentile(latencies, rank)
+                summary['p{}_ms'.format(rank)] = None if value is None else value * 1000.0
+            summary['max_ms'] = (latencies[-1] * 1000.0) if latencies else None
+            events[event_type] = summary
+        return {
+            'seconds': elapsed,
+            'frames_per_second': self.frames / elapsed,
+            'late_frames': self.late_frames,
+            'joins': self.joins,
+            'sent_per_second': sum(self.sent.values()) / elapsed,
+            'received_per_second': sum(self.received.values()) / elapsed,
+            'events': events
+        }
+
+
+class EmulatedArea:
+    '''Client side of a remote area, same behaviour than RemoteArea of dungeon_client'''
+    def __init__(self, remote_area, transport, statistics, client_id, follow_peers=True):
+        self.event_handler = self.__discard_event__
+        self.remote_area = remote_area
+        self.client_id = client_id
+        self.statistics = statistics
+        # If False, heroes of other clients are not simulated (much cheaper clients)
+        self.follow_peers = follow_peers
+        self._peers_ = set()
+        self.channel = remote_area.getEventChannel()
+        self.authoritative = remote_area.isAuthoritative()
+        # Room-local handles, network identifiers are used only on the event channel
+        self.handles = HandleTable()
+        self._transport_ = transport
+        # Sent events (pickled) waiting to be received back: (type, send time)
+        self._probes_ = {}
+        self._inbox_ = collections.deque()
+
+        # Areas send maps without objects, as to RemoteArea of dungeon_client
+        self.room_name, self.author, self.room_data = load_json_map(remote_area.getMap())
+        self.interest = game.interest.InterestManager(area_size=(
+            len(self.room_data[0]) * TILE_SIZE, len(self.room_data) * TILE_SIZE
+        ))
+        self.objects = [
+            (self.handles.handle(item.itemId), item.itemType, (item.positionX, item.positionY))
+            for item in remote_area.getItems()
+        ]
+        self.actors = [
+            self.handles.from_network(
+                ('spawn_actor', actor.actorId, json.loads(actor.attributes))
+            )[1:]
+            for actor in remote_area.getActors()
+        ]
+        if not follow_peers:
+            self._peers_.update(self.handles.network_id(actor[0]) for actor in self.actors)
+            self.actors = []
+
+        transport.subscribe(self.channel, self)
+
+    def set_viewport(self, camera_position, focus_position):
+        '''Subscribe only to the cell channels near the camera'''
+        added, removed = self.interest.update(camera_position, focus_position)
+        for cell in added:
+            self._transport_.subscribe(game.interest.cell_channel(self.channel, cell), self)
+        for cell in removed:
+            self._transport_.unsubscribe(game.interest.cell_channel(self.channel, cell), self)
+
+    def getMap(self): # pylint: disable=C0103
+        '''Map data of the area'''
+        return self.room_name, self.author, self.room_data
+
+    def getObjects(self): # pylint: disable=C0103
+        '''Objects in the area when it was joined'''
+        return self.objects
+
+    def getActors(self): # pylint: disable=C0103
+        '''Heroes in the area when it was joined'''
+        return self.actors
+
+    def fire_event(self, event, only_local=False):
+        '''Publish event, it is probed until it comes back through the channel'''
+        channel = self.channel
+        if (event[0] in game.interest.POSITIONAL_EVENTS) and (self.interest.focus is not None):
+            channel = game.interest.cell_channel(self.channel, self.interest.focus)
+        data = pickle.dumps(self.handles.to_network(event))
+        self.statistics.sent_event(event[0], len(data))
+        if data not in self._probes_:
+            self._probes_[data] = (event[0], self._transport_.now())
+        self._transport_.publish(channel, data, self.client_id)
+        if not only_local:
+            self.event_handler(event)
+
+    def receive(self, event, sender_id, sent_at=None): # pylint: disable=W0613
+        '''Event from the channel (may be called from other threads)'''
+        if sender_id == self.client_id:
+            probe = self._probes_.pop(event, None)
+            if probe:
+                self.statistics.echoed_event(probe[0], self._transport_.now() - probe[1])
+            return
+        self._inbox_.append(event)
+
+    def dispatch(self):
+        '''Handle the events received since last call'''
+        while self._inbox_:
+            data = self._inbox_.popleft()
+            event = pickle.loads(data)
+            self.statistics.received_event(event[0], len(data))
+            if not self.follow_peers:
+                if event[0] == 'spawn_actor':
+                    self._peers_.add(event[1])
+                # Doors opened by peers are open for everybody
+                if (event[1] in self._peers_) and (event[0] != 'open_door'):
+                    continue
+            if (event[0] == 'spawn_actor') and isinstance(event[2], str):
+                event = (event[0], event[1], json.loads(event[2]))
+            event = self.handles.from_network(event)
+            if event[0] in ['actor_snapshot', 'set_direction']:
+                self.event_handler(event)
+            elif self.authoritative:
+                if event[0] in RESOLVED_EVENTS:
+                    self.event_handler(event)
+            elif event[0] in ['spawn_actor', 'kill_object', 'open_door']:
+                self.event_handler(event)
+
+    def expire_probes(self, timeout=PROBE_TIMEOUT):
+        '''Count as lost the events not received back in time'''
+        now = self._transport_.now()
+        for data, (event_type, sent) in list(self._probes_.items()):
+            if now - sent > timeout:
+                if self._probes_.pop(data, None):
+                    self.statistics.lost_event(event_type)
+
+    def abandon(self):
+        '''Leave area: unsubscribe from all its channels'''
+        for cell in self.interest.cells:
+            self._transport_.unsubscribe(game.interest.cell_channel(self.channel, cell), self)
+        self._transport_.unsubscribe(self.channel, self)
+        self.expire_probes(timeout=0.0)
+
+    def __discard_event__(self, event):
+        pass
+
+
+class EmulatedLevel(game.level.Level):
+    '''Level() without window, the client decides what to do when the room ends'''
+    def wake_up(self):
+        self.orchestrator.start()
+
+    def render(self):
+        pass
+
+    def end_current_room(self):
+        self.parent.end_room()
+
+
+class EmulatedClient:
+    '''Headless player of a dungeon (also the parent of its Level())'''
+    def __init__(self, transport, statistics, hero_class=HEROES[0], steer=STEERS[0],
+                 follow_peers=True):
+        if steer not in STEERS:
+            raise ValueError('Invalid steer: {}'.format(steer))
+        self.identifier = str(uuid.uuid4())
+        # Game() interface: areas are fetched from the transport
+        self.dungeon = None
+        self.statistics = statistics
+        self.area = None
+        self.level = None
+        self._hero_class_ = hero_class
+        self._steer_ = steer
+        self._follow_peers_ = follow_peers
+        self._transport_ = transport
+        self._remote_area_ = None
+        self._room_ended_ = False
+        self.player = self._new_player_()
+
+    def _new_player_(self):
+        return game.PlayerData(self._hero_class_, steer=self._steer_, identifier=self.identifier)
+
+    def join(self, remote_area):
+        '''Leave current area (if any) and start playing in other one'''
+        if self.area is not None:
+            self.area.abandon()
+        self._remote_area_ = remote_area
+        self._room_ended_ = False
+        self.area = EmulatedArea(
+            remote_area, self._transport_, self.statistics, self.identifier, self._follow_peers_
+        )
+        self.level = EmulatedLevel(self)
+        self.level.orchestrator = game.orchestration.RoomOrchestration(
+            self.area, clock=self._transport_.now
+        )
+        self.level.wake_up()
+        self.statistics.joins += 1
+
+    def end_room(self):
+        '''Hero left the room (exit reached or dead)'''
+        self._room_ended_ = True
+
+    def update(self):
+        '''Game loop iteration'''
+        if self.area is None:
+            self.join(self._transport_.fetch_entrance())
+        self.area.dispatch()
+        self.level.update()
+        self.area.expire_probes()
+        if not self._room_ended_:
+            return
+        if self.player.attribute.get(LIFE, 0) > 0:
+            self.join(self._transport_.fetch_next_area(self._remote_area_))
+        else:
+            # Dead heroes start again from the entrance
+            self.player = self._new_player_()
+            self.join(self._transport_.fetch_entrance())
+
+    def leave(self):
+        '''Abandon current area'''
+        if self.area is not None:
+            self.area.abandon()
+            self.area = None
+
+
+class LoadGenerator:
+    '''Run many emulated clients at the frame rate of the game'''
+    def __init__(self, transport, clients=100, hero_class=None, steer=STEERS[0], seed=None,
+                 frame_rate=FRAMES_PER_SECOND, follow_peers=True):
+        if clients < 1:
+            raise ValueError('At least one client is needed')
+        if frame_rate <= 0:
+            raise ValueError('Frame rate must be positive')
+        if seed is not None:
+            # Steers and orchestrations use the global generator
+            random.seed(seed)
+        self.transport = transport
+        self.statistics = LoadStatistics()
+        self.clients = [
+            EmulatedClient(
+                transport, self.statistics, hero_class or HEROES[client_number % len(HEROES)],
+                steer, follow_peers
+            )
+            for client_number in range(clients)
+        ]
+        self._period_ = 1.0 / frame_rate
+
+    def _frame_(self, elapsed, ramp, on_frame):
+        self.transport.update()
+        active = len(self.clients)
+        if ramp and (elapsed < ramp):
+            active = max(1, int(active * elapsed / ramp))
+        for client in self.clients[:active]:
+            client.update()
+        self.transport.flush()
+        if on_frame:
+            on_frame()
+        self.statistics.frames += 1
+
+    def run(self, duration, ramp=0.0, on_frame=None):
+        '''Play for given seconds (clients join along the ramp seconds), return report'''
+        statistics = self.statistics
+        start = next_frame = time.perf_counter()
+        while True:
+            now = time.perf_counter()
+            elapsed = now - start
+            if elapsed >= duration:
+                break
+            if now < next_frame:
+                time.sleep(next_frame - now)
+                continue
+            self._frame_(elapsed, ramp, on_frame)
+            next_frame += self._period_
+            if time.perf_counter() > next_frame:
+                # Too slow: skip the lost frames instead of running in bursts
+                statistics.late_frames += 1
+                next_frame = time.perf_counter()
+        report = statistics.report(time.perf_counter() - start)
+        report['clients'] = len(self.clients)
+        return report
+
+    def simulate(self, duration, ramp=0.0, on_frame=None):
+        '''
+            Play given seconds of game time as fast as possible, the transport
+            time advances one frame period per frame (see LoopbackTransport)
+        '''
+        elapsed = 0.0
+        while elapsed < duration:
+            self._frame_(elapsed, ramp, on_frame)
+            self.transport.advance(self._period_)
+            elapsed += self._period_
+        report = self.statistics.report(duration)
+        report['clients'] = len(self.clients)
+        return report
+
+    def stop(self):
+        '''Every client leaves its area'''
+        for client in self.clients:
+            client.leave()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    On-disk cache of maps downloaded from remote areas
+'''
+
+import os
+import json
+import hashlib
+
+
+DEFAULT_CACHE_FOLDER = '$HOME/.icegauntlet/cache'
+DEFAULT_CACHE_SIZE = 16 * 1024 * 1024
+
+_INDEX_FILE_ = 'index.json'
+
+
+def etag(map_data):
+    '''Content hash of a map, as computed by the server'''
+    return hashlib.sha1(map_data.encode('utf-8')).hexdigest()
+
+
+class MapCache:
+    '''Size-bounded folder of maps stored by content hash'''
+    def __init__(self, folder=DEFAULT_CACHE_FOLDER, max_size=DEFAULT_CACHE_SIZE):
+        self._folder_ = os.path.expandvars(os.path.expanduser(folder))
+        self._max_size_ = max_size
+        os.makedirs(self._folder_, exist_ok=True)
+        self._index_ = self._load_index_()
+
+    def _load_index_(self):
+        try:
+            with open(os.path.join(self._folder_, _INDEX_FILE_), 'r') as contents:
+                return json.load(contents)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index_(self):
+        with open(os.path.join(self._folder_, _INDEX_FILE_), 'w') as contents:
+            json.dump(self._index_, contents)
+
+    def _path_(self, map_etag):
+        return os.path.join(self._folder_, '{}.json'.format(map_etag))
+
+    def etag_for(self, key):
+        '''Hash of the map stored for a given key (area), empty string if none'''
+        map_etag = self._index_.get(key, '')
+        if map_etag and not os.path.exists(self._path_(map_etag)):
+            return ''
+        return map_etag
+
+    def get(self, key):
+        '''Filename of the cached map of a given key, None if not cached'''
+        map_etag = self.etag_for(key)
+        if not map_etag:
+            return None
+        filename = self._path_(map_etag)
+        # Keep track of usage for eviction
+        os.utime(filename)
+        return filename
+
+    def store(self, key, map_data):
+        '''Store a map for a given key, return its filename'''
+        map_etag = etag(map_data)
+        filename = self._path_(map_etag)
+        if not os.path.exists(filename):
+            with open(filename, 'w') as contents:
+                contents.write(map_data)
+        self._index_[key] = map_etag
+        self._save_index_()
+        self._evict_(keep=filename)
+        return filename
+
+    def _evict_(self, keep):
+        maps = []
+        for filename in os.listdir(self._folder_):
+            if filename == _INDEX_FILE_:
+                continue
+            filename = os.path.join(self._folder_, filename)
+            maps.append((os.path.getmtime(filename), os.path.getsize(filename), filename))
+        total_size = sum(size for _, size, _ in maps)
+        for _, size, filename in sorted(maps):
+            if total_size <= self._max_size_:
+                break
+            if filename == keep:
+                continue
+            os.remove(filename)
+            total_size -= size
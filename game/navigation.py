@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Navigation over the collision grid of a room (in tiles)
+'''
+
+import collections
+
+
+UNREACHABLE = -1
+
+# Eight directions, orthogonal first
+_NEIGHBOURS_ = [(0, -1), (1, 0), (0, 1), (-1, 0), (1, -1), (1, 1), (-1, 1), (-1, -1)]
+
+
+def passable_tiles(block, tile_cells=2):
+    '''Grid of tiles where every cell of the tile is free in a block map'''
+    height, width = int(len(block) / tile_cells), int(len(block[0]) / tile_cells)
+    return [
+        [
+            all(
+                block[(y * tile_cells) + y_ofs][(x * tile_cells) + x_ofs] is False
+                for y_ofs in range(tile_cells) for x_ofs in range(tile_cells)
+            )
+            for x in range(width)
+        ]
+        for y in range(height)
+    ]
+
+
+class DistanceField:
+    '''Steps from every tile to the closest target, with O(1) next step lookups'''
+    def __init__(self, passable, targets):
+        self._passable_ = passable
+        self._height_ = len(passable)
+        self._width_ = len(passable[0]) if passable else 0
+        self._targets_ = [
+            (x, y) for x, y in targets if (0 <= x < self._width_) and (0 <= y < self._height_)
+        ]
+        self._distance_ = [[UNREACHABLE] * self._width_ for _ in range(self._height_)]
+        for x, y in self._targets_:
+            self._distance_[y][x] = 0
+        self._propagate_(collections.deque(self._targets_))
+
+    @property
+    def targets(self):
+        '''Tiles used as targets'''
+        return list(self._targets_)
+
+    def _walkable_(self, x, y):
+        return (0 <= x < self._width_) and (0 <= y < self._height_) and self._passable_[y][x]
+
+    def _moves_(self, x, y):
+        for dir_x, dir_y in _NEIGHBOURS_:
+            # Diagonal moves cannot cut wall corners
+            if dir_x and dir_y and not (
+                    self._walkable_(x + dir_x, y) and self._walkable_(x, y + dir_y)):
+                continue
+            if self._walkable_(x + dir_x, y + dir_y):
+                yield dir_x, dir_y
+
+    def _propagate_(self, pending):
+        distance = self._distance_
+        while pending:
+            x, y = pending.popleft()
+            next_distance = distance[y][x] + 1
+            for dir_x, dir_y in self._moves_(x, y):
+                current = distance[y + dir_y][x + dir_x]
+                if (current == UNREACHABLE) or (current > next_distance):
+                    distance[y + dir_y][x + dir_x] = next_distance
+                    pending.append((x + dir_x, y + dir_y))
+
+    def distance(self, x, y):
+        '''Steps from given tile to the closest target, UNREACHABLE if there is no path'''
+        if (0 <= x < self._width_) and (0 <= y < self._height_):
+            return self._distance_[y][x]
+        return UNREACHABLE
+
+    def reachable(self, x, y):
+        '''Return if any target can be reached from given tile'''
+        return self.distance(x, y) != UNREACHABLE
+
+    def next_step(self, x, y):
+        '''Direction (dir_x, dir_y) to the next tile towards the closest target'''
+        best = self.distance(x, y)
+        if best in (UNREACHABLE, 0):
+            return (0, 0)
+        step = (0, 0)
+        for dir_x, dir_y in self._moves_(x, y):
+            candidate = self._distance_[y + dir_y][x + dir_x]
+            if (candidate != UNREACHABLE) and (candidate < best):
+                best = candidate
+                step = (dir_x, dir_y)
+        return step
+
+    def open_tiles(self, tiles):
+        '''Update distances after given tiles become passable'''
+        pending = collections.deque()
+        for x, y in tiles:
+            if not self._walkable_(x, y):
+                continue
+            # Newly opened tiles can also shorten paths of its neighbours
+            for dir_x, dir_y in self._moves_(x, y):
+                if self._distance_[y + dir_y][x + dir_x] != UNREACHABLE:
+                    pending.append((x + dir_x, y + dir_y))
+        self._propagate_(pending)
@@ -6,13 +6,30 @@
     Objects used in the game
 '''
 
+import random
+
 from game.artwork import TREASURE_ANIM, TELEPORT_ANIM
 from game.game_object import Item
 from game.common import X, Y, TILE_ID,\
     KEY, JAR, HAM, TREASURE, EXIT, TELEPORT, DOORS, NULL_TILE,\
-    DEFAULT_SPAWN, SPAWN_IDS
+    DEFAULT_SPAWN, SPAWN_IDS, GENERATORS, GHOST_GENERATOR, GRUNT_GENERATOR, DEMON_GENERATOR,\
+    GHOST, GRUNT, DEMON
 from game.sprite import Raster, loop_animation
-from game.pyxeltools import tile, MAP_ENTITIES
+from game.pyxeltools import tile, MAP_ENTITIES, TILE_SIZE
+
+
+# Frames between two enemies spawned by a generator
+GENERATOR_PERIOD = 90
+# Maximum number of living enemies spawned by a generator
+GENERATOR_CAPACITY = 8
+
+_GENERATED_ENEMY_ = {
+    GHOST_GENERATOR: GHOST,
+    GRUNT_GENERATOR: GRUNT,
+    DEMON_GENERATOR: DEMON
+}
+# Tiles around a generator where enemies appear
+_AROUND_ = [(0, -1), (1, 0), (0, 1), (-1, 0), (1, -1), (1, 1), (-1, 1), (-1, -1)]
 
 
 class Door(Item):
@@ -20,6 +37,8 @@ class Door(Item):
     def __init__(self, door_image, position=(0, 0), identifier=None):
         super(Door, self).__init__(door_image, position, identifier)
         self.block_x = self.block_y = 0
+        # Identifiers of every door connected with this one, set by the Room()
+        self.group = []
 
     def do_create(self):
         # Anotate door identifier in block map
@@ -43,6 +62,39 @@ class Spawn(Item):
         self.spawn = spawn
 
 
+class Generator(Item):
+    '''Special item: spawns enemies (taken from the EnemyPool() of the room)'''
+    def __init__(self, animation, initial_position=(0, 0), identifier=None, enemy_type=GHOST):
+        super(Generator, self).__init__(animation, initial_position, identifier)
+        self.enemy_type = enemy_type
+        self._spawned_ = []
+        self._cooldown_ = GENERATOR_PERIOD
+        # Every peer must choose the same tiles: seeded by the network identifier
+        self._chooser_ = random.Random()
+
+    def do_create(self):
+        self._chooser_.seed(self.room.handles.network_id(self.identifier))
+
+    def update(self):
+        self._cooldown_ -= 1
+        if self._cooldown_ > 0:
+            return
+        self._cooldown_ = GENERATOR_PERIOD
+        # Forget enemies already killed (in place, steady hordes allocate nothing)
+        for index in range(len(self._spawned_) - 1, -1, -1):
+            if self._spawned_[index].room is None:
+                del self._spawned_[index]
+        if len(self._spawned_) >= GENERATOR_CAPACITY:
+            return
+        tile_x, tile_y = int(self.attribute[X] / TILE_SIZE), int(self.attribute[Y] / TILE_SIZE)
+        x_ofs, y_ofs = self._chooser_.choice(_AROUND_)
+        if not self.room.is_free_tile(tile_x + x_ofs, tile_y + y_ofs):
+            return
+        enemy = self.room.enemy_pool.acquire(self.enemy_type)
+        self.room.spawn(enemy, ((tile_x + x_ofs) * TILE_SIZE, (tile_y + y_ofs) * TILE_SIZE))
+        self._spawned_.append(enemy)
+
+
 def new(object_id, identifier):
     '''Factory for game items'''
     if object_id in DOORS:
@@ -51,6 +103,11 @@ def new(object_id, identifier):
         game_object = Spawn(
             Raster(MAP_ENTITIES, *tile(NULL_TILE)), identifier=identifier, spawn=object_id
         )
+    elif object_id in GENERATORS:
+        game_object = Generator(
+            Raster(MAP_ENTITIES, *tile(object_id)), identifier=identifier,
+            enemy_type=_GENERATED_ENEMY_[object_id]
+        )
     elif object_id == TREASURE:
         game_object = Item(loop_animation(MAP_ENTITIES, 3, TREASURE_ANIM), identifier=identifier)
     elif object_id == TELEPORT:
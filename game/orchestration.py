@@ -14,6 +14,7 @@ import uuid
 import random
 import logging
 
+import game.sync
 import game.layer
 import game.level
 import game.heroes
@@ -23,8 +24,20 @@ from game.common import DOORS, KEYS, AVAILABLE_OBJECT_IDS, EMPTY_TILE, NULL_TILE
     IDENTIFIER, X, Y, LIFE, SCORE, OBJECT_CLASS, OBJECT_TYPE, STATE,\
     POINTS_PER_DOOR, POINTS_PER_KEY, POINTS_PER_LEVEL
 from game.pyxeltools import TILE_SIZE
+from game.profiler import PROFILER, EVENTS
 
 
+# Only these events are sent by clients of an authoritative area, the server
+# resolves (and sends) everything else
+INPUT_EVENTS = ['spawn_actor', 'set_direction', 'actor_snapshot']
+# Events resolved by authoritative servers
+RESOLVED_EVENTS = [
+    'spawn_actor', 'spawn_object', 'spawn_decoration', 'kill_object', 'open_door',
+    'set_attribute', 'increase_attribute', 'warp_to', 'set_state'
+]
+# Events that change a tracked object
+_UPDATE_EVENTS_ = ['set_attribute', 'increase_attribute', 'warp_to', 'set_state']
+
 def _closest_(target, objects=None):
     if not objects:
         return None
@@ -111,12 +124,17 @@ class TrackedGameObject:
 
 class RoomOrchestration:
     '''A running game instance'''
-    def __init__(self, area):
+    def __init__(self, area, clock=time.time):
         self._identifier_ = None
         self._area_ = area
+        # Wall clock by default, simulations may use its own time
+        self._clock_ = clock
         self._game_objects_ = {}
         self._level_ = None
-        self._last_time_ = int(time.time())
+        self._last_time_ = int(clock())
+        self._last_snapshot_ = 0.0
+        self._snapshot_encoder_ = game.sync.SnapshotEncoder()
+        self._snapshot_decoder_ = game.sync.SnapshotDecoder()
 
     @property
     def identifier(self):
@@ -128,6 +146,21 @@ class RoomOrchestration:
         '''Change instance identifier'''
         self._identifier_ = new_identifier
 
+    @property
+    def handles(self):
+        '''HandleTable() used by the area'''
+        return self._area_.handles
+
+    @property
+    def tracked_objects(self):
+        '''Data of every object known by the orchestration'''
+        return self._game_objects_
+
+    @property
+    def authoritative(self):
+        '''True if a server resolves the game logic of the area'''
+        return self._area_.authoritative
+
     @property
     def level(self):
         '''Get associated level'''
@@ -143,23 +176,26 @@ class RoomOrchestration:
         '''Start new map'''
         self._game_objects_ = {}
         self._load_map_()
+        # Authoritative servers already know the objects and actors of the area
         for identifier, object_type, position in self._area_.getObjects():
-            self._spawn_object_(identifier, object_type, *position)
+            self._spawn_object_(identifier, object_type, *position, only_local=self.authoritative)
         
         for identifier, attributes in self._area_.getActors():
-            self._spawn_actor_(identifier, attributes)
+            self._spawn_actor_(identifier, attributes, only_local=self.authoritative)
 
-        self._spawn_actor_(self.level.player.identifier, self.level.player.attribute)
+        self._spawn_actor_(self.identifier, self.level.player.attribute)
 
     def _load_map_(self):
         map_name, map_autor, map_data = self._area_.getMap()
         self.fire_event(('load_room', map_name, map_data, map_autor), only_local=True)
 
-    def _spawn_actor_(self, identifier, attributes):
-        self.fire_event(('spawn_actor', identifier, attributes))
+    def _spawn_actor_(self, identifier, attributes, only_local=False):
+        attributes = dict(attributes)
+        attributes[IDENTIFIER] = identifier
+        self.fire_event(('spawn_actor', identifier, attributes), only_local=only_local)
 
-    def _spawn_object_(self, identifier, object_type, x, y):
-        self.fire_event(('spawn_object', identifier, object_type, x, y))
+    def _spawn_object_(self, identifier, object_type, x, y, only_local=False):
+        self.fire_event(('spawn_object', identifier, object_type, x, y), only_local=only_local)
 
     def _spawn_decoration_(self, decoration_type, x, y):
         self.fire_event(('spawn_decoration', decoration_type, x, y))
@@ -182,6 +218,22 @@ class RoomOrchestration:
     def _object_state_(self, identifier, state):
         self.fire_event(('set_state', identifier, state))
 
+    def _send_snapshot_(self):
+        actor = self.level.room.game_objects.get(self.identifier, None)
+        if not actor:
+            return
+        attributes = dict(actor.attribute)
+        attributes[STATE] = actor.state
+        snapshot = self._snapshot_encoder_.encode(self.identifier, attributes, self._clock_())
+        if snapshot:
+            # Snapshots are only for remote peers: local level already has this state
+            self._area_.fire_event(('actor_snapshot', self.identifier, *snapshot), only_local=True)
+
+    def _update_interest_(self):
+        actor = self.level.room.game_objects.get(self.identifier, None)
+        if actor:
+            self._area_.set_viewport(self.level.room.camera.position, actor.position)
+
     def _get_objects_(self, type_id, exclude=None):
         found = []
         if exclude:
@@ -196,16 +248,25 @@ class RoomOrchestration:
 
     def event_handler(self, event):
         '''Handle event from the Room()'''
+        PROFILER.start(EVENTS)
+        try:
+            self._handle_event_(event)
+        finally:
+            PROFILER.stop(EVENTS)
+
+    def _handle_event_(self, event):
         event_type = event[0]
         event_parameters = event[1:]
         if event_type == 'collision':
-            self._process_collision_(*event_parameters)
+            if not self.authoritative:
+                self._process_collision_(*event_parameters)
         elif event_type == 'spawn_actor':
             self.level.event_handler(event)
             identifier, attributes = event_parameters
             self._game_objects_[identifier] = TrackedGameObject(identifier, attributes)
         elif event_type == 'kill_object':
             self.level.event_handler(event)
+            self._snapshot_decoder_.forget(event_parameters[0])
             try:
                 del self._game_objects_[event_parameters[0]]
             except KeyError:
@@ -219,6 +280,9 @@ class RoomOrchestration:
                 OBJECT_CLASS: 'door' if object_type in DOORS else 'item',
                 OBJECT_TYPE: object_type
             })
+        elif (event_type in _UPDATE_EVENTS_) and (event_parameters[0] not in self._game_objects_):
+            # Object spawned before joining the area (its spawn event was never received)
+            self.level.event_handler(event)
         elif event_type == 'set_attribute':
             self.level.event_handler(event)
             identifier, attribute, value = event_parameters
@@ -236,6 +300,14 @@ class RoomOrchestration:
             self.level.event_handler(event)
             identifier, state = event_parameters
             self._game_objects_[identifier].state = state
+        elif event_type == 'actor_snapshot':
+            identifier, sequence, delta = event_parameters
+            state = self._snapshot_decoder_.decode(identifier, sequence, delta)
+            if (state is None) or (identifier not in self._game_objects_):
+                return
+            self._game_objects_[identifier].attribute.update(state)
+            changed = {field: state[field] for field in game.sync.changed_fields(delta)}
+            self.level.event_handler(('sync_actor', identifier, changed))
 
         else:
             self.level.event_handler(event)
@@ -244,6 +316,9 @@ class RoomOrchestration:
         '''Fire event to the Room()'''
         if only_local:
             self.event_handler(event)
+        elif self.authoritative and (event[0] not in INPUT_EVENTS):
+            # Resolved by the server, it will be received from the area channel
+            return
         else:
             self._area_.fire_event(event, only_local=False)
 
@@ -294,6 +369,11 @@ class RoomOrchestration:
 
     def update(self):
         '''Game loop iteration'''
-        if int(time.time()) != self._last_time_:
+        now = self._clock_()
+        if int(now) != self._last_time_:
             self._increase_attribute_(self.identifier, LIFE, -1)
-            self._last_time_ = int(time.time())
+            self._last_time_ = int(now)
+        if now - self._last_snapshot_ >= game.sync.SNAPSHOT_PERIOD:
+            self._last_snapshot_ = now
+            self._send_snapshot_()
+        self._update_interest_()
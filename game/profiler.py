@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Frame profiler: time spent by every stage of the game loop
+
+    Stages are inclusive, "update" contains "orchestration", "collision" and
+    most of "events". "publish" is the time spent sending events to the
+    network (see ice_transport). Timers do nothing until the profiler is enabled and only
+    the thread running the game loop is measured.
+'''
+
+import csv
+import time
+import threading
+import collections
+
+
+UPDATE = 'update'
+ORCHESTRATION = 'orchestration'
+COLLISION = 'collision'
+EVENTS = 'events'
+RENDER = 'render'
+PUBLISH = 'publish'
+STAGES = (UPDATE, ORCHESTRATION, COLLISION, EVENTS, RENDER, PUBLISH)
+
+# Frames stored in the ring buffer
+DEFAULT_HISTORY = 600
+# Frames averaged by the overlay
+OVERLAY_WINDOW = 30
+
+_LABELS_ = {
+    UPDATE: 'UPD',
+    ORCHESTRATION: 'ORC',
+    COLLISION: 'COL',
+    EVENTS: 'EVT',
+    RENDER: 'RND',
+    PUBLISH: 'PUB'
+}
+
+
+class FrameProfiler:
+    '''Accumulate stage timers per frame and keep the last frames in a ring buffer'''
+    def __init__(self, history=DEFAULT_HISTORY, clock=time.perf_counter):
+        self.enabled = False
+        self.overlay = False
+        self._thread_ = threading.get_ident()
+        self._clock_ = clock
+        self._samples_ = collections.deque(maxlen=history)
+        self._elapsed_ = dict.fromkeys(STAGES, 0.0)
+        self._started_ = dict.fromkeys(STAGES, 0.0)
+        self._depth_ = dict.fromkeys(STAGES, 0)
+        self._last_frame_ = None
+
+    def enable(self, overlay=False):
+        '''Start profiling the frames of the calling thread'''
+        self.enabled = True
+        self.overlay = overlay
+        self._thread_ = threading.get_ident()
+
+    @property
+    def samples(self):
+        '''List of recorded frames, every one is a dict'''
+        return list(self._samples_)
+
+    def start(self, stage):
+        '''Start timer of a stage, nested calls are ignored'''
+        if not self.enabled or (threading.get_ident() != self._thread_):
+            return
+        self._depth_[stage] += 1
+        if self._depth_[stage] == 1:
+            self._started_[stage] = self._clock_()
+
+    def stop(self, stage):
+        '''Stop timer of a stage'''
+        if not self.enabled or (threading.get_ident() != self._thread_):
+            return
+        if not self._depth_[stage]:
+            return
+        self._depth_[stage] -= 1
+        if self._depth_[stage] == 0:
+            self._elapsed_[stage] += self._clock_() - self._started_[stage]
+
+    def end_frame(self, objects=0, decorations=0):
+        '''Store current frame in the ring buffer and reset timers'''
+        if not self.enabled:
+            return
+        now = self._clock_()
+        sample = {
+            'frame': 0.0 if self._last_frame_ is None else (now - self._last_frame_) * 1000.0,
+            'objects': objects,
+            'decorations': decorations
+        }
+        for stage in STAGES:
+            sample[stage] = self._elapsed_[stage] * 1000.0
+            self._elapsed_[stage] = 0.0
+        self._samples_.append(sample)
+        self._last_frame_ = now
+
+    def averages(self, window=OVERLAY_WINDOW):
+        '''Mean milliseconds of every stage (and frame) over the last frames'''
+        count = min(window, len(self._samples_))
+        if not count:
+            return {}
+        recent = [self._samples_[-index] for index in range(1, count + 1)]
+        return {
+            field: sum(sample[field] for sample in recent) / count
+            for field in ('frame',) + STAGES
+        }
+
+    def overlay_lines(self):
+        '''Text lines to be drawn on screen'''
+        averages = self.averages()
+        if not averages:
+            return []
+        last = self._samples_[-1]
+        lines = ['FRM {:5.1f}ms'.format(averages['frame'])]
+        lines += [
+            '{} {:5.1f}ms'.format(_LABELS_[stage], averages[stage]) for stage in STAGES
+        ]
+        lines.append('OBJ {} DEC {}'.format(last['objects'], last['decorations']))
+        return lines
+
+    def dump_csv(self, filename):
+        '''Write recorded frames to a CSV file'''
+        fields = ['frame'] + list(STAGES) + ['objects', 'decorations']
+        with open(filename, 'w', newline='') as contents:
+            writer = csv.DictWriter(contents, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(self._samples_)
+
+
+# Profiler used by the engine
+PROFILER = FrameProfiler()
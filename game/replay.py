@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Replay of event journals without orchestration nor network
+
+    Events are fed to a Level() as fast as possible. When simulating, the room
+    is also updated once per recorded tick, so the engine work of the session
+    can be profiled.
+'''
+
+import time
+
+import game
+import game.level
+from game.handles import HandleTable, IDENTIFIER_FIELDS, FIRST_SLOT, slot_of
+from game.journal import PLAYER_EVENT, read_journal
+from game.profiler import PROFILER, UPDATE
+
+
+class ReplaySession:
+    '''Stand-in of Game() used as parent of the replayed Level()'''
+    def __init__(self, hero_class=game.common.HEROES[0]):
+        self.identifier = None
+        # Every actor follows the directions found in the journal
+        self.player = game.PlayerData(hero_class, steer='Network')
+        self.dungeon = None
+
+
+class ReplayLevel(game.level.Level):
+    '''Level() without orchestrator'''
+    def __init__(self, parent, handles):
+        super(ReplayLevel, self).__init__(parent)
+        self._handles_ = handles
+
+    def update(self):
+        PROFILER.start(UPDATE)
+        self.room.update()
+        PROFILER.stop(UPDATE)
+        PROFILER.end_frame(len(self.room.game_objects), len(self.room.decorations))
+
+    def make_room(self, name, data, author):
+        self.room = game.room.Room(data, self, self._handles_)
+
+
+def _last_slot_(records):
+    last_slot = FIRST_SLOT - 1
+    for _, _, event in records:
+        fields = (1,) if event[0] == PLAYER_EVENT else IDENTIFIER_FIELDS.get(event[0], ())
+        for field in fields:
+            if isinstance(event[field], int):
+                last_slot = max(last_slot, slot_of(event[field]))
+    return last_slot
+
+
+def replay(records, simulate=False):
+    '''Feed (tick, milliseconds, event) records to a new Level(), return statistics'''
+    records = list(records)
+    # Objects created while simulating never reuse handles of the journal
+    handles = HandleTable(first_slot=_last_slot_(records) + 1)
+    session = ReplaySession()
+    level = ReplayLevel(session, handles)
+    ticks = 0
+    current_tick = None
+    start = time.perf_counter()
+    for tick, _, event in records:
+        if simulate and (current_tick is not None):
+            for _ in range(tick - current_tick):
+                level.update()
+                ticks += 1
+        current_tick = tick
+        if event[0] == PLAYER_EVENT:
+            session.identifier = event[1]
+            continue
+        level.event_handler(event)
+    elapsed = time.perf_counter() - start
+    recorded = (records[-1][1] / 1000.0) if records else 0.0
+    return {
+        'events': len(records),
+        'ticks': ticks,
+        'recorded_ticks': current_tick or 0,
+        'recorded_seconds': recorded,
+        'replay_seconds': elapsed,
+        'speedup': (recorded / elapsed) if elapsed else 0.0
+    }
+
+
+def replay_file(filename, simulate=False):
+    '''Replay a journal file, return statistics'''
+    return replay(read_journal(filename), simulate)
@@ -6,44 +6,54 @@
     Handling room events and objects
 '''
 
-import logging
-
 from game.layer import TileMapLayer
 from game.camera import Camera
-from game.common import TILE_ID, DEFAULT_SPAWN, KEYS
+from game.common import X, Y, TILE_ID, DEFAULT_SPAWN, KEYS, DOOR_DIRECTIONS, IDENTIFIER
 from game.objects import Spawn, Door
-from game.pyxeltools import get_color_mask
+from game.heroes import Hero
+from game.enemies import Enemy, EnemyPool
+from game.handles import HandleTable
+from game.pyxeltools import TILE_SIZE, get_color_mask
 from game.artwork import BLOCK_CELLS
 import game.decoration
+import game.navigation
+from game.profiler import PROFILER, COLLISION
+
+
+# Size (in pixels) of the cells used to find collision candidates, bigger than any body
+COLLISION_CELL_SIZE = 2 * TILE_SIZE
+
 
+def _tile_of_(game_object):
+    return (int(game_object.attribute[X] / TILE_SIZE), int(game_object.attribute[Y] / TILE_SIZE))
 
-_DOOR_DIRECTION_ = {
-    19: [(0, -1)],
-    20: [(1, 0)],
-    21: [(0, -1), (1, 0)],
-    22: [(0, 1)],
-    23: [(0, -1), (0, 1)],
-    24: [(1, 0), (0, 1)],
-    25: [(0, -1), (1, 0), (0, 1)],
-    26: [(-1, 0)],
-    27: [(-1, 0), (0, -1)],
-    28: [(-1, 0), (1, 0)],
-    29: [(0, -1), (-1, 0), (1, 0)],
-    30: [(-1, 0), (0, 1)],
-    31: [(0, -1), (-1, 0), (0, 1)],
-    32: [(-1, 0), (0, 1), (1, 0)],
-    33: [(0, -1), (-1, 0), (0, 1), (1, 0)]
-}
+
+def _collision_cell_(game_object):
+    return (
+        int(game_object.attribute[X] // COLLISION_CELL_SIZE),
+        int(game_object.attribute[Y] // COLLISION_CELL_SIZE)
+    )
 
 
 class Room:
     '''Container for all in-game elements'''
-    def __init__(self, floor_data, level):
+    def __init__(self, floor_data, level, handles=None):
         self._scenario_ = TileMapLayer(floor_data, mask=get_color_mask())
         self._camera_ = Camera(self._scenario_)
         self._level_ = level
         self._game_objects_ = {}
         self._decorations_ = {}
+        self._door_groups_ = None
+        self._passable_ = None
+        self._distance_fields_ = {}
+        self._hero_tiles_ = frozenset()
+        self._flow_field_ = None
+        self._collision_grid_ = {}
+        # Enemies only collide with other objects, never between them
+        self._enemy_grid_ = {}
+        self._collision_cells_ = {}
+        self.handles = handles if handles is not None else HandleTable()
+        self.enemy_pool = EnemyPool(self.handles)
         self.block = self._compute_walls_collisions_()
         self._spawns_ = self._get_spawns_()
 
@@ -68,6 +78,11 @@ class Room:
                 spawns[candidate.spawn] = candidate.position
         return spawns
 
+    @property
+    def decorations(self):
+        '''Map of current-living decorations'''
+        return self._decorations_
+
     @property
     def camera(self):
         '''Room camera'''
@@ -90,87 +105,197 @@ class Room:
         self._game_objects_[game_object.identifier] = game_object
         self._game_objects_[game_object.identifier].position = position
         self._game_objects_[game_object.identifier].room = self
+        self._place_(game_object)
         if isinstance(game_object, Spawn):
             self._spawns_.update(self._get_spawns_())
+        elif isinstance(game_object, Door):
+            self._door_groups_ = None
+            self._passable_ = None
+            self._flow_field_ = None
+        self._forget_distance_fields_(game_object)
 
     def spawn_decoration(self, decoration_id, position):
         '''Spawn decoration'''
-        decoration = game.decoration.new(decoration_id, position)
+        decoration = game.decoration.new(decoration_id, position, self.handles.new())
         self._decorations_[decoration.identifier] = decoration
         self._decorations_[decoration.identifier].room = self
 
     def kill(self, game_object):
         '''Kill an object'''
-        identifier = game_object if isinstance(game_object, str) else game_object.identifier
+        identifier = game_object if isinstance(game_object, (str, int)) else game_object.identifier
 
         if identifier == self._level_.identifier:
-            self._level_.player.attribute.update(self._game_objects_[identifier].attribute)
+            # Player keeps its network identifier
+            self._level_.player.attribute.update({
+                attribute: value
+                for attribute, value in self._game_objects_[identifier].attribute.items()
+                if attribute != IDENTIFIER
+            })
 
         if identifier in self._game_objects_:
-            self._game_objects_[identifier].room = None
+            killed = self._game_objects_[identifier]
+            killed.room = None
             del self._game_objects_[identifier]
+            self._displace_(identifier)
+            self._forget_distance_fields_(killed)
+            if isinstance(killed, Door):
+                self._open_tiles_([_tile_of_(killed)])
         elif identifier in self._decorations_:
             self._decorations_[identifier].room = None
             del self._decorations_[identifier]
+        self.handles.release(identifier)
 
         if identifier == self._level_.identifier:
             self._level_.end_current_room()
 
     def open_door(self, player_identifier, door_identifier):
         '''Open a existing door'''
-        door_position = self._search_door_(door_identifier)
-        if not door_position:
+        if door_identifier not in self._game_objects_:
             return
-        doors = self._adjacent_doors_(door_position)
-        for door in doors:
+        for door in self.door_group(door_identifier):
             self.kill(door)
             self.fire_event(('kill_object', door), only_local=True)
         self.fire_event(('increase_attribute', player_identifier, KEYS, -1))
 
-    def _search_door_(self, door_identifier):
-        if door_identifier not in self._game_objects_:
-            return None
-        y = 0
-        for row in self.block:
-            x = 0
-            for cell in row:
-                if cell == door_identifier:
-                    return (x, y)
-                x += 1
-            y += 1
-        return None
-
-    def _adjacent_doors_(self, location, visited=None):
-        if not visited:
-            visited = []
-        if location in visited:
-            return []
-        visited.append(location)
-        x, y = location
-        if (y not in range(len(self.block))) or (x not in range(len(self.block[0]))):
-            return []
-        identifier = self.block[y][x]
-        try:
-            door = self._game_objects_[identifier]
-        except KeyError:
-            logging.debug('Malformed map, object not found: {}'.format(identifier))
-            return []
-        if not isinstance(door, Door):
-            return []
-        doors = [door.identifier]
-        door_tile_id = door.attribute[TILE_ID]
-        for dir_x, dir_y in _DOOR_DIRECTION_[door_tile_id]:
-            doors += self._adjacent_doors_((x + dir_x, y + dir_y), visited)
-        return doors
+    def door_group(self, door_identifier):
+        '''Identifiers of all doors connected to a given one (itself included)'''
+        if self._door_groups_ is None:
+            self._door_groups_ = self._compute_door_groups_()
+        return self._door_groups_.get(door_identifier, [])
+
+    def _compute_door_groups_(self):
+        # Union-find over door tiles, doors never change so this runs once per map.
+        # Doors are connected if any of them points to the other, as in
+        # icegauntlettool.doors_linked()
+        doors = {}
+        for game_object in self._game_objects_.values():
+            if isinstance(game_object, Door):
+                doors[_tile_of_(game_object)] = game_object
+        parent = {position: position for position in doors}
+
+        def find(position):
+            while parent[position] != position:
+                parent[position] = parent[parent[position]]
+                position = parent[position]
+            return position
+
+        for (x, y), door in doors.items():
+            for dir_x, dir_y in DOOR_DIRECTIONS[door.attribute[TILE_ID]]:
+                neighbour = (x + dir_x, y + dir_y)
+                if neighbour in doors:
+                    parent[find(neighbour)] = find((x, y))
+
+        members = {}
+        for position, door in doors.items():
+            group = members.setdefault(find(position), [])
+            group.append(door.identifier)
+            door.group = group
+        return {door.identifier: door.group for door in doors.values()}
+
+    def distance_field(self, tile_ids):
+        '''Cached DistanceField to the closest items of the given types (tile IDs)'''
+        key = frozenset(tile_ids)
+        if key not in self._distance_fields_:
+            targets = [
+                _tile_of_(game_object) for game_object in self._game_objects_.values()
+                if game_object.attribute.get(TILE_ID, None) in key
+            ]
+            self._distance_fields_[key] = game.navigation.DistanceField(
+                self._passable_tiles_(), targets
+            )
+        return self._distance_fields_[key]
+
+    @property
+    def flow_field(self):
+        '''DistanceField to the closest hero, shared by all enemies of the room'''
+        if self._flow_field_ is None:
+            self._flow_field_ = game.navigation.DistanceField(
+                self._passable_tiles_(), self._hero_tiles_
+            )
+        return self._flow_field_
+
+    def is_free_tile(self, x, y):
+        '''Return if a given tile has no walls nor doors'''
+        passable = self._passable_tiles_()
+        return (0 <= y < len(passable)) and (0 <= x < len(passable[y])) and passable[y][x]
+
+    def _passable_tiles_(self):
+        if self._passable_ is None:
+            self._passable_ = game.navigation.passable_tiles(self.block)
+            self._distance_fields_ = {}
+            self._flow_field_ = None
+        return self._passable_
+
+    def _update_hero_tiles_(self):
+        # Flow field is rebuilt (lazily) only when some hero crosses a tile boundary
+        hero_tiles = frozenset(
+            _tile_of_(game_object) for game_object in self._game_objects_.values()
+            if isinstance(game_object, Hero)
+        )
+        if hero_tiles != self._hero_tiles_:
+            self._hero_tiles_ = hero_tiles
+            self._flow_field_ = None
+
+    def _forget_distance_fields_(self, game_object):
+        # Fields targeting this type of item are not valid anymore
+        tile_id = game_object.attribute.get(TILE_ID, None)
+        if tile_id is None:
+            return
+        for key in [key for key in self._distance_fields_ if tile_id in key]:
+            del self._distance_fields_[key]
+
+    def set_tile(self, x, y, tile):
+        '''Change a tile of the map (a wall falls or raises), caches are updated only there'''
+        self._scenario_.set_tile(x, y, tile)
+        for y_ofs in [0, 1]:
+            for x_ofs in [0, 1]:
+                cell_x, cell_y = (x * 2) + x_ofs, (y * 2) + y_ofs
+                # Doors keep their identifiers in the block map
+                if isinstance(self.block[cell_y][cell_x], bool):
+                    self.block[cell_y][cell_x] = (
+                        self._scenario_.get_cell_at(cell_x, cell_y) in BLOCK_CELLS
+                    )
+        if self._passable_ is None:
+            return
+        if self._passable_[y][x] and not self._is_passable_(x, y):
+            # Distances can only be shortened incrementally, closed tiles need new fields
+            self._passable_[y][x] = False
+            self._distance_fields_ = {}
+            self._flow_field_ = None
+        else:
+            self._open_tiles_([(x, y)])
+
+    def _is_passable_(self, x, y):
+        return all(
+            self.block[(y * 2) + y_ofs][(x * 2) + x_ofs] is False
+            for y_ofs in [0, 1] for x_ofs in [0, 1]
+        )
+
+    def _open_tiles_(self, tiles):
+        if self._passable_ is None:
+            return
+        for x, y in tiles:
+            self._passable_[y][x] = self._is_passable_(x, y)
+        for distance_field in self._distance_fields_.values():
+            distance_field.open_tiles(tiles)
+        if self._flow_field_ is not None:
+            self._flow_field_.open_tiles(tiles)
 
     def update(self):
         '''A game loop iteration'''
+        self._update_hero_tiles_()
+        # Objects could be moved by events since last frame
+        for game_object in self._game_objects_.values():
+            self._place_(game_object)
         for game_object in list(self._game_objects_.values()):
             game_object.update()
             if not game_object.acting:
                 self.kill(game_object)
-            if game_object.body:
+            # Pairs with enemies are tested (once) by the other object of the pair
+            if game_object.body and not isinstance(game_object, Enemy):
+                PROFILER.start(COLLISION)
                 self.check_collisions_with(game_object)
+                PROFILER.stop(COLLISION)
 
     def render(self):
         '''Draw a frame'''
@@ -187,11 +312,44 @@ class Room:
         '''Compute collisions for all game objects'''
         if not game_object.body:
             return
-        for other_game_object in list(self._game_objects_.values()):
+        if game_object.identifier in self._game_objects_:
+            self._place_(game_object)
+        cell_x, cell_y = _collision_cell_(game_object)
+        grids = [self._collision_grid_]
+        if not isinstance(game_object, Enemy):
+            grids.append(self._enemy_grid_)
+        candidates = []
+        for grid in grids:
+            for y_ofs in [-1, 0, 1]:
+                for x_ofs in [-1, 0, 1]:
+                    candidates.extend(grid.get((cell_x + x_ofs, cell_y + y_ofs), {}).values())
+        for other_game_object in candidates:
             if (other_game_object is game_object) or (not other_game_object.body):
                 continue
             if game_object.body.collides_with(other_game_object):
                 self.fire_event(('collision', game_object.identifier, other_game_object.identifier), only_local=True)
+                if isinstance(other_game_object, Enemy) and not isinstance(game_object, Enemy):
+                    self.fire_event(('collision', other_game_object.identifier, game_object.identifier), only_local=True)
+
+    def _place_(self, game_object):
+        # Keep the object in the collision cell of its current position
+        cell = _collision_cell_(game_object)
+        previous_cell = self._collision_cells_.get(game_object.identifier, None)
+        if (previous_cell is not None) and (cell == previous_cell[0]):
+            return
+        if previous_cell is not None:
+            self._displace_(game_object.identifier)
+        grid = self._enemy_grid_ if isinstance(game_object, Enemy) else self._collision_grid_
+        grid.setdefault(cell, {})[game_object.identifier] = game_object
+        self._collision_cells_[game_object.identifier] = (cell, grid)
+
+    def _displace_(self, identifier):
+        cell, grid = self._collision_cells_.pop(identifier, (None, None))
+        if cell is None:
+            return
+        del grid[cell][identifier]
+        if not grid[cell]:
+            del grid[cell]
 
     def fire_event(self, event, only_local=False):
         '''Send event to orchestrator'''
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Areas hosted by a pool of worker processes
+
+    Every worker owns some areas and ticks them at a fixed rate. The main
+    process routes channel events to the owner of the area, publishes the
+    resolved events sent back by the workers and moves areas from workers
+    over their tick budget to less loaded ones.
+
+    Workers are forked, so pyxel (or its headless stand-in) must be loaded
+    before creating the scheduler.
+
+    Commands and results travel through multiprocessing queues (pickled
+    through a pipe), not shared memory ring buffers: events are already
+    pickled bytes of a few dozen bytes, so the copy is cheap compared with a
+    tick. benchmarks/scheduler.py measures the cost per event.
+'''
+
+import os
+import time
+import queue
+import itertools
+import threading
+import multiprocessing
+
+import game.server
+import game.transport
+from game.pyxeltools import TILE_SIZE, load_json_map
+
+
+# Fraction of the tick period that workers may be busy before areas are moved
+DEFAULT_BUDGET = 0.8
+# Seconds between load reports of the workers
+REPORT_PERIOD = 1.0
+# Minimum seconds between two migrations
+MIGRATION_COOLDOWN = 2.0
+# Minimum load reduction of the busiest worker to move an area (avoids ping-pong)
+MIN_IMPROVEMENT = 0.1
+# Seconds to wait for a worker answer
+QUERY_TIMEOUT = 5.0
+# Seconds between checks of a pending query answer
+QUERY_POLL_PERIOD = 0.01
+
+# Commands sent to workers
+_HOST_ = 'host'
+_EVENT_ = 'event'
+_EXPORT_ = 'export'
+_QUERY_ = 'query'
+_STOP_ = 'stop'
+# Messages sent by workers
+_PUBLISH_ = 'publish'
+_EXPORTED_ = 'exported'
+_REPLY_ = 'reply'
+_LOAD_ = 'load'
+_STOPPED_ = 'stopped'
+
+
+class _WorkerTransport(game.transport.Transport):
+    '''Send resolved events of the areas of a worker to the main process'''
+    def __init__(self, results):
+        self._results_ = results
+
+    def publish(self, channel, event, sender_id):
+        '''Queue event to be published'''
+        self._results_.put((_PUBLISH_, channel, event, sender_id))
+
+
+def _pin_(worker_id):
+    if hasattr(os, 'sched_setaffinity'):
+        cpus = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, {cpus[worker_id % len(cpus)]})
+
+
+def _worker_(worker_id, commands, results, server_id, period, pin):
+    '''Main loop of a worker process'''
+    if pin:
+        _pin_(worker_id)
+    areas = {}
+    transport = _WorkerTransport(results)
+    # Busy seconds and ticks of every area since last report
+    costs = {}
+    ticks = {}
+    late_ticks = 0
+    next_tick = next_report = time.perf_counter() + REPORT_PERIOD
+    last_report = time.perf_counter()
+    while True:
+        # Commands are processed while waiting for the next tick
+        timeout = max(0.0, next_tick - time.perf_counter())
+        try:
+            command = commands.get(timeout=timeout) if timeout else commands.get_nowait()
+        except queue.Empty:
+            command = None
+        while command is not None:
+            kind = command[0]
+            if kind == _EVENT_:
+                _, channel, event, sender_id = command
+                if channel in areas:
+                    areas[channel].receive(event, sender_id)
+            elif kind == _HOST_:
+                _, channel, room_data, state = command
+                areas[channel] = game.server.HostedArea(
+                    room_data, channel, transport, server_id, state
+                )
+                costs[channel] = 0.0
+                ticks[channel] = 0
+            elif kind == _EXPORT_:
+                channel = command[1]
+                results.put((_EXPORTED_, channel, areas.pop(channel).export(), ticks.pop(channel)))
+                del costs[channel]
+            elif kind == _QUERY_:
+                _, channel, what, query_id = command
+                results.put((_REPLY_, query_id, getattr(areas[channel], what)()))
+            elif kind == _STOP_:
+                results.put((_STOPPED_, worker_id, {
+                    channel: area.stats() for channel, area in areas.items()
+                }, ticks))
+                return
+            try:
+                command = commands.get_nowait()
+            except queue.Empty:
+                command = None
+
+        now = time.perf_counter()
+        if now < next_tick:
+            continue
+        for channel, area in areas.items():
+            busy = area.busy
+            area.tick()
+            costs[channel] += area.busy - busy
+            ticks[channel] += 1
+        next_tick += period
+        if period and (time.perf_counter() > next_tick):
+            # Too slow: skip the lost ticks instead of running in bursts
+            late_ticks += 1
+            next_tick = time.perf_counter()
+
+        if now >= next_report:
+            elapsed = now - last_report
+            results.put((_LOAD_, worker_id, {
+                channel: cost / elapsed for channel, cost in costs.items()
+            }, late_ticks, ticks))
+            costs = dict.fromkeys(costs, 0.0)
+            ticks = dict.fromkeys(ticks, 0)
+            last_report = now
+            next_report = now + REPORT_PERIOD
+
+
+class ScheduledArea:
+    '''Stand-in of a HostedArea() running in a worker process'''
+    def __init__(self, scheduler, room_data, channel):
+        self.room_data = room_data
+        self.channel = channel
+        self.next_area = None
+        self._scheduler_ = scheduler
+        _, _, data = load_json_map(room_data)
+        self.size = (len(data[0]) * TILE_SIZE, len(data) * TILE_SIZE)
+
+    def receive(self, event, sender_id, sent_at=None): # pylint: disable=W0613
+        '''Route an event to the worker of the area'''
+        self._scheduler_.route(self.channel, event, sender_id)
+
+    def items(self):
+        '''Items and doors currently in the area'''
+        return self._scheduler_.query(self.channel, 'items')
+
+    def actors(self):
+        '''Heroes currently in the area'''
+        return self._scheduler_.query(self.channel, 'actors')
+
+
+class AreaScheduler(game.server.AreaServer):
+    '''AreaServer() that distributes the areas between worker processes'''
+    def __init__(self, transport, tick_rate=game.server.TICK_RATE, server_id=None, workers=None,
+                 budget=DEFAULT_BUDGET, pin=True):
+        super(AreaScheduler, self).__init__(transport, tick_rate, server_id)
+        workers = workers or os.cpu_count() or 1
+        context = multiprocessing.get_context('fork')
+        # Tick budget of every worker in seconds of work per second
+        self.budget = budget
+        self.migrations = 0
+        self._results_ = context.Queue()
+        self._commands_ = [context.Queue() for _ in range(workers)]
+        self._workers_ = [
+            context.Process(
+                target=_worker_,
+                args=(worker_id, commands, self._results_, self.identifier, self._period_, pin),
+                daemon=True
+            )
+            for worker_id, commands in enumerate(self._commands_)
+        ]
+        self._owner_ = {}
+        self._loads_ = [{} for _ in self._workers_]
+        self._late_ticks_ = [0] * len(self._workers_)
+        self._ticks_ = {}
+        self._final_stats_ = {}
+        # Commands for areas being migrated are sent to the new owner later
+        self._migrating_ = {}
+        self._last_migration_ = 0.0
+        self._queries_ = {}
+        self._query_ids_ = itertools.count()
+        self._lock_ = threading.Lock()
+        # Only one thread processes the messages of the workers at a time
+        self._poll_lock_ = threading.RLock()
+        for worker in self._workers_:
+            worker.start()
+
+    @property
+    def workers(self):
+        '''Number of worker processes'''
+        return len(self._workers_)
+
+    def worker_load(self, worker_id):
+        '''Fraction of time the worker is busy ticking its areas'''
+        return sum(self._loads_[worker_id].values())
+
+    def owner(self, channel):
+        '''Worker running a given area'''
+        return self._owner_[channel]
+
+    def _new_area_(self, room_data, channel):
+        # New areas go to the worker with less areas
+        worker_id = min(
+            range(self.workers),
+            key=lambda worker: (
+                list(self._owner_.values()).count(worker), self.worker_load(worker)
+            )
+        )
+        self._owner_[channel] = worker_id
+        self._loads_[worker_id][channel] = 0.0
+        self._commands_[worker_id].put((_HOST_, channel, room_data, None))
+        return ScheduledArea(self, room_data, channel)
+
+    def _send_(self, channel, command):
+        with self._lock_:
+            if channel in self._migrating_:
+                self._migrating_[channel].append(command)
+                return
+            self._commands_[self._owner_[channel]].put(command)
+
+    def route(self, channel, event, sender_id):
+        '''Send an event to the worker of the area'''
+        if sender_id == self.identifier:
+            return
+        self._send_(channel, (_EVENT_, channel, event, sender_id))
+
+    def query(self, channel, what, timeout=QUERY_TIMEOUT):
+        '''Ask the worker of an area for its items or actors (from any thread)'''
+        query_id = next(self._query_ids_)
+        answer = [threading.Event(), None]
+        self._queries_[query_id] = answer
+        self._send_(channel, (_QUERY_, channel, what, query_id))
+        deadline = time.perf_counter() + timeout
+        while not answer[0].is_set():
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0.0:
+                self._queries_.pop(query_id, None)
+                raise TimeoutError('Worker of area "{}" is not answering'.format(channel))
+            # Nobody else is processing the messages: wait for the answer here
+            if self._poll_lock_.acquire(blocking=False):
+                try:
+                    self.poll(timeout=min(remaining, QUERY_POLL_PERIOD))
+                finally:
+                    self._poll_lock_.release()
+            else:
+                answer[0].wait(min(remaining, QUERY_POLL_PERIOD))
+        return answer[1]
+
+    def migrate(self, channel, worker_id):
+        '''Move an area to other worker'''
+        if not 0 <= worker_id < self.workers:
+            raise ValueError('Unknown worker: {}'.format(worker_id))
+        with self._lock_:
+            if (channel in self._migrating_) or (self._owner_[channel] == worker_id):
+                return
+            source = self._owner_[channel]
+            self._migrating_[channel] = []
+            self._commands_[source].put((_EXPORT_, channel))
+            self._owner_[channel] = worker_id
+            self._loads_[worker_id][channel] = self._loads_[source].pop(channel, 0.0)
+        self._last_migration_ = time.perf_counter()
+        self.migrations += 1
+
+    def _rebalance_(self):
+        if self._migrating_ or (
+                time.perf_counter() - self._last_migration_ < MIGRATION_COOLDOWN):
+            return
+        loads = [self.worker_load(worker_id) for worker_id in range(self.workers)]
+        busiest = max(range(self.workers), key=loads.__getitem__)
+        idlest = min(range(self.workers), key=loads.__getitem__)
+        if (busiest == idlest) or (loads[busiest] <= self.budget):
+            return
+        # Hottest area that still leaves the target less loaded than the source was
+        for channel, load in sorted(
+                self._loads_[busiest].items(), key=lambda item: item[1], reverse=True):
+            if loads[idlest] + load <= loads[busiest] - MIN_IMPROVEMENT:
+                self.migrate(channel, idlest)
+                return
+
+    def poll(self, timeout=0.0):
+        '''Process messages of the workers, return False if there were none'''
+        with self._poll_lock_:
+            try:
+                message = (
+                    self._results_.get(timeout=timeout) if timeout
+                    else self._results_.get_nowait()
+                )
+            except queue.Empty:
+                return False
+            while message is not None:
+                self._process_(message)
+                try:
+                    message = self._results_.get_nowait()
+                except queue.Empty:
+                    message = None
+            return True
+
+    def _process_(self, message):
+        kind = message[0]
+        if kind == _PUBLISH_:
+            _, channel, event, sender_id = message
+            self.transport.publish(channel, event, sender_id)
+        elif kind == _LOAD_:
+            _, worker_id, loads, late_ticks, ticks = message
+            self._loads_[worker_id].update({
+                channel: load for channel, load in loads.items()
+                if self._owner_.get(channel, None) == worker_id
+            })
+            self._late_ticks_[worker_id] = late_ticks
+            self._count_ticks_(ticks)
+            self._rebalance_()
+        elif kind == _EXPORTED_:
+            _, channel, state, ticks = message
+            self._count_ticks_({channel: ticks})
+            with self._lock_:
+                target = self._commands_[self._owner_[channel]]
+                target.put((_HOST_, channel, self._area_(channel).room_data, state))
+                for command in self._migrating_.pop(channel):
+                    target.put(command)
+        elif kind == _REPLY_:
+            _, query_id, answer = message
+            waiting = self._queries_.pop(query_id, None)
+            if waiting:
+                waiting[1] = answer
+                waiting[0].set()
+        elif kind == _STOPPED_:
+            _, worker_id, stats, ticks = message
+            self._count_ticks_(ticks)
+            self._final_stats_.update(stats)
+
+    def _count_ticks_(self, ticks):
+        for channel, count in ticks.items():
+            self._ticks_[channel] = self._ticks_.get(channel, 0) + count
+
+    def _area_(self, channel):
+        for area in self.areas:
+            if area.channel == channel:
+                return area
+        raise ValueError('Unknown area: {}'.format(channel))
+
+    def tick(self):
+        '''Workers tick by themselves, just process their messages'''
+        self.transport.update()
+        self.poll()
+        self.transport.flush()
+
+    def run(self, duration=None):
+        '''Process messages of the workers until stop() or given seconds are elapsed'''
+        if self._started_ is None:
+            self._started_ = time.perf_counter()
+        start = time.perf_counter()
+        while not self._stop_.is_set():
+            if (duration is not None) and (time.perf_counter() - start >= duration):
+                break
+            self.transport.update()
+            self.poll(timeout=self._period_ or REPORT_PERIOD)
+            self.transport.flush()
+
+    def stop(self):
+        '''Stop workers, their last statistics are kept'''
+        super(AreaScheduler, self).stop()
+        for commands in self._commands_:
+            commands.put((_STOP_,))
+        deadline = time.perf_counter() + QUERY_TIMEOUT
+        while (len(self._final_stats_) < len(self._owner_)) and (time.perf_counter() < deadline):
+            self.poll(timeout=0.1)
+        for worker in self._workers_:
+            worker.join(QUERY_TIMEOUT)
+
+    def stats(self):
+        '''Load of every worker and ticks of every area'''
+        elapsed = (time.perf_counter() - self._started_) if self._started_ else None
+        areas = {}
+        for channel, worker_id in self._owner_.items():
+            ticks = self._ticks_.get(channel, 0)
+            areas[channel] = dict(self._final_stats_.get(channel, {}), ticks=ticks, worker=worker_id)
+            if elapsed:
+                areas[channel]['ticks_per_second'] = ticks / elapsed
+        return {
+            'late_ticks': sum(self._late_ticks_),
+            'migrations': self.migrations,
+            'workers': [
+                {'load': self.worker_load(worker_id), 'late_ticks': self._late_ticks_[worker_id]}
+                for worker_id in range(self.workers)
+            ],
+            'areas': areas
+        }
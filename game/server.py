@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Authoritative hosting of dungeon areas
+
+    Clients of a hosted area only send their inputs (see INPUT_EVENTS), the
+    server runs the orchestration and the room of every area at a fixed tick
+    rate and publishes the resolved events on the area channel (through any
+    game.transport.Transport).
+'''
+
+import json
+import time
+import uuid
+import pickle
+import threading
+import collections
+
+import icegauntlettool
+
+import game
+import game.level
+import game.interest
+import game.orchestration
+from game.common import IDENTIFIER, LIFE, OBJECT_CLASS, X, Y
+from game.orchestration import INPUT_EVENTS
+from game.pyxeltools import TILE_SIZE
+from game.sync import FRAMES_PER_SECOND
+
+
+# Game loop iterations per second of every area
+TICK_RATE = FRAMES_PER_SECOND
+
+# Same fields than the Item and Actor structs of icegauntlet.ice
+Item = collections.namedtuple('Item', ['itemId', 'itemType', 'positionX', 'positionY'])
+Actor = collections.namedtuple('Actor', ['actorId', 'attributes'])
+
+
+class LocalDungeonArea:
+    '''In-process stand-in of a DungeonArea proxy of a hosted area'''
+    def __init__(self, area, map_cache):
+        self.area = area
+        self.map_cache = map_cache
+
+    def getEventChannel(self): # pylint: disable=C0103
+        '''Name of the channel of the area'''
+        return self.area.channel
+
+    def getMap(self): # pylint: disable=C0103
+        '''Room data without objects (JSON)'''
+        return self.map_cache.get(self.area.room_data)[1]
+
+    def getMapIfChanged(self, etag): # pylint: disable=C0103
+        '''Room data without objects only if given etag is not the current one'''
+        return self.map_cache.get_if_changed(self.area.room_data, etag)
+
+    def getActors(self): # pylint: disable=C0103
+        '''Heroes currently in the area'''
+        return [Actor(actor_id, attributes) for actor_id, attributes in self.area.actors()]
+
+    def getItems(self): # pylint: disable=C0103
+        '''Items and doors currently in the area'''
+        return [Item(*item) for item in self.area.items()]
+
+    def getNextArea(self): # pylint: disable=C0103
+        '''Next hosted area'''
+        return LocalDungeonArea(self.area.next_area, self.map_cache)
+
+    def isAuthoritative(self): # pylint: disable=C0103
+        '''Game logic is resolved by the server'''
+        return True
+
+
+class LocalDungeon:
+    '''In-process stand-in of a Dungeon proxy of an AreaServer()'''
+    def __init__(self, server):
+        self.server = server
+
+    def getEntrance(self): # pylint: disable=C0103
+        '''First hosted area'''
+        return LocalDungeonArea(self.server.entrance, self.server.map_cache)
+
+
+class ServerOrchestration(game.orchestration.RoomOrchestration):
+    '''Orchestration without local player: resolves the game logic for every client'''
+    def __init__(self, area):
+        super(ServerOrchestration, self).__init__(area)
+        self._ticks_ = 0
+
+    def start(self):
+        self._game_objects_ = {}
+        self._load_map_()
+        # Clients get the initial objects from the area, not from the channel
+        for identifier, object_type, position in self._area_.getObjects():
+            self.fire_event(('spawn_object', identifier, object_type, *position), only_local=True)
+        # Heroes of a migrated area keep their position
+        for identifier, attributes in self._area_.getActors():
+            attributes = dict(attributes)
+            attributes[IDENTIFIER] = identifier
+            self.fire_event(('spawn_actor', identifier, attributes), only_local=True)
+            if (X in attributes) and (Y in attributes):
+                self.fire_event(
+                    ('warp_to', identifier, (attributes[X], attributes[Y])), only_local=True
+                )
+
+    def update(self):
+        '''Game loop iteration: heroes lose one life point per second'''
+        self._ticks_ += 1
+        if self._ticks_ % TICK_RATE:
+            return
+        for game_object in list(self.level.room.game_objects.values()):
+            if game_object.attribute.get(OBJECT_CLASS, None) == 'hero':
+                self._increase_attribute_(game_object.identifier, LIFE, -1)
+
+
+class ServerLevel(game.level.Level):
+    '''Level() without window'''
+    def wake_up(self):
+        self.orchestrator.start()
+
+    def render(self):
+        pass
+
+    def end_current_room(self):
+        '''Areas are never finished on the server'''
+        pass
+
+
+class HostedArea(game.LocalArea):
+    '''Area simulated by the server, events are exchanged through a channel'''
+    def __init__(self, room_data, channel, transport, server_id, state=None):
+        super(HostedArea, self).__init__(room_data)
+        self._actors_ = []
+        if state is not None:
+            # Objects and heroes exported from other server
+            self.objects = [
+                (self.handles.handle(item_id), item_type, (x, y))
+                for item_id, item_type, x, y in state['items']
+            ]
+            self._actors_ = [
+                (self.handles.handle(actor_id), json.loads(attributes))
+                for actor_id, attributes in state['actors']
+            ]
+        self.room_data = room_data
+        self.channel = channel
+        self.identifier = server_id
+        self.player = None
+        self.next_area = None
+        self.ticks = 0
+        self.busy = 0.0
+        self.received = 0
+        self.published = 0
+        self._transport_ = transport
+        self._inbox_ = collections.deque(state.get('inbox', ()) if state else ())
+        self._lock_ = threading.Lock()
+        self.level = ServerLevel(self)
+        self.level.orchestrator = ServerOrchestration(self)
+        self.level.wake_up()
+
+    @property
+    def size(self):
+        '''Size of the area in pixels'''
+        return (len(self.roomData[0]) * TILE_SIZE, len(self.roomData) * TILE_SIZE)
+
+    def getActors(self):
+        return self._actors_
+
+    def fire_event(self, event, only_local=False):
+        '''Publish a resolved event'''
+        self._transport_.publish(
+            self.channel, pickle.dumps(self.handles.to_network(event)), self.identifier
+        )
+        self.published += 1
+        if not only_local:
+            self.event_handler(event)
+
+    def receive(self, event, sender_id, sent_at=None): # pylint: disable=W0613
+        '''Queue an event from the channel (may be called from other threads)'''
+        if sender_id != self.identifier:
+            self._inbox_.append(event)
+
+    def _dispatch_inbox_(self):
+        while self._inbox_:
+            event = pickle.loads(self._inbox_.popleft())
+            if event[0] not in INPUT_EVENTS:
+                continue
+            if (event[0] == 'spawn_actor') and isinstance(event[2], str):
+                event = (event[0], event[1], json.loads(event[2]))
+            self.received += 1
+            self.event_handler(self.handles.from_network(event))
+
+    def tick(self):
+        '''Process received inputs and run a game loop iteration'''
+        with self._lock_:
+            start = time.perf_counter()
+            self._dispatch_inbox_()
+            self.level.update()
+            self.busy += time.perf_counter() - start
+            self.ticks += 1
+
+    def items(self):
+        '''Current (network identifier, type, x, y) of every item and door'''
+        with self._lock_:
+            return [
+                (self.handles.network_id(identifier), game_object.object_type,
+                 int(game_object.x / TILE_SIZE), int(game_object.y / TILE_SIZE))
+                for identifier, game_object in self.level.orchestrator.tracked_objects.items()
+                if game_object.object_class in ('item', 'door')
+            ]
+
+    def actors(self):
+        '''Current (network identifier, JSON attributes) of every hero'''
+        with self._lock_:
+            actors = []
+            for identifier, game_object in self.level.room.game_objects.items():
+                if game_object.attribute.get(OBJECT_CLASS, None) != 'hero':
+                    continue
+                network_id = self.handles.network_id(identifier)
+                attributes = dict(game_object.attribute)
+                attributes[IDENTIFIER] = network_id
+                actors.append((network_id, json.dumps(attributes)))
+            return actors
+
+    def export(self):
+        '''State needed to host the area in other server (see "state" argument)'''
+        return {'items': self.items(), 'actors': self.actors(), 'inbox': list(self._inbox_)}
+
+    def stats(self, elapsed=None):
+        '''Ticks, busy time and achievable ticks per second of the area'''
+        stats = {
+            'ticks': self.ticks,
+            'busy_seconds': self.busy,
+            'capacity_tps': (self.ticks / self.busy) if self.busy else 0.0,
+            'objects': len(self.level.room.game_objects),
+            'received': self.received,
+            'published': self.published
+        }
+        if elapsed:
+            stats['ticks_per_second'] = self.ticks / elapsed
+        return stats
+
+
+class AreaServer:
+    '''Host many areas in one process, all of them are updated at a fixed tick rate'''
+    def __init__(self, transport, tick_rate=TICK_RATE, server_id=None):
+        if (tick_rate is not None) and (tick_rate <= 0):
+            raise ValueError('Tick rate must be positive (or None to run unthrottled)')
+        self.identifier = server_id or str(uuid.uuid4())
+        self.areas = []
+        # Maps are sent without objects (clients get them with getItems())
+        self.map_cache = icegauntlettool.FilteredMapCache()
+        self.late_ticks = 0
+        self.transport = transport
+        self._period_ = (1.0 / tick_rate) if tick_rate else 0.0
+        self._stop_ = threading.Event()
+        self._started_ = None
+
+    @property
+    def entrance(self):
+        '''First hosted area'''
+        if not self.areas:
+            raise ValueError('No areas hosted')
+        return self.areas[0]
+
+    def host(self, room_data, channel=None):
+        '''Start hosting a new area (JSON room), return the HostedArea()'''
+        channel = channel or str(uuid.uuid4())
+        area = self._new_area_(room_data, channel)
+        # Positional events are sent to the cell channels
+        channels = [channel] + [
+            game.interest.cell_channel(channel, cell)
+            for cell in sorted(game.interest.area_cells(area.size))
+        ]
+        for name in channels:
+            self.transport.subscribe(name, area)
+        if self.areas:
+            self.areas[-1].next_area = area
+        area.next_area = self.areas[0] if self.areas else area
+        self.areas.append(area)
+        return area
+
+    def _new_area_(self, room_data, channel):
+        return HostedArea(room_data, channel, self.transport, self.identifier)
+
+    def tick(self):
+        '''Run one iteration of every area'''
+        self.transport.update()
+        for area in self.areas:
+            area.tick()
+        self.transport.flush()
+
+    def run(self, duration=None):
+        '''Tick areas until stop() is called or given seconds are elapsed'''
+        if self._started_ is None:
+            self._started_ = time.perf_counter()
+        start = next_tick = time.perf_counter()
+        while not self._stop_.is_set():
+            now = time.perf_counter()
+            if (duration is not None) and (now - start >= duration):
+                break
+            if now < next_tick:
+                self._stop_.wait(next_tick - now)
+                continue
+            self.tick()
+            next_tick += self._period_
+            if self._period_ and (time.perf_counter() > next_tick):
+                # Too slow: skip the lost ticks instead of running in bursts
+                self.late_ticks += 1
+                next_tick = time.perf_counter()
+
+    def stop(self):
+        '''Stop run() loop, the server cannot be run again'''
+        self._stop_.set()
+
+    @property
+    def stopped(self):
+        '''True if stop() was called'''
+        return self._stop_.is_set()
+
+    def stats(self):
+        '''Statistics of every hosted area'''
+        elapsed = (time.perf_counter() - self._started_) if self._started_ else None
+        return {
+            'late_ticks': self.late_ticks,
+            'areas': {area.channel: area.stats(elapsed) for area in self.areas}
+        }
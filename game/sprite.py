@@ -36,6 +36,10 @@ class Drawable:
         '''Only used in animations'''
         pass
 
+    def reset(self):
+        '''Only used in animations'''
+        pass
+
     @property
     def ended(self):
         '''On Animations this should be redefined'''
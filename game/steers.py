@@ -6,11 +6,20 @@
     Steers implementation
 '''
 
+import time
 import random
 
 import pyxel
 
-from game.common import DIR_X, DIR_Y
+from game.common import X, Y, DIR_X, DIR_Y, SPEED, EXIT
+from game.sync import FRAMES_PER_SECOND, INTERPOLATION_DELAY, PositionBuffer
+from game.pyxeltools import TILE_SIZE
+
+
+# Network steer: fraction of the position error corrected per frame
+_CORRECTION_FACTOR_ = 0.2
+# Network steer: errors bigger than this (in pixels) are not smoothed
+_WARP_DISTANCE_ = 64
 
 
 _ANIM_ = {
@@ -41,6 +50,10 @@ class Steer:
         '''Run a game loop iteration'''
         raise NotImplementedError()
 
+    def reset(self):
+        '''Forget any state, used when the actor is reused'''
+        pass
+
 
 class Static(Steer):
     '''This steer does nothing'''
@@ -137,9 +150,174 @@ class Random(Steer):
          self.last_dir_y) = (self.actor.attribute[DIR_X], self.actor.attribute[DIR_Y])
 
 
+class Network(Steer):
+    '''This steer follows an actor controlled by a remote peer'''
+    last_dir_x = 0
+    last_dir_y = 0
+    error_x = 0
+    error_y = 0
+    def synchronize(self, position, dir_x=None, dir_y=None, latency=0.0):
+        '''Correct the actor with an authoritative position received after given latency'''
+        if dir_x is not None:
+            self.actor.attribute[DIR_X] = dir_x
+        if dir_y is not None:
+            self.actor.attribute[DIR_Y] = dir_y
+        # Extrapolate where the remote actor is now
+        distance = self.actor.attribute[SPEED] * latency * FRAMES_PER_SECOND
+        self.aim(
+            position[0] + (self.actor.attribute[DIR_X] * distance),
+            position[1] + (self.actor.attribute[DIR_Y] * distance)
+        )
+
+    def aim(self, target_x, target_y):
+        '''Set the position to be reached by smooth correction, warp if too far'''
+        self.error_x = round(target_x - self.actor.attribute[X])
+        self.error_y = round(target_y - self.actor.attribute[Y])
+        if max(abs(self.error_x), abs(self.error_y)) > _WARP_DISTANCE_:
+            self.actor.position = (round(target_x), round(target_y))
+            self.error_x = self.error_y = 0
+
+    def update(self):
+        if self.actor.state == 'exit':
+            self.actor.attribute[DIR_X] = self.actor.attribute[DIR_Y] = 0
+            return
+
+        # Direction is kept until next update from the network (dead reckoning),
+        # position error is corrected smoothly
+        if self.error_x or self.error_y:
+            step_x = _correction_step_(self.error_x)
+            step_y = _correction_step_(self.error_y)
+            self.actor.attribute[X] += step_x
+            self.actor.attribute[Y] += step_y
+            self.error_x -= step_x
+            self.error_y -= step_y
+
+        if ((self.last_dir_x != self.actor.attribute[DIR_X]) or
+                (self.last_dir_y != self.actor.attribute[DIR_Y])):
+            if not self.actor.attribute[DIR_X] == self.actor.attribute[DIR_Y] == 0:
+                self.actor.state = _ANIM_[self.actor.attribute[DIR_X]][self.actor.attribute[DIR_Y]]
+        (self.last_dir_x,
+         self.last_dir_y) = (self.actor.attribute[DIR_X], self.actor.attribute[DIR_Y])
+
+
+class Interpolated(Network):
+    '''
+        This steer draws a remote actor INTERPOLATION_DELAY seconds in the past, between
+        the positions received from the peer, instead of extrapolating them. Between
+        received positions (and after the last one) it behaves as the Network steer.
+    '''
+    def __init__(self, actor=None):
+        super(Interpolated, self).__init__(actor)
+        self._buffer_ = PositionBuffer()
+        self._last_received_ = None
+
+    def reset(self):
+        self._buffer_ = PositionBuffer()
+        self._last_received_ = None
+
+    # pylint: disable=W0613
+    def synchronize(self, position, dir_x=None, dir_y=None, latency=0.0):
+        if dir_x is not None:
+            self.actor.attribute[DIR_X] = dir_x
+        if dir_y is not None:
+            self.actor.attribute[DIR_Y] = dir_y
+        self._last_received_ = time.time()
+        self._buffer_.push(self.actor.identifier, position, self._last_received_)
+    # pylint: enable=W0613
+
+    def update(self):
+        now = time.time()
+        if (self._last_received_ is not None) and (
+                now - INTERPOLATION_DELAY < self._last_received_):
+            target_x, target_y = self._buffer_.sample(self.actor.identifier, now)
+            # The actor will still move by its direction after the steer
+            self.aim(
+                target_x - (self.actor.attribute[SPEED] * self.actor.attribute[DIR_X]),
+                target_y - (self.actor.attribute[SPEED] * self.actor.attribute[DIR_Y])
+            )
+        super(Interpolated, self).update()
+
+
+def _correction_step_(error):
+    if error == 0:
+        return 0
+    step = int(error * _CORRECTION_FACTOR_)
+    if step == 0:
+        step = 1 if error > 0 else -1
+    return step
+
+
+class Seek(Steer):
+    '''This steer walks to the closest item of a given type (exit by default)'''
+    target = (EXIT,)
+    notify = True
+    last_dir_x = 0
+    last_dir_y = 0
+    waypoint = None
+    def distance_field(self):
+        '''DistanceField to follow'''
+        return self.actor.room.distance_field(self.target)
+
+    def reset(self):
+        self.waypoint = None
+        self.last_dir_x = self.last_dir_y = 0
+
+    def update(self):
+        if self.actor.state == 'exit':
+            self.actor.attribute[DIR_X] = self.actor.attribute[DIR_Y] = 0
+            return
+
+        position = (self.actor.attribute[X], self.actor.attribute[Y])
+        if (self.waypoint is None) or (self.waypoint == position):
+            # Choose next tile only when the actor is aligned with the tile grid
+            tile_x, tile_y = round(position[0] / TILE_SIZE), round(position[1] / TILE_SIZE)
+            dir_x, dir_y = self.distance_field().next_step(tile_x, tile_y)
+            self.waypoint = ((tile_x + dir_x) * TILE_SIZE, (tile_y + dir_y) * TILE_SIZE)
+
+        self.actor.attribute[DIR_X] = _sign_(self.waypoint[0] - position[0])
+        self.actor.attribute[DIR_Y] = _sign_(self.waypoint[1] - position[1])
+        # Avoid overshooting the waypoint
+        speed = self.actor.attribute[SPEED]
+        for axis, attribute in [(0, X), (1, Y)]:
+            if abs(self.waypoint[axis] - position[axis]) < speed:
+                self.actor.attribute[attribute] = self.waypoint[axis]
+                self.actor.attribute[DIR_X if axis == 0 else DIR_Y] = 0
+
+        if ((self.last_dir_x != self.actor.attribute[DIR_X]) or
+                (self.last_dir_y != self.actor.attribute[DIR_Y])):
+            if not self.actor.attribute[DIR_X] == self.actor.attribute[DIR_Y] == 0:
+                self.actor.state = _ANIM_[self.actor.attribute[DIR_X]][self.actor.attribute[DIR_Y]]
+            if self.notify:
+                self.actor.room.fire_event(
+                    ('set_direction', self.actor.identifier,
+                     self.actor.attribute[DIR_X], self.actor.attribute[DIR_Y])
+                )
+        (self.last_dir_x,
+         self.last_dir_y) = (self.actor.attribute[DIR_X], self.actor.attribute[DIR_Y])
+
+
+class Horde(Seek):
+    '''
+        This steer chases the closest hero using the flow field of the room, shared
+        by every enemy. Heroes are synchronized so every peer computes the same
+        directions, there is no need to send them.
+    '''
+    notify = False
+    def distance_field(self):
+        return self.actor.room.flow_field
+
+
+def _sign_(value):
+    return (value > 0) - (value < 0)
+
+
 _STEERS_ = {
     'Player1': Player1,
-    'Random': Random
+    'Random': Random,
+    'Network': Network,
+    'Interpolated': Interpolated,
+    'Seek': Seek,
+    'Horde': Horde
 }
 
 
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Delta-compressed actor snapshots used to synchronize remote players
+'''
+
+import time
+import heapq
+import random
+import itertools
+import collections
+
+from game.common import X, Y, DIR_X, DIR_Y, SPEED, STATE, LIFE, SCORE, KEYS
+
+
+# Seconds between two snapshots of the local hero
+SNAPSHOT_PERIOD = 0.1
+# Every KEYFRAME_INTERVAL snapshots all fields are sent, not only the changed ones
+KEYFRAME_INTERVAL = 20
+# Positions travel as multiples of POSITION_QUANTUM pixels
+POSITION_QUANTUM = 2
+# Positions are not sent while receivers can predict them with this error (in pixels)
+POSITION_TOLERANCE = 8
+# Expected one-way delay of the event channel, used to extrapolate received positions
+ASSUMED_LATENCY = 0.1
+# Pyxel default frame rate
+FRAMES_PER_SECOND = 30
+# Interpolated remote actors are drawn this many seconds in the past
+INTERPOLATION_DELAY = 0.15
+# Received positions kept per remote actor for interpolation
+POSITION_HISTORY = 8
+
+# Fields are sent by its index in this tuple, do not reorder!
+SNAPSHOT_FIELDS = (X, Y, DIR_X, DIR_Y, STATE, LIFE, SCORE, KEYS)
+_QUANTIZED_FIELDS_ = (X, Y)
+
+
+def quantize(value):
+    '''Convert a position in pixels to network units'''
+    return int(round(value / POSITION_QUANTUM))
+
+
+def dequantize(value):
+    '''Convert a position in network units to pixels'''
+    return value * POSITION_QUANTUM
+
+
+def changed_fields(delta):
+    '''List of fields included in a snapshot'''
+    return [SNAPSHOT_FIELDS[index] for index, _ in delta]
+
+
+class DeadReckoning:
+    '''Predict the position of an actor from its last known position and direction'''
+    def __init__(self, fps=FRAMES_PER_SECOND):
+        self._fps_ = fps
+        self._position_ = (0, 0)
+        self._direction_ = (0, 0)
+        self._speed_ = 0
+        self._timestamp_ = 0.0
+
+    @property
+    def direction(self):
+        '''Direction used in the prediction'''
+        return self._direction_
+
+    def reset(self, position, direction, speed, timestamp=None):
+        '''Start a new prediction'''
+        self._position_ = position
+        self._direction_ = direction
+        self._speed_ = speed
+        self._timestamp_ = time.time() if timestamp is None else timestamp
+
+    def predict(self, timestamp=None):
+        '''Predicted position at given time'''
+        timestamp = time.time() if timestamp is None else timestamp
+        distance = self._speed_ * self._fps_ * max(0.0, timestamp - self._timestamp_)
+        return (
+            self._position_[0] + (self._direction_[0] * distance),
+            self._position_[1] + (self._direction_[1] * distance)
+        )
+
+
+class SnapshotEncoder:
+    '''Build snapshots of actors with only the fields changed since the last one'''
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL, tolerance=POSITION_TOLERANCE):
+        self._keyframe_interval_ = keyframe_interval
+        self._tolerance_ = tolerance
+        self._sent_ = {}
+        self._sequence_ = {}
+        self._calls_ = {}
+        self._reckoning_ = {}
+
+    def encode(self, identifier, attributes, timestamp=None):
+        '''Return a (sequence, delta) pair or None if there is nothing to send'''
+        timestamp = time.time() if timestamp is None else timestamp
+        current = [
+            quantize(attributes.get(field, 0)) if field in _QUANTIZED_FIELDS_
+            else attributes.get(field, None)
+            for field in SNAPSHOT_FIELDS
+        ]
+        calls = self._calls_.get(identifier, 0)
+        self._calls_[identifier] = calls + 1
+        previous = self._sent_.get(identifier, None)
+        keyframe = (previous is None) or (calls % self._keyframe_interval_ == 0)
+
+        position = (attributes.get(X, 0), attributes.get(Y, 0))
+        direction = (attributes.get(DIR_X, 0), attributes.get(DIR_Y, 0))
+        reckoning = self._reckoning_.setdefault(identifier, DeadReckoning())
+        predictable = False
+        if not keyframe:
+            predicted = reckoning.predict(timestamp)
+            predictable = (direction == reckoning.direction) and (
+                max(abs(position[0] - predicted[0]), abs(position[1] - predicted[1]))
+                <= self._tolerance_
+            )
+            if predictable:
+                # Receivers will guess it
+                current[0], current[1] = previous[0], previous[1]
+
+        # Both coordinates are sent together when prediction fails
+        delta = tuple(
+            (index, value) for index, value in enumerate(current)
+            if (value is not None) and (
+                keyframe or (value != previous[index]) or
+                ((not predictable) and (index in (0, 1)))
+            )
+        )
+        if not delta:
+            return None
+        if not predictable:
+            reckoning.reset(position, direction, attributes.get(SPEED, 0), timestamp)
+        sequence = self._sequence_.get(identifier, -1) + 1
+        self._sequence_[identifier] = sequence
+        self._sent_[identifier] = current
+        return sequence, delta
+
+    def forget(self, identifier):
+        '''Next snapshot of the actor will be a keyframe'''
+        self._sent_.pop(identifier, None)
+        self._calls_.pop(identifier, None)
+        self._reckoning_.pop(identifier, None)
+
+
+class SnapshotDecoder:
+    '''Rebuild the full state of remote actors from received snapshots'''
+    def __init__(self):
+        self._states_ = {}
+        self._sequence_ = {}
+
+    def decode(self, identifier, sequence, delta):
+        '''Apply a delta and return the full known state, None if snapshot is outdated'''
+        if sequence <= self._sequence_.get(identifier, -1):
+            return None
+        self._sequence_[identifier] = sequence
+        state = self._states_.setdefault(identifier, {})
+        for index, value in delta:
+            field = SNAPSHOT_FIELDS[index]
+            state[field] = dequantize(value) if field in _QUANTIZED_FIELDS_ else value
+        return dict(state)
+
+    def forget(self, identifier):
+        '''Drop known state of an actor'''
+        self._states_.pop(identifier, None)
+        self._sequence_.pop(identifier, None)
+
+
+class PositionBuffer:
+    '''Recent positions of remote actors, sampled with a fixed delay'''
+    def __init__(self, delay=INTERPOLATION_DELAY, history=POSITION_HISTORY):
+        self._delay_ = delay
+        self._history_ = history
+        self._positions_ = {}
+
+    @property
+    def identifiers(self):
+        '''Actors with known positions'''
+        return list(self._positions_.keys())
+
+    def push(self, identifier, position, timestamp=None):
+        '''Store a new received position'''
+        timestamp = time.time() if timestamp is None else timestamp
+        if identifier not in self._positions_:
+            self._positions_[identifier] = collections.deque(maxlen=self._history_)
+        self._positions_[identifier].append((timestamp, position))
+
+    def sample(self, identifier, now=None):
+        '''Interpolated position of the actor, None if unknown'''
+        history = self._positions_.get(identifier, None)
+        if not history:
+            return None
+        render_time = (time.time() if now is None else now) - self._delay_
+        newer_time, newer_position = history[-1]
+        if render_time >= newer_time:
+            return newer_position
+        for older_time, older_position in reversed(history):
+            if older_time <= render_time:
+                factor = (render_time - older_time) / (newer_time - older_time)
+                return (
+                    round(older_position[0] + (newer_position[0] - older_position[0]) * factor),
+                    round(older_position[1] + (newer_position[1] - older_position[1]) * factor)
+                )
+            newer_time, newer_position = older_time, older_position
+        return newer_position
+
+    def forget(self, identifier):
+        '''Drop stored positions of an actor'''
+        self._positions_.pop(identifier, None)
+
+
+class DelayedChannel:
+    '''Local stand-in of an event channel that delivers events after a simulated delay'''
+    def __init__(self, delay=ASSUMED_LATENCY, jitter=0.0, seed=None):
+        self._delay_ = delay
+        self._jitter_ = jitter
+        self._random_ = random.Random(seed)
+        self._pending_ = []
+        self._order_ = itertools.count()
+        self._subscribers_ = []
+
+    def subscribe(self, event_handler):
+        '''Add a new event_handler(event, sender_id)'''
+        self._subscribers_.append(event_handler)
+
+    def publish(self, event, sender_id, timestamp=None):
+        '''Queue event to be delivered to every subscriber'''
+        timestamp = time.time() if timestamp is None else timestamp
+        delay = max(0.0, self._delay_ + self._random_.uniform(-self._jitter_, self._jitter_))
+        heapq.heappush(self._pending_, (timestamp + delay, next(self._order_), event, sender_id))
+
+    def deliver(self, timestamp=None):
+        '''Deliver every event whose delay is over, return number of events delivered'''
+        timestamp = time.time() if timestamp is None else timestamp
+        delivered = 0
+        while self._pending_ and (self._pending_[0][0] <= timestamp):
+            _, _, event, sender_id = heapq.heappop(self._pending_)
+            for event_handler in self._subscribers_:
+                event_handler(event, sender_id)
+            delivered += 1
+        return delivered
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Network telemetry: messages, bytes, pickling time and latency per event type
+
+    Counters do nothing until telemetry is enabled. Latency is measured from
+    the send time carried by the events (see ice_transport), so the clocks of
+    the peers should be synchronized. Events of peers that do not send it are
+    counted but have no latency.
+'''
+
+import json
+import time
+import logging
+import threading
+import collections
+
+
+# Upper bounds (milliseconds) of the latency histogram buckets
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+# Seconds between log lines (and dumps)
+DEFAULT_REPORT_PERIOD = 10.0
+
+
+class _Counters:
+    '''Counters of one event type'''
+    def __init__(self):
+        self.sent = 0
+        self.sent_bytes = 0
+        self.pickling = 0.0
+        self.received = 0
+        self.received_bytes = 0
+        self.unpickling = 0.0
+        self.latencies = 0
+        self.latency = 0.0
+        self.max_latency = 0.0
+        # One more bucket for the latencies over the last bound
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def add_latency(self, latency):
+        '''Account one sender-to-receiver latency (seconds)'''
+        self.latencies += 1
+        self.latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        milliseconds = latency * 1000.0
+        for bucket, bound in enumerate(LATENCY_BUCKETS):
+            if milliseconds <= bound:
+                self.histogram[bucket] += 1
+                return
+        self.histogram[-1] += 1
+
+    def report(self, elapsed):
+        '''Rates and means of the counters'''
+        labels = ['<={}ms'.format(bound) for bound in LATENCY_BUCKETS]
+        labels.append('>{}ms'.format(LATENCY_BUCKETS[-1]))
+        return {
+            'sent_per_second': self.sent / elapsed,
+            'sent_bytes_per_second': self.sent_bytes / elapsed,
+            'pickle_ms': (self.pickling * 1000.0 / self.sent) if self.sent else 0.0,
+            'received_per_second': self.received / elapsed,
+            'received_bytes_per_second': self.received_bytes / elapsed,
+            'unpickle_ms': (
+                (self.unpickling * 1000.0 / self.received) if self.received else 0.0
+            ),
+            'latency_mean_ms': (
+                (self.latency * 1000.0 / self.latencies) if self.latencies else None
+            ),
+            'latency_max_ms': (self.max_latency * 1000.0) if self.latencies else None,
+            'latency_histogram': dict(zip(labels, self.histogram))
+        }
+
+
+class NetworkTelemetry:
+    '''Count the events sent and received through the event channels'''
+    def __init__(self, report_period=DEFAULT_REPORT_PERIOD, clock=time.time):
+        self.enabled = False
+        self.dump_file = None
+        self.report_period = report_period
+        self._clock_ = clock
+        # Events are received by the threads of the transport
+        self._lock_ = threading.Lock()
+        self._counters_ = collections.defaultdict(_Counters)
+        self._started_ = None
+        self._last_report_ = None
+
+    def enable(self, dump_file=None, report_period=None):
+        '''Start counting, report periodically to the log (and to a JSON file)'''
+        if (report_period is not None) and (report_period <= 0):
+            raise ValueError('Report period must be positive')
+        self.enabled = True
+        self.dump_file = dump_file
+        if report_period is not None:
+            self.report_period = report_period
+        self._started_ = self._last_report_ = self._clock_()
+
+    def sent(self, event_type, size, pickling):
+        '''Count a published event: size in bytes, pickling time in seconds'''
+        if not self.enabled:
+            return
+        with self._lock_:
+            counters = self._counters_[event_type]
+            counters.sent += 1
+            counters.sent_bytes += size
+            counters.pickling += pickling
+        self._report_if_needed_()
+
+    def received(self, event_type, size, unpickling, sent_at=None):
+        '''Count a received event, sent_at is the send time given by the sender (if any)'''
+        if not self.enabled:
+            return
+        with self._lock_:
+            counters = self._counters_[event_type]
+            counters.received += 1
+            counters.received_bytes += size
+            counters.unpickling += unpickling
+            if sent_at is not None:
+                counters.add_latency(max(0.0, self._clock_() - sent_at))
+        self._report_if_needed_()
+
+    def report(self):
+        '''Counters of every event type since telemetry was enabled'''
+        if not self.enabled:
+            return {}
+        elapsed = max(self._clock_() - self._started_, 1e-6)
+        with self._lock_:
+            return {
+                'seconds': elapsed,
+                'events': {
+                    event_type: counters.report(elapsed)
+                    for event_type, counters in sorted(self._counters_.items())
+                }
+            }
+
+    def summary(self):
+        '''Single line with the totals of every event type'''
+        if not self.enabled:
+            return ''
+        elapsed = max(self._clock_() - self._started_, 1e-6)
+        with self._lock_:
+            counters = list(self._counters_.values())
+        latencies = sum(counter.latencies for counter in counters)
+        latency = sum(counter.latency for counter in counters)
+        return 'out: {:.1f} msg/s {:.1f} KB/s, in: {:.1f} msg/s {:.1f} KB/s, latency: {}'.format(
+            sum(counter.sent for counter in counters) / elapsed,
+            sum(counter.sent_bytes for counter in counters) / elapsed / 1024.0,
+            sum(counter.received for counter in counters) / elapsed,
+            sum(counter.received_bytes for counter in counters) / elapsed / 1024.0,
+            '{:.1f} ms'.format(latency * 1000.0 / latencies) if latencies else 'unknown'
+        )
+
+    def dump(self, filename=None):
+        '''Write the report to a JSON file'''
+        filename = filename or self.dump_file
+        if not (self.enabled and filename):
+            return
+        with open(filename, 'w') as contents:
+            json.dump(self.report(), contents, indent=2)
+
+    def _report_if_needed_(self):
+        now = self._clock_()
+        with self._lock_:
+            if now - self._last_report_ < self.report_period:
+                return
+            self._last_report_ = now
+        logging.info('Network telemetry: %s', self.summary())
+        self.dump()
+
+
+# Telemetry used by the network clients
+TELEMETRY = NetworkTelemetry()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Transports: how areas exchange events and reach the dungeon
+
+    Events travel pickled through named channels. A receiver is any object
+    with a receive(event, sender_id, sent_at=None) method, sent_at is the
+    publishing time (see now()) when the transport knows it. Area objects returned by
+    fetch_entrance() and fetch_next_area() follow the DungeonArea interface
+    of icegauntlet.ice.
+'''
+
+import time
+import heapq
+import random
+import itertools
+
+
+class Transport:
+    '''Transport interface'''
+    def publish(self, channel, event, sender_id):
+        '''Send a pickled event to every receiver of a channel'''
+        raise NotImplementedError()
+
+    def subscribe(self, channel, receiver):
+        '''Deliver the events of a channel to the receiver'''
+        raise NotImplementedError()
+
+    def unsubscribe(self, channel, receiver):
+        '''Stop delivering the events of a channel to the receiver'''
+        raise NotImplementedError()
+
+    def fetch_entrance(self):
+        '''First area of the dungeon'''
+        raise NotImplementedError()
+
+    def fetch_next_area(self, area):
+        '''Area after a given one'''
+        return area.getNextArea()
+
+    def now(self):
+        '''Current time (seconds) as seen by the transport'''
+        return time.time()
+
+    def update(self):
+        '''Deliver pending events, called once per frame'''
+        pass
+
+    def flush(self):
+        '''Send events queued during the frame, called at the end of every frame'''
+        pass
+
+    def advance(self, seconds):
+        '''Let given seconds pass (only simulated transports need it)'''
+        pass
+
+
+class LoopbackTransport(Transport):
+    '''
+        In-process channels with simulated latency, jitter and loss. With a
+        simulated clock time only passes on advance(): same seed, same run.
+    '''
+    def __init__(self, latency=0.0, jitter=0.0, loss=0.0, seed=None, simulated=False,
+                 dungeon=None):
+        if (latency < 0.0) or (jitter < 0.0):
+            raise ValueError('Latency and jitter cannot be negative')
+        if not 0.0 <= loss < 1.0:
+            raise ValueError('Loss must be a probability lower than 1')
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.simulated = simulated
+        # Object with the DungeonArea-like getEntrance() (see game.server.LocalDungeon)
+        self.dungeon = dungeon
+        self.sent = 0
+        self.delivered = 0
+        self.dropped = 0
+        self._random_ = random.Random(seed)
+        self._channels_ = {}
+        self._pending_ = []
+        self._sequence_ = itertools.count()
+        # Events of a receiver are never reordered (like a TCP connection)
+        self._last_delivery_ = {}
+        self._time_ = 0.0
+
+    def now(self):
+        if self.simulated:
+            return self._time_
+        return time.time()
+
+    def publish(self, channel, event, sender_id):
+        now = self.now()
+        for receiver in list(self._channels_.get(channel, [])):
+            self.sent += 1
+            if self.loss and (self._random_.random() < self.loss):
+                self.dropped += 1
+                continue
+            delay = self.latency
+            if self.jitter:
+                delay = max(0.0, delay + self._random_.uniform(-self.jitter, self.jitter))
+            if not delay and not self._pending_:
+                self.delivered += 1
+                receiver.receive(event, sender_id, now)
+                continue
+            deliver_at = max(now + delay, self._last_delivery_.get(receiver, 0.0))
+            self._last_delivery_[receiver] = deliver_at
+            heapq.heappush(
+                self._pending_,
+                (deliver_at, next(self._sequence_), receiver, event, sender_id, now)
+            )
+
+    def subscribe(self, channel, receiver):
+        receivers = self._channels_.setdefault(channel, [])
+        if receiver not in receivers:
+            receivers.append(receiver)
+
+    def unsubscribe(self, channel, receiver):
+        receivers = self._channels_.get(channel, [])
+        if receiver in receivers:
+            receivers.remove(receiver)
+
+    def fetch_entrance(self):
+        if self.dungeon is None:
+            raise ValueError('No dungeon attached to the transport')
+        return self.dungeon.getEntrance()
+
+    @property
+    def pending(self):
+        '''Number of events not delivered yet'''
+        return len(self._pending_)
+
+    def update(self):
+        '''Deliver every event whose delivery time has come'''
+        now = self.now()
+        while self._pending_ and (self._pending_[0][0] <= now):
+            _, _, receiver, event, sender_id, sent_at = heapq.heappop(self._pending_)
+            self.delivered += 1
+            receiver.receive(event, sender_id, sent_at)
+
+    def advance(self, seconds):
+        if self.simulated:
+            self._time_ += seconds
+        self.update()
+
+    def stats(self):
+        '''Counters of the transport'''
+        return {
+            'sent': self.sent,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'pending': self.pending
+        }
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# pylint: disable=W0613,C0103
+
+'''
+    Transport over Ice and IceStorm (see game.transport)
+'''
+
+import time
+
+import Ice
+
+# pylint: disable=E0401
+# pylint: disable=C0413
+import IceStorm
+Ice.loadSlice('icegauntlet.ice')
+import IceGauntlet
+# pylint: enable=E0401
+# pylint: enable=C0413
+
+import game.transport
+from game.profiler import PROFILER, PUBLISH
+
+
+# Invocation modes of the publishers
+TWOWAY = 'twoway'
+ONEWAY = 'oneway'
+BATCH = 'batch'
+PUBLISH_MODES = (TWOWAY, ONEWAY, BATCH)
+
+# Key of the request context with the publishing time (old peers just ignore it)
+SENT_AT = 'sent_at'
+
+
+def _sent_at_(current):
+    '''Publishing time given by the sender, None if not given'''
+    if (current is None) or (SENT_AT not in current.ctx):
+        return None
+    try:
+        return float(current.ctx[SENT_AT])
+    except ValueError:
+        return None
+
+
+class DungeonAreaSyncI(IceGauntlet.DungeonAreaSync):
+    '''Deliver the events of the area channels to a receiver'''
+    def __init__(self, receiver):
+        self.receiver = receiver
+
+    def fireEvent(self, event, senderId, current=None):
+        '''Hand the event to the receiver'''
+        self.receiver.receive(event, senderId, _sent_at_(current))
+
+
+class IceTransport(game.transport.Transport):
+    '''
+        Channels are IceStorm topics, areas are DungeonArea proxies. Twoway
+        publishers wait for IceStorm on every event, oneway ones do not and
+        batch ones send all the events of a frame at once in flush()
+    '''
+    def __init__(self, topic_manager, adapter, dungeon=None, publish_mode=TWOWAY):
+        if publish_mode not in PUBLISH_MODES:
+            raise ValueError('Unknown publish mode: {}'.format(publish_mode))
+        self.topic_manager = topic_manager
+        self.adapter = adapter
+        self.dungeon = dungeon
+        self.publish_mode = publish_mode
+        self.published = 0
+        self.frames = 0
+        # Seconds spent publishing: current frame, every frame and worst frame
+        self._frame_time_ = 0.0
+        self._publish_time_ = 0.0
+        self._max_frame_time_ = 0.0
+        self._publishers_ = {}
+        # Every receiver is served by one servant, subscribed to many topics
+        self._subscribers_ = {}
+        self._subscriptions_ = {}
+
+    def get_topic(self, name):
+        '''Retrieve a topic, create it if not exists'''
+        try:
+            return self.topic_manager.retrieve(name)
+        except IceStorm.NoSuchTopic:
+            pass
+        try:
+            return self.topic_manager.create(name)
+        except IceStorm.TopicExists:
+            return self.topic_manager.retrieve(name)
+
+    def _publisher_(self, channel):
+        if channel not in self._publishers_:
+            publisher = self.get_topic(channel).getPublisher()
+            if self.publish_mode == ONEWAY:
+                publisher = publisher.ice_oneway()
+            elif self.publish_mode == BATCH:
+                publisher = publisher.ice_batchOneway()
+            self._publishers_[channel] = IceGauntlet.DungeonAreaSyncPrx.uncheckedCast(publisher)
+        return self._publishers_[channel]
+
+    def publish(self, channel, event, sender_id):
+        PROFILER.start(PUBLISH)
+        start = time.perf_counter()
+        self._publisher_(channel).fireEvent(event, sender_id, {SENT_AT: repr(time.time())})
+        self._frame_time_ += time.perf_counter() - start
+        PROFILER.stop(PUBLISH)
+        self.published += 1
+
+    def flush(self):
+        '''Send the batched events of the frame, account the time spent publishing'''
+        if self.publish_mode == BATCH:
+            PROFILER.start(PUBLISH)
+            start = time.perf_counter()
+            for publisher in self._publishers_.values():
+                publisher.ice_flushBatchRequests()
+            self._frame_time_ += time.perf_counter() - start
+            PROFILER.stop(PUBLISH)
+        self.frames += 1
+        self._publish_time_ += self._frame_time_
+        self._max_frame_time_ = max(self._max_frame_time_, self._frame_time_)
+        self._frame_time_ = 0.0
+
+    def subscribe(self, channel, receiver):
+        if receiver not in self._subscribers_:
+            self._subscribers_[receiver] = self.adapter.addWithUUID(DungeonAreaSyncI(receiver))
+            self._subscriptions_[receiver] = set()
+        try:
+            self.get_topic(channel).subscribeAndGetPublisher({}, self._subscribers_[receiver])
+        except IceStorm.AlreadySubscribed:
+            pass
+        self._subscriptions_[receiver].add(channel)
+
+    def unsubscribe(self, channel, receiver):
+        if receiver not in self._subscribers_:
+            return
+        subscriber = self._subscribers_[receiver]
+        self.get_topic(channel).unsubscribe(subscriber)
+        self._subscriptions_[receiver].discard(channel)
+        if not self._subscriptions_[receiver]:
+            # Servant is not needed anymore
+            self.adapter.remove(subscriber.ice_getIdentity())
+            del self._subscribers_[receiver]
+            del self._subscriptions_[receiver]
+
+    def fetch_entrance(self):
+        if self.dungeon is None:
+            raise ValueError('No dungeon proxy given')
+        return self.dungeon.getEntrance()
+
+    def stats(self):
+        '''Published events and milliseconds per frame spent publishing them'''
+        return {
+            'publish_mode': self.publish_mode,
+            'published': self.published,
+            'frames': self.frames,
+            'publish_ms_per_frame': (
+                (self._publish_time_ * 1000.0 / self.frames) if self.frames else 0.0
+            ),
+            'max_publish_ms': self._max_frame_time_ * 1000.0
+        }
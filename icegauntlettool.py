@@ -5,6 +5,18 @@ Tools for IceGauntlet Dungeon server
 '''
 
 import json
+import time
+import uuid
+import bisect
+import hashlib
+import threading
+import collections
+import concurrent.futures
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 # Following definitions are taken from game/common.py
@@ -17,6 +29,8 @@ JAR = 113
 
 DOORS = list(range(19, 34))
 
+WALL_TILES = list(range(0, 16))
+
 EMPTY_TILE = 48
 NULL_TILE = 255
 
@@ -27,9 +41,60 @@ WIZARD_SPAWN = DEFAULT_SPAWN + 3
 ELF_SPAWN = DEFAULT_SPAWN + 4
 SPAWN_IDS = [DEFAULT_SPAWN, WARRIOR_SPAWN, VALKYRIE_SPAWN, WIZARD_SPAWN, ELF_SPAWN]
 
-AVAILABLE_OBJECT_IDS = [KEY, TREASURE, EXIT, TELEPORT, HAM, JAR] + DOORS + SPAWN_IDS
+GRUNT_GENERATOR = 124
+DEMON_GENERATOR = 125
+GHOST_GENERATOR = 126
+GENERATORS = [GHOST_GENERATOR, GRUNT_GENERATOR, DEMON_GENERATOR]
+
+AVAILABLE_OBJECT_IDS = [KEY, TREASURE, EXIT, TELEPORT, HAM, JAR] + DOORS + SPAWN_IDS + GENERATORS
+
+# Lookup tables indexed by tile ID
+_OBJECT_SET_ = frozenset(AVAILABLE_OBJECT_IDS)
+_SPAWN_SET_ = frozenset(SPAWN_IDS)
+_WALL_SET_ = frozenset(WALL_TILES)
+_FILTER_TABLE_ = [
+    EMPTY_TILE if (tile in _OBJECT_SET_) or (tile == NULL_TILE) else tile
+    for tile in range(NULL_TILE + 1)
+]
+if numpy is not None:
+    _FILTER_ARRAY_ = numpy.array(_FILTER_TABLE_, dtype=numpy.int16)
+    _OBJECT_ARRAY_ = numpy.array(
+        [tile in _OBJECT_SET_ for tile in range(NULL_TILE + 1)], dtype=bool
+    )
+
+# Taken from game/pyxeltools.py
+MAX_MAP_WIDTH = 256
+MAX_MAP_HEIGHT = 256
+
+# Results of bulk publishing, named as IceGauntlet.PublishStatus
+PUBLISHED = 'Published'
+WRONG_FORMAT = 'WrongFormat'
+ALREADY_EXISTS = 'AlreadyExists'
+# Smaller batches are not worth a process pool
+MIN_PARALLEL_BATCH = 16
 
-# Taken from game/room.py
+# Paginated room listings
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Orderings of the room listings, tagged in the cursors
+_BY_NAME_ = 'name'
+_BY_SIZE_ = 'size'
+
+# Server-side cache of filtered maps
+DEFAULT_MAP_CACHE_SIZE = 256
+
+# Cache of Authentication.getOwner() results (seconds). Tokens revoked by
+# calls to the Authentication server that do not go through the cache are
+# still accepted during this window
+DEFAULT_TOKEN_TTL = 5.0
+DEFAULT_NEGATIVE_TOKEN_TTL = 5.0
+DEFAULT_TOKEN_CACHE_SIZE = 10000
+
+# Sharding of rooms between RoomManager instances
+DEFAULT_REPLICAS = 2
+DEFAULT_VIRTUAL_NODES = 64
+
+# Taken from game/common.py (DOOR_DIRECTIONS)
 _DOOR_DIRECTION_ = {
     19: [(0, -1)],
     20: [(1, 0)],
@@ -47,6 +112,14 @@ _DOOR_DIRECTION_ = {
     32: [(-1, 0), (0, 1), (1, 0)],
     33: [(0, -1), (-1, 0), (0, 1), (1, 0)]
 }
+# Offsets of the tiles next to a given one
+_NEIGHBOURS_ = [(0, -1), (1, 0), (0, 1), (-1, 0)]
+
+
+RoomInspection = collections.namedtuple('RoomInspection', [
+    'room_name', 'filtered_map', 'objects', 'has_spawn', 'has_exit', 'width', 'height',
+    'valid_size'
+])
 
 
 def get_map_objects(room):
@@ -57,7 +130,7 @@ def get_map_objects(room):
     for map_row in room['data']:
         column = 0
         for tile in map_row:
-            if tile in AVAILABLE_OBJECT_IDS:
+            if tile in _OBJECT_SET_:
                 objects.append((tile, (column, row)))
             column += 1
         row += 1
@@ -71,7 +144,7 @@ def filter_map_objects(room):
     for row in room['data']:
         filtered_row = []
         for tile in row:
-            if (tile in AVAILABLE_OBJECT_IDS) or (tile == NULL_TILE):
+            if (tile in _OBJECT_SET_) or (tile == NULL_TILE):
                 filtered_row.append(EMPTY_TILE)
             else:
                 filtered_row.append(tile)
@@ -80,28 +153,591 @@ def filter_map_objects(room):
     return json.dumps(room)
 
 
-def search_adjacent_door(items, position, visited=None):
-    '''Return the list of door tiles adjacent to a given one'''
-
-    def door_at(position):
-        for item_id in items:
-            item_type, item_position = items[item_id]
-            if position == item_position:
-                if item_type in DOORS:
-                    return item_id, item_type
-        return None, None
-
-    if not visited:
-        visited = []
-    if position in visited:
-        return []
-    visited.append(position)
-    door_id, door_type = door_at(position)
-    if not door_id:
-        return []
-    doors = {door_id}
-    column, row = position
-    for dir_x, dir_y in _DOOR_DIRECTION_[door_type]:
-        doors = doors.union(search_adjacent_door(items, (column + dir_x, row + dir_y), visited))
-    print(f'Adjacent doors: {doors}')
+def inspect_room(room_data):
+    '''
+        Decode a room only once and return a RoomInspection with the filtered map
+        (as filter_map_objects()), the objects (as get_map_objects()), spawn and exit
+        presence and the dimension checks. Raise ValueError if room is not a map.
+    '''
+    return _inspect_(room_data)[0]
+
+
+def _inspect_(room_data):
+    # Return the RoomInspection and the decoded map data
+    room = json.loads(room_data)
+    if not isinstance(room, dict) or not isinstance(room.get('data', None), list):
+        raise ValueError('missing map data')
+    data = room['data']
+    try:
+        extracted = _extract_with_numpy_(data) if numpy is not None else None
+        filtered, objects = extracted or _extract_(data)
+    except (TypeError, IndexError) as error:
+        raise ValueError('invalid tile: {}'.format(error))
+
+    room['data'] = filtered
+    object_ids = {tile for tile, _ in objects}
+    height = len(data)
+    width = max(len(row) for row in data) if height else 0
+    valid_size = (
+        (0 < width <= MAX_MAP_WIDTH) and (0 < height <= MAX_MAP_HEIGHT) and
+        all(len(row) == width for row in data)
+    )
+    return RoomInspection(
+        room.get('room', ''), json.dumps(room), objects,
+        not _SPAWN_SET_.isdisjoint(object_ids), EXIT in object_ids, width, height, valid_size
+    ), data
+
+
+def _exit_reachable_(data, objects):
+    # Doors are walkable: keys can open them
+    pending = [position for tile, position in objects if tile in _SPAWN_SET_]
+    exits = {position for tile, position in objects if tile == EXIT}
+    if not (pending and exits):
+        return False
+    teleports = {position for tile, position in objects if tile == TELEPORT}
+    visited = set(pending)
+    while pending:
+        position = pending.pop()
+        if position in exits:
+            return True
+        column, row = position
+        neighbours = [(column, row - 1), (column + 1, row), (column, row + 1), (column - 1, row)]
+        if position in teleports:
+            # Any teleport leads to the others
+            neighbours += teleports
+        for neighbour in neighbours:
+            if neighbour in visited:
+                continue
+            x, y = neighbour
+            if (0 <= y < len(data)) and (0 <= x < len(data[y])) and (data[y][x] not in _WALL_SET_):
+                visited.add(neighbour)
+                pending.append(neighbour)
+    return False
+
+
+def _extract_(data):
+    filtered = []
+    objects = []
+    for y, row in enumerate(data):
+        if row and ((min(row) < 0) or (max(row) > NULL_TILE)):
+            raise ValueError('invalid tile in row {}'.format(y))
+        filtered.append([_FILTER_TABLE_[tile] for tile in row])
+        if not _OBJECT_SET_.isdisjoint(row):
+            objects.extend((tile, (x, y)) for x, tile in enumerate(row) if tile in _OBJECT_SET_)
+    return filtered, objects
+
+
+def _extract_with_numpy_(data):
+    # Return None if data cannot be handled as a 2D array of integers
+    try:
+        tiles = numpy.asarray(data)
+    except ValueError:
+        return None
+    if (tiles.ndim != 2) or (tiles.dtype.kind not in 'iu') or (tiles.size == 0):
+        return None
+    if (tiles.min() < 0) or (tiles.max() > NULL_TILE):
+        raise ValueError('invalid tile in map')
+    rows, columns = numpy.nonzero(_OBJECT_ARRAY_[tiles])
+    objects = [
+        (tile, (x, y))
+        for tile, x, y in zip(tiles[rows, columns].tolist(), columns.tolist(), rows.tolist())
+    ]
+    return _FILTER_ARRAY_[tiles].tolist(), objects
+
+
+def validate_room(room_data):
+    '''Return (room_name, reason) where reason is None if room format is right'''
+    try:
+        inspection, data = _inspect_(room_data)
+    except ValueError as error:
+        return '', str(error)
+    if not isinstance(inspection.room_name, str) or not inspection.room_name:
+        return '', 'missing room name'
+    if not inspection.valid_size:
+        return inspection.room_name, 'map must be a rectangle up to {}x{} tiles'.format(
+            MAX_MAP_WIDTH, MAX_MAP_HEIGHT
+        )
+    if (
+        inspection.has_spawn and inspection.has_exit and
+        not _exit_reachable_(data, inspection.objects)
+    ):
+        return inspection.room_name, 'exit unreachable from spawn'
+    return inspection.room_name, None
+
+
+def validate_rooms(rooms, existing_rooms=(), processes=None):
+    '''
+        Validate a batch of rooms, in parallel if the batch is big enough.
+        Return a list of (room_name, status, reason), one per room in the same order.
+        Rooms with status PUBLISHED should be stored together by the caller.
+    '''
+    if len(rooms) < MIN_PARALLEL_BATCH:
+        checks = [validate_room(room_data) for room_data in rooms]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+            checks = list(pool.map(validate_room, rooms, chunksize=MIN_PARALLEL_BATCH))
+
+    results = []
+    accepted = set()
+    for room_name, reason in checks:
+        if reason:
+            results.append((room_name, WRONG_FORMAT, reason))
+        elif (room_name in existing_rooms) or (room_name in accepted):
+            results.append((room_name, ALREADY_EXISTS, 'room already exists'))
+        else:
+            accepted.add(room_name)
+            results.append((room_name, PUBLISHED, ''))
+    return results
+
+
+def room_etag(room_data):
+    '''Content hash used by clients to validate cached rooms'''
+    return hashlib.sha1(room_data.encode('utf-8')).hexdigest()
+
+
+class FilteredMapCache:
+    '''LRU of filtered maps and its objects, indexed by room data'''
+    def __init__(self, capacity=DEFAULT_MAP_CACHE_SIZE):
+        self._capacity_ = capacity
+        self._maps_ = collections.OrderedDict()
+        # Maps are requested by many threads
+        self._lock_ = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._maps_)
+
+    def get(self, room_data):
+        '''Return (etag, filtered_map, objects) of a room, etag is the hash of filtered_map'''
+        # Indexed by the room data itself: Python caches the hash of a string, so
+        # servers asking again with the same string do not hash the room again
+        key = room_data
+        with self._lock_:
+            if key in self._maps_:
+                self.hits += 1
+                self._maps_.move_to_end(key)
+                return self._maps_[key]
+            self.misses += 1
+        inspection = inspect_room(room_data)
+        entry = (room_etag(inspection.filtered_map), inspection.filtered_map, inspection.objects)
+        with self._lock_:
+            self._maps_[key] = entry
+            if len(self._maps_) > self._capacity_:
+                self._maps_.popitem(last=False)
+        return entry
+
+    def get_if_changed(self, room_data, etag):
+        '''Filtered map of a room or empty string if client etag is up to date'''
+        map_etag, filtered_map, _ = self.get(room_data)
+        return '' if map_etag == etag else filtered_map
+
+
+def door_position_index(items):
+    '''Map position -> (door_id, door_type) of every door in a dict of items'''
+    index = {}
+    for item_id, (item_type, item_position) in items.items():
+        if item_type in _DOOR_DIRECTION_:
+            index[tuple(item_position)] = (item_id, item_type)
+    return index
+
+
+def doors_linked(door_type, neighbour_type, offset):
+    '''
+        Return if two adjacent door tiles are connected: one of them points to
+        the other (offset goes from the first door to its neighbour)
+    '''
+    return (
+        (offset in _DOOR_DIRECTION_[door_type]) or
+        ((-offset[0], -offset[1]) in _DOOR_DIRECTION_[neighbour_type])
+    )
+
+
+def search_adjacent_door(items, position, visited=None, door_index=None):
+    '''Return the set of door IDs connected to the door at given position'''
+    if door_index is None:
+        door_index = door_position_index(items)
+    visited = set(visited or ())
+    doors = set()
+    pending = [tuple(position)]
+    while pending:
+        position = pending.pop()
+        if position in visited:
+            continue
+        visited.add(position)
+        door_id, door_type = door_index.get(position, (None, None))
+        if not door_id:
+            continue
+        doors.add(door_id)
+        column, row = position
+        for offset in _NEIGHBOURS_:
+            neighbour = (column + offset[0], row + offset[1])
+            if neighbour in door_index and doors_linked(
+                door_type, door_index[neighbour][1], offset
+            ):
+                pending.append(neighbour)
     return doors
+
+
+def group_doors(doors):
+    '''
+        Union-find of connected doors (see doors_linked()). Doors is a map
+        position -> door_type, return a map position -> group number.
+    '''
+    parent = {position: position for position in doors}
+
+    def find(position):
+        while parent[position] != position:
+            parent[position] = parent[parent[position]]
+            position = parent[position]
+        return position
+
+    for (column, row), door_type in doors.items():
+        for offset in _NEIGHBOURS_:
+            neighbour = (column + offset[0], row + offset[1])
+            if neighbour in doors and doors_linked(door_type, doors[neighbour], offset):
+                parent[find(neighbour)] = find((column, row))
+
+    group_numbers = {}
+    return {
+        position: group_numbers.setdefault(find(position), len(group_numbers))
+        for position in doors
+    }
+
+
+def door_groups(items):
+    '''Precomputed table door_id -> frozenset of IDs of its connected doors'''
+    door_index = door_position_index(items)
+    positions = group_doors({
+        position: door_type for position, (_, door_type) in door_index.items()
+    })
+    members = {}
+    for position, group in positions.items():
+        members.setdefault(group, set()).add(door_index[position][0])
+    members = {group: frozenset(door_ids) for group, door_ids in members.items()}
+    return {door_index[position][0]: members[group] for position, group in positions.items()}
+
+
+def _ring_hash_(key):
+    return int(hashlib.md5(key.encode('utf-8')).hexdigest()[:16], 16)
+
+
+class HashRing:
+    '''Consistent hash ring that assigns every room to some RoomManager instances'''
+    def __init__(self, replicas=DEFAULT_REPLICAS, virtual_nodes=DEFAULT_VIRTUAL_NODES):
+        self._replicas_ = replicas
+        self._virtual_nodes_ = virtual_nodes
+        self._points_ = []
+        self._owners_ = []
+        self._members_ = set()
+
+    @property
+    def members(self):
+        '''Manager IDs in the ring'''
+        return set(self._members_)
+
+    def add(self, manager_id):
+        '''Add a manager, call it on RoomManagerSync.hello() and announce()'''
+        if manager_id in self._members_:
+            return
+        self._members_.add(manager_id)
+        for virtual_node in range(self._virtual_nodes_):
+            point = _ring_hash_('{}#{}'.format(manager_id, virtual_node))
+            index = bisect.bisect(self._points_, point)
+            self._points_.insert(index, point)
+            self._owners_.insert(index, manager_id)
+
+    def remove(self, manager_id):
+        '''Remove a manager from the ring'''
+        if manager_id not in self._members_:
+            return
+        self._members_.discard(manager_id)
+        keep = [index for index, owner in enumerate(self._owners_) if owner != manager_id]
+        self._points_ = [self._points_[index] for index in keep]
+        self._owners_ = [self._owners_[index] for index in keep]
+
+    def owners(self, room_name):
+        '''List of managers that should store a given room, first one is the primary'''
+        owners = []
+        if not self._points_:
+            return owners
+        wanted = min(self._replicas_, len(self._members_))
+        index = bisect.bisect(self._points_, _ring_hash_(room_name))
+        while len(owners) < wanted:
+            owner = self._owners_[index % len(self._owners_)]
+            if owner not in owners:
+                owners.append(owner)
+            index += 1
+        return owners
+
+    def is_owner(self, manager_id, room_name):
+        '''Return if a manager should store a given room'''
+        return manager_id in self.owners(room_name)
+
+
+class InvalidCursor(Exception):
+    '''Local stand-in of IceGauntlet.InvalidCursor'''
+
+
+class RoomIndex:
+    '''Indexes of published rooms used to answer paginated and filtered listings'''
+    def __init__(self, invalid_cursor=InvalidCursor):
+        self._invalid_cursor_ = invalid_cursor
+        self._rooms_ = {}
+        self._by_name_ = []
+        self._by_author_ = {}
+        self._by_size_ = []
+        self._by_author_size_ = {}
+        self._version_ = 0
+
+    @property
+    def version(self):
+        '''Stamp that changes every time a room is added or removed'''
+        return self._version_
+
+    @property
+    def count(self):
+        '''Number of indexed rooms'''
+        return len(self._rooms_)
+
+    def __contains__(self, room_name):
+        return room_name in self._rooms_
+
+    def add(self, room_name, author, width, height):
+        '''Index a room, replacing the previous one with the same name'''
+        self.remove(room_name)
+        size = width * height
+        self._rooms_[room_name] = (author, width, height)
+        bisect.insort(self._by_name_, room_name)
+        bisect.insort(self._by_author_.setdefault(author, []), room_name)
+        bisect.insort(self._by_size_, (size, room_name))
+        bisect.insort(self._by_author_size_.setdefault(author, []), (size, room_name))
+        self._version_ += 1
+
+    def add_room_data(self, room_data):
+        '''Index a room from its JSON data, return room name'''
+        room = json.loads(room_data)
+        room_name = room['room']
+        height = len(room['data'])
+        width = len(room['data'][0]) if height else 0
+        self.add(room_name, room.get('author', ''), width, height)
+        return room_name
+
+    def remove(self, room_name):
+        '''Remove a room from indexes'''
+        if room_name not in self._rooms_:
+            return
+        author, width, height = self._rooms_.pop(room_name)
+        _sorted_remove_(self._by_name_, room_name)
+        _sorted_remove_(self._by_author_[author], room_name)
+        if not self._by_author_[author]:
+            del self._by_author_[author]
+        _sorted_remove_(self._by_size_, (width * height, room_name))
+        _sorted_remove_(self._by_author_size_[author], (width * height, room_name))
+        if not self._by_author_size_[author]:
+            del self._by_author_size_[author]
+        self._version_ += 1
+
+    def info(self, room_name):
+        '''Return (name, author, width, height) of a room'''
+        return (room_name,) + self._rooms_[room_name]
+
+    def page(self, cursor='', page_size=DEFAULT_PAGE_SIZE, author='', min_size=0, max_size=0):
+        '''
+            Return a page of room infos and the cursor of the next page (empty if
+            last). Raise the invalid cursor exception if the cursor was not given
+            by a listing with the same ordering (by name or by size).
+        '''
+        page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        if min_size or max_size:
+            ordering = _BY_SIZE_
+            candidates = self._by_size_iterator_(
+                self._cursor_key_(cursor, ordering), author, min_size, max_size
+            )
+        else:
+            ordering = _BY_NAME_
+            candidates = self._by_name_iterator_(self._cursor_key_(cursor, ordering), author)
+        rooms = []
+        for sort_key, room_name in candidates:
+            if len(rooms) == page_size:
+                return rooms, json.dumps([ordering, last_key])
+            rooms.append(self.info(room_name))
+            last_key = sort_key
+        return rooms, ''
+
+    def _cursor_key_(self, cursor, ordering):
+        # Cursors are [ordering, sort key], sort keys are names or [size, name]
+        if not cursor:
+            return None
+        try:
+            cursor_ordering, key = json.loads(cursor)
+        except (ValueError, TypeError):
+            raise self._invalid_cursor_()
+        if cursor_ordering != ordering:
+            raise self._invalid_cursor_()
+        if ordering == _BY_NAME_ and isinstance(key, str):
+            return key
+        if (
+            ordering == _BY_SIZE_ and isinstance(key, list) and (len(key) == 2) and
+            isinstance(key[0], int) and isinstance(key[1], str)
+        ):
+            return tuple(key)
+        raise self._invalid_cursor_()
+
+    def _by_name_iterator_(self, key, author):
+        names = self._by_author_.get(author, []) if author else self._by_name_
+        start = bisect.bisect_right(names, key) if key is not None else 0
+        for index in range(start, len(names)):
+            yield names[index], names[index]
+
+    def _by_size_iterator_(self, key, author, min_size, max_size):
+        sizes = self._by_author_size_.get(author, []) if author else self._by_size_
+        if key is not None:
+            start = bisect.bisect_right(sizes, key)
+        else:
+            start = bisect.bisect_left(sizes, (min_size, ''))
+        for index in range(start, len(sizes)):
+            size, room_name = sizes[index]
+            if max_size and (size > max_size):
+                return
+            yield (size, room_name), room_name
+
+
+def _sorted_remove_(values, value):
+    index = bisect.bisect_left(values, value)
+    if (index < len(values)) and (values[index] == value):
+        del values[index]
+
+
+class Unauthorized(Exception):
+    '''Local stand-in of IceGauntlet.Unauthorized'''
+
+
+class LocalAuthentication:
+    '''In-process stand-in of the Authentication server, for testing'''
+    def __init__(self, users=None):
+        self._passwords_ = dict(users or {})
+        self._tokens_ = {}
+        self.get_owner_calls = 0
+
+    def _revoke_(self, user):
+        for token in [token for token, owner in self._tokens_.items() if owner == user]:
+            del self._tokens_[token]
+
+    def changePassword(self, user, currentPassHash, newPassHash, current=None):
+        '''Change password and revoke tokens of the user'''
+        if self._passwords_.get(user, None) != currentPassHash:
+            raise Unauthorized()
+        self._passwords_[user] = newPassHash
+        self._revoke_(user)
+
+    def getNewToken(self, user, passwordHash, current=None):
+        '''Create a new token for the user, previous one is revoked'''
+        if self._passwords_.get(user, None) != passwordHash:
+            raise Unauthorized()
+        self._revoke_(user)
+        token = uuid.uuid4().hex
+        self._tokens_[token] = user
+        return token
+
+    def getOwner(self, token, current=None):
+        '''Return owner of a valid token'''
+        self.get_owner_calls += 1
+        if token not in self._tokens_:
+            raise Unauthorized()
+        return self._tokens_[token]
+
+
+class TokenCache:
+    '''
+        Cache of token owners in front of Authentication.getOwner(), safe to be
+        used from many threads. Tokens rotated through change_password() or
+        get_new_token() are forgotten at once, other revocations are seen when
+        the entry expires (see DEFAULT_TOKEN_TTL)
+    '''
+    def __init__(self, authentication, unauthorized=Unauthorized, ttl=DEFAULT_TOKEN_TTL,
+                 negative_ttl=DEFAULT_NEGATIVE_TOKEN_TTL, max_size=DEFAULT_TOKEN_CACHE_SIZE,
+                 clock=time.monotonic):
+        self._authentication_ = authentication
+        self._unauthorized_ = unauthorized
+        self._ttl_ = ttl
+        self._negative_ttl_ = negative_ttl
+        self._max_size_ = max_size
+        self._clock_ = clock
+        self._owners_ = {}
+        # Requests are dispatched by many threads
+        self._lock_ = threading.Lock()
+        # Increased by every invalidation, answers older than one are not stored
+        self._invalidations_ = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self):
+        '''Cache counters'''
+        with self._lock_:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._owners_)}
+
+    def get_owner(self, token):
+        '''Owner of the token, raise the unauthorized exception if token is not valid'''
+        now = self._clock_()
+        with self._lock_:
+            entry = self._owners_.get(token, None)
+            if entry and (entry[1] > now):
+                self.hits += 1
+            else:
+                entry = None
+                self.misses += 1
+            invalidations = self._invalidations_
+        if entry:
+            if entry[0] is None:
+                raise self._unauthorized_()
+            return entry[0]
+        # The lock is not held while waiting for the Authentication server
+        try:
+            owner = self._authentication_.getOwner(token)
+        except self._unauthorized_:
+            self._store_(token, None, now + self._negative_ttl_, invalidations)
+            raise
+        self._store_(token, owner, now + self._ttl_, invalidations)
+        return owner
+
+    def invalidate(self, token):
+        '''Forget a token'''
+        with self._lock_:
+            self._invalidations_ += 1
+            self._owners_.pop(token, None)
+
+    def invalidate_user(self, user):
+        '''Forget every token of a user'''
+        with self._lock_:
+            self._invalidations_ += 1
+            for token in [token for token, entry in self._owners_.items() if entry[0] == user]:
+                del self._owners_[token]
+
+    def change_password(self, user, current_pass_hash, new_pass_hash):
+        '''Forward changePassword() and forget the rotated credentials'''
+        self._authentication_.changePassword(user, current_pass_hash, new_pass_hash)
+        self.invalidate_user(user)
+
+    def get_new_token(self, user, password_hash):
+        '''Forward getNewToken() and forget the previous (revoked) tokens of the user'''
+        token = self._authentication_.getNewToken(user, password_hash)
+        self.invalidate_user(user)
+        return token
+
+    def _store_(self, token, owner, expiration, invalidations):
+        with self._lock_:
+            if invalidations != self._invalidations_:
+                # Answer may be older than an invalidation made while waiting for it
+                return
+            if len(self._owners_) >= self._max_size_:
+                self._purge_(self._clock_())
+            self._owners_[token] = (owner, expiration)
+
+    def _purge_(self, now):
+        # Called with the lock held
+        for token in [token for token, entry in self._owners_.items() if entry[1] <= now]:
+            del self._owners_[token]
+        if len(self._owners_) >= self._max_size_:
+            self._owners_.clear()
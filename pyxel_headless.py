@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+'''
+    Headless stand-in of pyxel, so the engine can run without a window
+
+    Used by servers and benchmarks: rooms are simulated but nothing is drawn.
+'''
+
+import sys
+import types
+
+
+# Minimum size of pyxel banks used by the engine
+_TILEMAP_BANKS_ = 8
+_IMAGE_BANKS_ = 3
+_BANK_SIZE_ = 256
+
+
+class _Bank:
+    '''Image or tilemap bank stored in memory'''
+    def __init__(self):
+        self._data_ = [[0] * _BANK_SIZE_ for _ in range(_BANK_SIZE_)]
+
+    def get(self, x, y):
+        '''Get value of a given position'''
+        return self._data_[y][x]
+
+    def set(self, x, y, value):
+        '''Set value of a given position'''
+        self._data_[y][x] = value
+
+
+def _do_nothing_(*args, **kwargs):
+    pass
+
+
+def _not_pressed_(*args, **kwargs):
+    return False
+
+
+def _new_pyxel_():
+    pyxel = types.ModuleType('pyxel')
+    pyxel.TILEMAP_BANK_COUNT = _TILEMAP_BANKS_
+    pyxel.IMAGE_BANK_FOR_SYSTEM = _IMAGE_BANKS_
+    (pyxel.KEY_LEFT, pyxel.KEY_RIGHT, pyxel.KEY_UP, pyxel.KEY_DOWN,
+     pyxel.KEY_ENTER, pyxel.KEY_ESCAPE) = range(6)
+    pyxel.COLOR_BLACK = 0
+    pyxel.COLOR_WHITE = 7
+    pyxel.width = pyxel.height = _BANK_SIZE_
+    pyxel.frame_count = 0
+    tilemaps = [_Bank() for _ in range(_TILEMAP_BANKS_)]
+    images = [_Bank() for _ in range(_IMAGE_BANKS_)]
+    pyxel.tilemap = lambda bank: tilemaps[bank]
+    pyxel.image = lambda bank: images[bank]
+    pyxel.btn = pyxel.btnp = pyxel.btnr = _not_pressed_
+    pyxel.init = pyxel.run = pyxel.quit = _do_nothing_
+    pyxel.cls = pyxel.text = pyxel.rect = pyxel.blt = pyxel.bltm = _do_nothing_
+    return pyxel
+
+
+def _new_pil_():
+    # Images are never loaded when running headless
+    pil = types.ModuleType('PIL')
+    pil.Image = types.ModuleType('PIL.Image')
+    pil.Image.open = lambda *args, **kwargs: None
+    return pil
+
+
+def install():
+    '''Replace pyxel (and PIL if missing) by stand-ins, call it before importing game'''
+    sys.modules['pyxel'] = _new_pyxel_()
+    try:
+        import PIL.Image # pylint: disable=W0611,C0415
+    except ImportError:
+        pil = _new_pil_()
+        sys.modules['PIL'] = pil
+        sys.modules['PIL.Image'] = pil.Image